@@ -4,8 +4,8 @@ from dagster import (
     AutomationCondition,
     Definitions,
     link_code_references_to_git,
-    load_asset_checks_from_package_module,
-    load_assets_from_package_module,
+    load_asset_checks_from_modules,
+    load_assets_from_modules,
     with_source_code_references,
 )
 from dagster._core.definitions.metadata.source_code import AnchorBasedFilePathMapping
@@ -18,13 +18,13 @@ from .resources import get_resources_for_deployment
 resource_defs = get_resources_for_deployment()
 all_assets = with_source_code_references(
     [
-        *load_assets_from_package_module(
-            assets,
+        *load_assets_from_modules(
+            assets.asset_modules,
             automation_condition=AutomationCondition.eager(),
         ),
     ]
 )
-all_asset_checks = [*load_asset_checks_from_package_module(assets)]
+all_asset_checks = [*load_asset_checks_from_modules(assets.asset_modules)]
 
 all_assets = link_code_references_to_git(
     assets_defs=all_assets,
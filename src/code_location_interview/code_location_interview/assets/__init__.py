@@ -0,0 +1,7 @@
+from . import dbt_assets
+from .magenta_interview import deployment, feature_history, get_data, predict, train
+
+# only the modules which define assets are loaded with the code location, the
+# modules they use (scoring, out_of_core, feature_store, prediction_store, ...) are
+# imported when an asset runs
+asset_modules = [dbt_assets, get_data, feature_history, train, predict, deployment]
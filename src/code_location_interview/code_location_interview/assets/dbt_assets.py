@@ -4,45 +4,88 @@ from dagster import OpExecutionContext
 from dagster_dbt import DagsterDbtTranslatorSettings, DbtCliResource, DbtProject
 from dagster_dbt.asset_decorator import dbt_assets
 from shared_library.orchestration.dbt_translator import (
+    DbtBuildConfig,
     build_DbtTranslator,
     process_dbt_assets,
 )
 
+from code_location_interview.assets.magenta_interview.partitions import (
+    dbt_backfill_policy,
+    monthly_partitions,
+)
 from code_location_interview.resources import (
-    resource_defs_by_deployment_name,
+    dbt_target_by_deployment_name,
+    get_dbt_project,
+    load_dbt_manifest,
 )
 from code_location_interview.resources.sql_asset_keys import duckdb_bar_warehouse_name
 
 # TODO update to our needs https://github.com/dagster-io/hooli-data-eng-pipelines/blob/master/hooli_data_eng/assets/dbt_assets.py
 dbt_target_schema = os.environ.get("ASCII_WAREHOUSE_SCHEMA", "ascii")
 
+deployment_name = os.environ.get("DAGSTER_DEPLOYMENT", "dev")
+dbt_project: DbtProject = get_dbt_project(dbt_target_by_deployment_name[deployment_name])
+# parsed once and shared by every @dbt_assets definition below
+dbt_manifest = load_dbt_manifest()
+
 dagster_dbt_translator = build_DbtTranslator(
     duckdb_bar_warehouse_name, dbt_target_schema
 )(
     settings=DagsterDbtTranslatorSettings(
         enable_asset_checks=True, enable_code_references=True
-    )
+    ),
+    partitioning_overrides={"int_bills": "billed_period_month_d"},
+    # asset keys, groups and metadata of all nodes are derived once, up front
+    manifest=dbt_manifest,
 )
 
-deployment_name = os.environ.get("DAGSTER_DEPLOYMENT", "dev")
-resource_defs = resource_defs_by_deployment_name[deployment_name]
-dbt_cli: DbtCliResource = resource_defs["dbt"]
-dbt_project: DbtProject = DbtProject(
-    project_dir=dbt_cli.project_dir,
-    target=dbt_cli.target,
-    state_path=dbt_cli.state_path,
+
+# passed to process_dbt_assets as well, its own selections of the state and partition
+# chunk runs keep the excluded tests out
+unpartitioned_exclude = "tag:long_running_test tag:monthly"
+monthly_exclude = "tag:long_running_test"
+
+
+@dbt_assets(
+    manifest=dbt_manifest,
+    project=dbt_project,
+    exclude=unpartitioned_exclude,
+    dagster_dbt_translator=dagster_dbt_translator,
 )
+def unpartitioned_assets(
+    context: OpExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig
+):
+    yield from process_dbt_assets(
+        context=context,
+        dbt2=dbt,
+        dagster_dbt_translator2=dagster_dbt_translator,
+        only_modified=config.only_modified,
+        manifest=dbt_manifest,
+        exclude=unpartitioned_exclude,
+    )
 
 
 @dbt_assets(
-    manifest=dbt_project.manifest_path,
+    manifest=dbt_manifest,
     project=dbt_project,
-    exclude="tag:long_running_test",
+    select="tag:monthly",
+    exclude=monthly_exclude,
+    partitions_def=monthly_partitions,
+    backfill_policy=dbt_backfill_policy,
     dagster_dbt_translator=dagster_dbt_translator,
 )
-def unpartitioned_assets(context: OpExecutionContext, dbt: DbtCliResource):
+def monthly_partitioned_assets(
+    context: OpExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig
+):
     yield from process_dbt_assets(
-        context=context, dbt2=dbt, dagster_dbt_translator2=dagster_dbt_translator
+        context=context,
+        dbt2=dbt,
+        dagster_dbt_translator2=dagster_dbt_translator,
+        only_modified=config.only_modified,
+        partitions_per_invocation=config.partitions_per_invocation,
+        max_parallel_invocations=config.max_parallel_invocations,
+        manifest=dbt_manifest,
+        exclude=monthly_exclude,
     )
 
 
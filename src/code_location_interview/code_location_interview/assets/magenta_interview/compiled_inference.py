@@ -0,0 +1,146 @@
+"""
+Compiled inference for the Pipeline built in train.trained_model
+
+sklearn's ColumnTransformer validates and copies the input DataFrame on every call
+and stacks the transformer outputs into a new matrix before XGBoost sees it. At
+scoring time the fitted preprocessor is fixed, so CompiledPipeline turns it into a
+plan once: the input column of every output column, the fill values of the
+imputer and a lookup table per one-hot encoded column. Scoring then writes the
+features straight into one float32 matrix, fills missing values in place and hands
+it to the booster's inplace_predict, which is what XGBClassifier.predict_proba
+does after the ColumnTransformer. The probabilities are bit-for-bit identical.
+
+Supported are SimpleImputer, OneHotEncoder (without drop or infrequent categories)
+and passthrough columns, anything else raises a ValueError.
+"""
+
+import warnings
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+from xgboost import XGBClassifier
+
+
+@dataclass(frozen=True)
+class _OneHotColumn:
+    column: str
+    offset: int
+    width: int
+    # categories without missing values, in the order of the output columns
+    lookup: pd.Index
+    # output column of None and NaN if they were categories during fit, else -1
+    none_code: int
+    nan_code: int
+
+
+def _column_names(preprocessor: ColumnTransformer, columns: Any) -> list[str]:
+    # the remainder selects its columns by position
+    if all(isinstance(column, str) for column in columns):
+        return list(columns)
+    return list(np.asarray(preprocessor.feature_names_in_)[columns])
+
+
+def _is_passthrough(transformer: Any) -> bool:
+    return transformer == "passthrough" or (
+        isinstance(transformer, FunctionTransformer) and transformer.func is None
+    )
+
+
+def _category_code(categories: list, is_missing) -> int:
+    return next((code for code, category in enumerate(categories) if is_missing(category)), -1)
+
+
+def _one_hot_column(encoder: OneHotEncoder, column: str, offset: int) -> _OneHotColumn:
+    if encoder.drop_idx_ is not None or encoder.max_categories or encoder.min_frequency:
+        raise ValueError("OneHotEncoder with drop or infrequent categories can't be compiled")
+    # like sklearn, None and NaN are distinct categories
+    (categories,) = encoder.categories_
+    categories = list(categories)
+    return _OneHotColumn(
+        column=column,
+        offset=offset,
+        width=len(categories),
+        lookup=pd.Index([category for category in categories if not pd.isna(category)], dtype=object),
+        none_code=_category_code(categories, lambda category: category is None),
+        nan_code=_category_code(categories, lambda category: isinstance(category, float) and np.isnan(category)),
+    )
+
+
+class CompiledPipeline:
+    """Drop-in replacement for the fitted Pipeline's ``predict_proba``."""
+
+    def __init__(self, pipeline: Pipeline):
+        (_, preprocessor), (_, classifier) = pipeline.steps
+        if not isinstance(preprocessor, ColumnTransformer) or preprocessor.sparse_output_:
+            raise ValueError("Only a dense ColumnTransformer output can be compiled")
+        if not isinstance(classifier, XGBClassifier) or classifier.objective != "binary:logistic":
+            raise ValueError("Only a binary:logistic XGBClassifier can be compiled")
+
+        self.feature_names_in_ = preprocessor.feature_names_in_
+        self.booster = classifier.get_booster()
+        self.missing = classifier.missing
+        # the trees predict_proba uses, i.e. up to the best iteration of early stopping
+        best_iteration = getattr(classifier, "best_iteration", None)
+        self.iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+
+        self._numeric_columns: list[tuple[str, int]] = []
+        self._one_hot_columns: list[_OneHotColumn] = []
+        fill_values: list[float] = []
+        with warnings.catch_warnings():
+            # sklearn warns that the remainder columns become names instead of positions
+            warnings.simplefilter("ignore", FutureWarning)
+            transformers = [(transformer, _column_names(preprocessor, columns)) for _, transformer, columns in preprocessor.transformers_]
+        for transformer, columns in transformers:
+            fill_values += self._compile(transformer, columns, len(fill_values))
+        self.num_features = len(fill_values)
+        self._fill_values = np.asarray(fill_values, dtype=np.float32)
+        self._is_imputed = ~np.isnan(self._fill_values)
+
+    def _compile(self, transformer: Any, columns: list[str], offset: int) -> list[float]:
+        """Plans the output columns of one transformer, returns their fill values (NaN: none)."""
+        if transformer == "drop":
+            return []
+        if _is_passthrough(transformer):
+            self._numeric_columns += [(column, offset + i) for i, column in enumerate(columns)]
+            return [np.nan] * len(columns)
+        if isinstance(transformer, SimpleImputer) and not transformer.add_indicator and pd.isna(transformer.missing_values):
+            self._numeric_columns += [(column, offset + i) for i, column in enumerate(columns)]
+            return list(transformer.statistics_)
+        if isinstance(transformer, OneHotEncoder) and len(columns) == 1:
+            self._one_hot_columns.append(_one_hot_column(transformer, columns[0], offset))
+            return [np.nan] * self._one_hot_columns[-1].width
+        raise ValueError(f"{transformer!r} on {columns} can't be compiled")
+
+    def transform(self, features: pd.DataFrame) -> np.ndarray:
+        """The ColumnTransformer output, already in the float32 precision XGBoost uses."""
+        X = np.empty((len(features), self.num_features), dtype=np.float32)
+        for column, index in self._numeric_columns:
+            # via float64 like the ColumnTransformer output, so rounding is the same
+            X[:, index] = features[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        np.copyto(X, self._fill_values, where=self._is_imputed & np.isnan(X))
+        for one_hot in self._one_hot_columns:
+            self._encode(X, one_hot, features[one_hot.column].to_numpy(dtype=object))
+        return X
+
+    @staticmethod
+    def _encode(X: np.ndarray, one_hot: _OneHotColumn, values: np.ndarray) -> None:
+        codes = one_hot.lookup.get_indexer(values)
+        codes[values == None] = one_hot.none_code  # noqa: E711 elementwise
+        codes[pd.isna(values) & (values != None)] = one_hot.nan_code  # noqa: E711
+        X[:, one_hot.offset : one_hot.offset + one_hot.width] = 0
+        rows = np.flatnonzero(codes >= 0)
+        X[rows, one_hot.offset + codes[rows]] = 1
+
+    def predict_proba(self, features: pd.DataFrame) -> np.ndarray:
+        churn_risk = self.booster.inplace_predict(
+            self.transform(features),
+            iteration_range=self.iteration_range,
+            missing=self.missing,
+        )
+        return np.vstack((1.0 - churn_risk, churn_risk)).transpose()
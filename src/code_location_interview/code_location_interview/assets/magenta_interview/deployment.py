@@ -3,11 +3,26 @@ Based on:
 https://github.com/neurospaceio/dagster-deepdive-mlops-demo/blob/main/mlops_demo/mlops_demo/deployment.py
 """
 
-import polars as pl
-from dagster import asset, file_relative_path, AssetExecutionContext, Config, Failure,AutomationCondition
-from sklearn.ensemble import RandomForestClassifier
-import pickle
-from datetime import datetime
+from typing import Literal, Optional
+
+from dagster import (
+    AssetExecutionContext,
+    AutomationCondition,
+    Config,
+    Failure,
+    MetadataValue,
+    Output,
+    asset,
+)
+from shared_library.orchestration.profiling import profiled
+
+from code_location_interview.resources import get_asset_profiler
+from code_location_interview.resources.model_registry import (
+    ModelRegistry,
+    RegisteredModel,
+)
+
+from .train import TrainedModel
 
 group_name = "deployment"
 
@@ -15,41 +30,49 @@ group_name = "deployment"
     group_name=group_name,
     automation_condition=AutomationCondition.eager()
 )
-def model_candidates(context: AssetExecutionContext, trained_model) -> list[str]:
-    root =  file_relative_path(__file__, "../../../../../")
-    trained_models_folder = f"{root}/trained_models"
-    model_list_file_name = f"{trained_models_folder}/list-of-models.txt"
-    model_path = f"{trained_models_folder}/model-{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.pickle"
-    
-    # Save model file
-    pickle.dump(trained_model, open(model_path, "wb+"))
-
-    # Update model candidates
-    with open(model_list_file_name, "a+") as f:
-        f.write(model_path + "\n")
-
-    with open(model_list_file_name, "r") as f:
-        models = f.read().splitlines()
+@profiled(get_asset_profiler)
+def model_candidates(context: AssetExecutionContext, trained_model: TrainedModel, model_registry: ModelRegistry) -> list[str]:
+    # the metrics come with the model this step loaded, not from the latest
+    # materialization of trained_model on the instance
+    registered_model = model_registry.register(
+        trained_model.pipeline,
+        metrics=trained_model.metrics,
+        lineage={"run_id": context.run_id},
+    )
+    models = model_registry.model_ids()
 
     context.add_asset_metadata({
-        "list-of-models": models
+        "model_id": registered_model.model_id,
+        "list-of-models": models,
     })
 
     return models
 
 class DeployedModelConfiguration(Config):
-    model_path: str
+    # registry id of the model to deploy, when empty the latest model or the best
+    # model by `metric` is deployed
+    model_id: Optional[str] = None
+    select: Literal["latest", "best"] = "latest"
+    metric: str = "roc_auc_score"
+
+
+def resolve_model(model_registry: ModelRegistry, config: DeployedModelConfiguration) -> RegisteredModel:
+    if config.model_id is not None:
+        return model_registry.get(config.model_id)
+    if config.select == "best":
+        return model_registry.best(config.metric)
+    return model_registry.latest()
+
 
 @asset(
     group_name=group_name
 )
-def deployed_model(model_candidates: list[str], config: DeployedModelConfiguration):
+@profiled(get_asset_profiler)
+def deployed_model(model_candidates: list[str], config: DeployedModelConfiguration, model_registry: ModelRegistry) -> Output[RegisteredModel]:
 
-    if config.model_path not in model_candidates:
+    if config.model_id is not None and config.model_id not in model_candidates:
         raise Failure("The requested model does not exist")
-    
-    with open(config.model_path, "rb") as f:
-        model = pickle.load(f)
 
-    return model
-    
\ No newline at end of file
+    # only the handle is stored, predictions loads the model through the registry cache
+    model = resolve_model(model_registry, config)
+    return Output(model, metadata={"model_id": model.model_id, "metrics": MetadataValue.json(model.metrics)})
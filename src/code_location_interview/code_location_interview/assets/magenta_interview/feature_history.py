@@ -0,0 +1,80 @@
+from typing import Optional
+
+from dagster import (
+    AssetExecutionContext,
+    AutomationCondition,
+    Config,
+    asset,
+    get_dagster_logger,
+)
+from shared_library.orchestration.profiling import profiled
+from shared_library.orchestration.runs import run_started_at
+
+from code_location_interview.resources import get_asset_profiler
+from code_location_interview.resources.duckdb_path import DuckDBPathResource
+
+from .partitions import monthly_backfill_policy, monthly_partitions
+
+# the assets append the outputs of get_data to the point-in-time feature store (see
+# feature_store.py, imported in the asset bodies with duckdb and pandas), they have
+# no output of their own
+
+logger = get_dagster_logger(__name__)
+
+group_name = "feature_store"
+
+
+class SnapshotConfig(Config):
+    # ISO timestamp the snapshot is valid from, defaults to the start of the run, so a
+    # retry replaces the snapshot; set it to backfill the snapshots of past dates
+    snapshot_ts: Optional[str] = None
+
+
+@asset(
+    group_name=group_name,
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
+)
+@profiled(get_asset_profiler)
+def bills_history(context: AssetExecutionContext, feature_store: DuckDBPathResource, bills) -> None:
+    from .feature_store import FeatureStore
+
+    num_rows = FeatureStore(feature_store.file_path).write_bills(bills)
+    logger.info(f"Stored {num_rows} bills of {context.partition_key} in {feature_store.file_path}")
+    context.add_output_metadata({"num_rows": num_rows})
+
+
+@asset(
+    group_name=group_name,
+    automation_condition=AutomationCondition.eager(),
+)
+@profiled(get_asset_profiler)
+def core_data_history(
+    context: AssetExecutionContext, config: SnapshotConfig, feature_store: DuckDBPathResource, core_data
+) -> None:
+    from .feature_store import FeatureStore
+
+    snapshot_ts = config.snapshot_ts or run_started_at(context).isoformat()
+    num_rows = FeatureStore(feature_store.file_path).write_snapshot("core_data", core_data, snapshot_ts)
+    context.add_output_metadata({"num_rows": num_rows, "snapshot_ts": snapshot_ts})
+
+
+@asset(
+    group_name=group_name,
+    automation_condition=AutomationCondition.eager(),
+)
+@profiled(get_asset_profiler)
+def customer_interactions_history(
+    context: AssetExecutionContext,
+    config: SnapshotConfig,
+    feature_store: DuckDBPathResource,
+    pivoted_customer_interactions,
+) -> None:
+    from .feature_store import FeatureStore
+
+    snapshot_ts = config.snapshot_ts or run_started_at(context).isoformat()
+    num_rows = FeatureStore(feature_store.file_path).write_snapshot(
+        "customer_interactions", pivoted_customer_interactions, snapshot_ts
+    )
+    context.add_output_metadata({"num_rows": num_rows, "snapshot_ts": snapshot_ts})
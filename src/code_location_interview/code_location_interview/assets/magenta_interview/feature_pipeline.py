@@ -0,0 +1,128 @@
+"""
+polars implementation of the feature pipeline in get_data.py
+
+Every step takes and returns a LazyFrame, so the steps can be chained into one
+query plan which polars optimizes (projection/predicate pushdown, common
+subplan elimination) and executes on all cores. The assets collect at their
+boundary and hand pandas frames downstream, identical to the pandas engine.
+"""
+
+import os
+from typing import Union
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+from .schema import (
+    days_since_last_case_columns,
+    n_case_columns,
+    raw_feature_columns,
+    type_subtypes,
+)
+
+
+def to_lazy(value: Union[pd.DataFrame, pa.Table, pl.DataFrame, ParquetDataset, list]) -> pl.LazyFrame:
+    if isinstance(value, list):
+        # several partitions of the same asset
+        return pl.concat([to_lazy(partition) for partition in value])
+    if isinstance(value, ParquetDataset):
+        return pl.scan_parquet(
+            os.path.join(value.path, "**", "*.parquet"),
+            hive_partitioning=bool(value.partition_cols),
+        )
+    if isinstance(value, pd.DataFrame):
+        # keeps named indexes such as customer_id of pivoted_customer_interactions
+        return pl.from_pandas(value, include_index=True).lazy()
+    if isinstance(value, pa.Table):
+        return pl.from_arrow(value).lazy()  # type: ignore[union-attr]
+    return value.lazy()
+
+
+def aggregate_bills(bills: pl.LazyFrame) -> pl.LazyFrame:
+    return (
+        bills.group_by("rating_account_id")
+        .agg(
+            pl.col("has_used_roaming").max(),
+            pl.col("used_gb").sum(),
+            pl.col("has_used_gb").max(),
+        )
+        .sort("rating_account_id")
+    )
+
+
+def pivot_customer_interactions(customer_interactions: pl.LazyFrame) -> pl.LazyFrame:
+    # a conditional aggregation per subtype is the lazy equivalent of a pivot
+    return (
+        customer_interactions.group_by("customer_id")
+        .agg(
+            *[
+                pl.col("n").filter(pl.col("type_subtype") == type_subtype).first().alias(f"n_case_{type_subtype}")
+                for type_subtype in type_subtypes
+            ],
+            *[
+                pl.col("days_since_last")
+                .filter(pl.col("type_subtype") == type_subtype)
+                .first()
+                .alias(f"days_since_last_case_{type_subtype}")
+                for type_subtype in type_subtypes
+            ],
+        )
+        .with_columns(pl.col(n_case_columns + days_since_last_case_columns).cast(pl.Float64))
+        .with_columns(
+            n_cases=pl.sum_horizontal(n_case_columns),
+            days_since_last_case=pl.min_horizontal(days_since_last_case_columns),
+        )
+        .with_columns(pl.col(n_case_columns).fill_null(0))
+        .sort("customer_id")
+    )
+
+
+def join_raw_features(
+    core_data: pl.LazyFrame,
+    aggregated_bills: pl.LazyFrame,
+    pivoted_customer_interactions: pl.LazyFrame,
+) -> pl.LazyFrame:
+    return (
+        core_data.join(aggregated_bills, on="rating_account_id", how="left", maintain_order="left")
+        .join(pivoted_customer_interactions, on="customer_id", how="left", maintain_order="left")
+        .select(raw_feature_columns)
+    )
+
+
+def engineer_features(raw_features: pl.LazyFrame) -> pl.LazyFrame:
+    # a categorical column has no string functions
+    smartphone_brand = pl.col("smartphone_brand").cast(pl.String)
+    return (
+        raw_features.with_columns(pl.col("available_gb").fill_nan(0).fill_null(0))
+        .with_columns(
+            perc_used_gb=pl.when(pl.col("available_gb") != 0)
+            .then(pl.col("used_gb") / pl.col("available_gb"))
+            .otherwise(pl.col("used_gb")),
+            # Create categories for smartphone_brand
+            smartphone_brand=pl.when(smartphone_brand.is_null())
+            .then(None)
+            .when(smartphone_brand.str.to_lowercase().is_in(["samsung", "apple"]))
+            .then(smartphone_brand)
+            .when(smartphone_brand.str.to_lowercase().is_in(["huawei", "xiaomi"]))
+            .then(pl.lit("Huawei, Xiaomi"))
+            .otherwise(pl.lit("Other")),
+        )
+        .drop("customer_id")
+    )
+
+
+def build_features(
+    core_data: pl.LazyFrame,
+    bills: pl.LazyFrame,
+    customer_interactions: pl.LazyFrame,
+) -> pl.LazyFrame:
+    """The whole chain from the generated data to ``features`` as a single query plan."""
+    return engineer_features(
+        join_raw_features(
+            core_data,
+            aggregate_bills(bills),
+            pivot_customer_interactions(customer_interactions),
+        )
+    )
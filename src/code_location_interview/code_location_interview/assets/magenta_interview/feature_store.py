@@ -0,0 +1,280 @@
+"""
+Point-in-time feature store of the churn datasets in DuckDB
+
+raw_features joins the current core_data, aggregated_bills and
+pivoted_customer_interactions, so it can only rebuild the features of today. The
+store keeps their history instead:
+
+- bills_history holds every billed month once (rewritten when a month is ingested
+  again), keyed by billed_period_month_d
+- core_data_history and customer_interactions_history hold snapshots of core_data
+  and pivoted_customer_interactions, each valid from its snapshot_ts until the next
+  one; the snapshots table lists them per dataset
+
+Features are served for a spine of (rating_account_id, cutoff_ts) rows, i.e. the
+accounts and scoring dates of a training set with their labels. Every row sees the
+latest snapshots taken at or before its cutoff (an ASOF join against the snapshots
+table) and the bills of the months closed in the rolling window ending at it,
+nothing later, so a training set spanning many cutoffs is free of leakage. The
+bills of a monthly partition (as aggregated by aggregated_bills) are served from
+the start of the next month on. The whole spine is one SQL query, so DuckDB joins
+and aggregates it out of core and on all cores.
+"""
+
+from typing import Any, Iterable, Optional, Union
+
+import duckdb
+import numpy as np
+import pandas as pd
+from shared_library.orchestration.duckdb_file import connect
+from shared_library.orchestration.frame_schema import enforce_schema
+from shared_library.orchestration.parquet_dataset import ParquetDataset, scannable
+
+from .schema import (
+    bills_schema,
+    core_data_schema,
+    features_schema,
+    pivoted_customer_interactions_schema,
+    raw_feature_columns,
+    raw_features_schema,
+)
+
+# number of billed months aggregated into the features of a cutoff, as in aggregated_bills
+bills_rolling_window_months = 4
+
+_duckdb_types = {
+    "bool": "BOOLEAN",
+    "boolean": "BOOLEAN",
+    "int8": "TINYINT",
+    "int16": "SMALLINT",
+    "int32": "INTEGER",
+    "int64": "BIGINT",
+    "float32": "FLOAT",
+    "float64": "DOUBLE",
+}
+
+
+def _duckdb_type(column_type: Any) -> str:
+    # categories are stored as plain strings, their order is a pandas concern
+    if not isinstance(column_type, str) or column_type == "category":
+        return "VARCHAR"
+    return _duckdb_types[column_type.lower()]
+
+
+_tables = {
+    "bills_history": {**{name: _duckdb_type(dtype) for name, dtype in bills_schema.items()}, "billed_period_month_d": "DATE"},
+    "core_data_history": {
+        "snapshot_ts": "TIMESTAMP",
+        **{name: _duckdb_type(dtype) for name, dtype in core_data_schema.items()},
+    },
+    "customer_interactions_history": {
+        "snapshot_ts": "TIMESTAMP",
+        **{name: _duckdb_type(dtype) for name, dtype in pivoted_customer_interactions_schema.items()},
+    },
+}
+# snapshot table of every dataset
+_snapshot_tables = {
+    "core_data": "core_data_history",
+    "customer_interactions": "customer_interactions_history",
+}
+
+_core_columns = [name for name in raw_feature_columns if name in core_data_schema and name != "rating_account_id"]
+_bills_columns = ["has_used_roaming", "used_gb", "has_used_gb"]
+_interaction_columns = [
+    name for name in raw_feature_columns if name in pivoted_customer_interactions_schema and name != "customer_id"
+]
+
+
+def _quoted(name: str) -> str:
+    # the type_subtypes in the interaction columns contain "&" and "-"
+    return f'"{name}"'
+
+
+def _point_in_time_query(spine: str) -> str:
+    """Raw features of every row of the spine relation, in the order of its _spine_row."""
+    core = ", ".join(f"core.{_quoted(name)}" for name in _core_columns)
+    bills = ", ".join(f"bills_window.{name}" for name in _bills_columns)
+    interactions = ", ".join(f"interactions.{_quoted(name)}" for name in _interaction_columns)
+    return f"""
+    with spine as ({spine}),
+    spine_snapshots as (
+        select
+            spine.*,
+            core_snapshots.snapshot_ts as _core_snapshot_ts,
+            interaction_snapshots.snapshot_ts as _interactions_snapshot_ts
+        from spine
+        asof left join (select snapshot_ts from snapshots where dataset = 'core_data') core_snapshots
+            on spine.cutoff_ts >= core_snapshots.snapshot_ts
+        asof left join (select snapshot_ts from snapshots where dataset = 'customer_interactions') interaction_snapshots
+            on spine.cutoff_ts >= interaction_snapshots.snapshot_ts
+    ),
+    bills_window as (
+        select
+            spine._spine_row,
+            bool_or(bills.has_used_roaming) as has_used_roaming,
+            sum(bills.used_gb) as used_gb,
+            bool_or(bills.has_used_gb) as has_used_gb
+        from spine
+        join bills_history bills
+            on bills.rating_account_id = spine.rating_account_id
+            -- a month is billed once it is over, the window holds the months closed by the cutoff
+            and bills.billed_period_month_d + interval 1 month <= spine.cutoff_ts
+            and bills.billed_period_month_d + interval 1 month > spine.cutoff_ts - to_months({bills_rolling_window_months})
+        group by spine._spine_row
+    )
+    select
+        spine_snapshots.* exclude (_spine_row, _core_snapshot_ts, _interactions_snapshot_ts),
+        {core},
+        {bills},
+        {interactions}
+    from spine_snapshots
+    join core_data_history core
+        on core.snapshot_ts = spine_snapshots._core_snapshot_ts
+        and core.rating_account_id = spine_snapshots.rating_account_id
+    left join bills_window
+        on bills_window._spine_row = spine_snapshots._spine_row
+    left join customer_interactions_history interactions
+        on interactions.snapshot_ts = spine_snapshots._interactions_snapshot_ts
+        and interactions.customer_id = core.customer_id
+    order by spine_snapshots._spine_row
+    """
+
+
+class FeatureStore:
+    """Time-stamped history of the churn datasets in the DuckDB file at path.
+
+    Writes are idempotent: ingesting a billed month or a snapshot timestamp again
+    replaces it. Every call opens its own connection (see duckdb_file.connect), so
+    runs in other processes can use the file in between.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        con = connect(self.path)
+        con.execute("create table if not exists snapshots (dataset VARCHAR, snapshot_ts TIMESTAMP)")
+        for table, columns in _tables.items():
+            con.execute(f"create table if not exists {table} ({', '.join(f'{_quoted(name)} {kind}' for name, kind in columns.items())})")
+        return con
+
+    def _insert(self, con: duckdb.DuckDBPyConnection, table: str, casts: dict[str, str]) -> int:
+        """Inserts the registered new_rows into table, casting its columns to the stored types."""
+        columns = _tables[table]
+        select = ", ".join(casts.get(name, f"cast({_quoted(name)} as {kind})") for name, kind in columns.items())
+        (num_rows,) = con.execute(
+            f"insert into {table} ({', '.join(map(_quoted, columns))}) select {select} from new_rows"
+        ).fetchone()
+        return num_rows
+
+    def write_bills(self, bills: Union[pd.DataFrame, ParquetDataset]) -> int:
+        """Stores the bills of their billed months, replacing what was stored for them."""
+        # the month is the category of its string
+        billed_month = "cast(cast(billed_period_month_d as VARCHAR) as DATE)"
+        with self._connect() as con:
+            con.begin()
+            con.register("new_rows", scannable(bills))
+            con.execute(f"delete from bills_history where billed_period_month_d in (select distinct {billed_month} from new_rows)")
+            num_rows = self._insert(con, "bills_history", {"billed_period_month_d": billed_month})
+            con.commit()
+        return num_rows
+
+    def write_snapshot(self, dataset: str, frame: Union[pd.DataFrame, ParquetDataset], snapshot_ts: Any) -> int:
+        """Stores frame as the snapshot of dataset valid from snapshot_ts on.
+
+        dataset is "core_data" (a core_data frame) or "customer_interactions" (a
+        pivoted_customer_interactions frame, indexed by customer_id or not).
+        """
+        if dataset not in _snapshot_tables:
+            raise ValueError(f"Unknown dataset {dataset}, use one of {list(_snapshot_tables)}")
+        table = _snapshot_tables[dataset]
+        if isinstance(frame, pd.DataFrame) and frame.index.name is not None:
+            frame = frame.reset_index()
+        snapshot_ts = pd.Timestamp(snapshot_ts).to_pydatetime()
+
+        with self._connect() as con:
+            con.begin()
+            con.execute(f"delete from {table} where snapshot_ts = ?", [snapshot_ts])
+            con.execute("delete from snapshots where dataset = ? and snapshot_ts = ?", [dataset, snapshot_ts])
+            con.register("new_rows", scannable(frame))
+            num_rows = self._insert(con, table, {"snapshot_ts": f"cast('{snapshot_ts.isoformat()}' as TIMESTAMP)"})
+            con.execute("insert into snapshots values (?, ?)", [dataset, snapshot_ts])
+            con.commit()
+        return num_rows
+
+    def snapshots(self) -> pd.DataFrame:
+        """dataset and snapshot_ts of every stored snapshot."""
+        with self._connect() as con:
+            return con.sql("select dataset, snapshot_ts from snapshots order by dataset, snapshot_ts").df()
+
+    def billed_months(self) -> list:
+        """The billed months stored in bills_history, in order."""
+        with self._connect() as con:
+            return [month for (month,) in con.sql("select distinct billed_period_month_d from bills_history order by 1").fetchall()]
+
+    def historical_raw_features(self, spine: pd.DataFrame) -> pd.DataFrame:
+        """The raw features of every row of spine as of its cutoff_ts.
+
+        spine has a rating_account_id and a cutoff_ts column, any other columns (i.e.
+        labels) are passed through. The result has the columns of spine followed by
+        the raw_features columns in the order of the rows of spine. Rows of accounts
+        that are not in the core_data snapshot of their cutoff (i.e. did not exist
+        yet) are dropped.
+        """
+        missing = {"rating_account_id", "cutoff_ts"} - set(spine.columns)
+        if missing:
+            raise ValueError(f"The spine has no {sorted(missing)} column")
+        clashing = set(spine.columns) & (set(raw_feature_columns) - {"rating_account_id"})
+        if clashing:
+            raise ValueError(f"The spine columns {sorted(clashing)} clash with the raw features")
+
+        spine = spine.assign(
+            cutoff_ts=pd.to_datetime(spine["cutoff_ts"]),
+            _spine_row=np.arange(len(spine)),
+        )
+        with self._connect() as con:
+            con.register("spine_frame", spine)
+            raw_features = con.sql(_point_in_time_query("select * from spine_frame")).df()
+        return enforce_schema(raw_features, raw_features_schema)
+
+    def raw_features_as_of(self, cutoffs: Iterable[Any]) -> pd.DataFrame:
+        """The raw features of every account of the core_data snapshot of every cutoff.
+
+        A cutoff_ts column precedes the raw_features columns, rows are sorted by
+        cutoff_ts and rating_account_id.
+        """
+        cutoffs = pd.DataFrame({"cutoff_ts": pd.to_datetime(list(cutoffs))})
+        with self._connect() as con:
+            con.register("cutoffs", cutoffs)
+            raw_features = con.sql(
+                _point_in_time_query(
+                    """
+                    select
+                        core.rating_account_id,
+                        cutoffs.cutoff_ts,
+                        row_number() over (order by cutoffs.cutoff_ts, core.rating_account_id) as _spine_row
+                    from cutoffs
+                    asof join (select snapshot_ts from snapshots where dataset = 'core_data') core_snapshots
+                        on cutoffs.cutoff_ts >= core_snapshots.snapshot_ts
+                    join core_data_history core on core.snapshot_ts = core_snapshots.snapshot_ts
+                    """
+                )
+            ).df()
+        return enforce_schema(raw_features, raw_features_schema)
+
+    def training_frame(self, spine: pd.DataFrame) -> pd.DataFrame:
+        """Model features of every row of spine as of its cutoff_ts, next to the spine columns."""
+        return engineer(self.historical_raw_features(spine))
+
+    def scoring_frame(self, cutoff_ts: Optional[Any] = None) -> pd.DataFrame:
+        """Model features of every account as of cutoff_ts (now by default), like the features asset."""
+        cutoff_ts = pd.Timestamp.now() if cutoff_ts is None else cutoff_ts
+        return engineer(self.raw_features_as_of([cutoff_ts])).drop(columns="cutoff_ts")
+
+
+def engineer(raw_features: pd.DataFrame) -> pd.DataFrame:
+    """The features of raw features, as computed by the features asset, other columns are kept."""
+    from . import feature_pipeline
+
+    features = feature_pipeline.engineer_features(feature_pipeline.to_lazy(raw_features)).collect().to_pandas()
+    return enforce_schema(features, features_schema)
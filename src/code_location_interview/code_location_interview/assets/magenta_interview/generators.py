@@ -0,0 +1,225 @@
+"""
+Generators of the synthetic churn datasets used by the assets in get_data.py
+
+Every generator draws from the numpy Generator it is given, so a chunk is
+reproducible from its seed alone.
+"""
+
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from dagster import get_dagster_logger
+
+from .schema import smartphone_brands, type_subtypes
+
+if TYPE_CHECKING:
+    from .get_data import CoreDataConfig
+
+logger = get_dagster_logger(__name__)
+
+
+def chunk_rngs(
+    seed_sequence: np.random.SeedSequence, num_rows: int, chunk_size: int
+) -> Iterator[tuple[np.random.Generator, slice]]:
+    # one independent child generator per chunk keeps the output reproducible
+    num_chunks = max(1, -(-num_rows // chunk_size))
+    for i, chunk_seed in enumerate(seed_sequence.spawn(num_chunks)):
+        yield np.random.default_rng(chunk_seed), slice(i * chunk_size, min((i + 1) * chunk_size, num_rows))
+
+
+def rating_account_id_max_step(num_rows: int) -> int:
+    # ids are a random walk with strictly positive steps so they are unique without
+    # drawing from (and materializing) the whole id space
+    return max(1, (2 * 900_000) // num_rows - 1)
+
+
+def generate_unique_customer_ids(rng: np.random.Generator, num_unique_customers: int) -> np.ndarray:
+    # 'customer_id' has the format "<1-5>.<suffix>", the suffix gets more digits only
+    # when the 6 digit id space is too small for the requested number of customers
+    suffix_digits = 6
+    while 4.5 * 10**suffix_digits < 2 * num_unique_customers:
+        suffix_digits += 1
+    prefix = rng.integers(1, 6, size=num_unique_customers)
+    suffix = rng.integers(10 ** (suffix_digits - 1), 10**suffix_digits, size=num_unique_customers)
+    # the ids are kept as integer codes "<prefix><suffix>", i.e. without the dot, they
+    # join and group on 8 bytes instead of a string (see format_customer_ids)
+    codes = np.sort(prefix * 10**suffix_digits + suffix)
+    return codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+
+
+def format_customer_ids(codes: np.ndarray) -> np.ndarray:
+    """The "<prefix>.<suffix>" strings of integer coded customer ids."""
+    # the prefix is a single digit, the suffix has no leading zeros
+    digits = pc.cast(pa.array(codes), pa.string())
+    return pc.binary_join_element_wise(
+        pc.utf8_slice_codeunits(digits, 0, 1), pc.utf8_slice_codeunits(digits, 1), "."
+    ).to_numpy(zero_copy_only=False)
+
+
+def generate_core_data_chunk(
+    rng: np.random.Generator,
+    num_rows: int,
+    rating_account_id_offset: int,
+    unique_customer_ids: np.ndarray,
+    max_step: int,
+) -> pd.DataFrame:
+    rating_account_id = rating_account_id_offset + np.cumsum(rng.integers(1, max_step + 1, size=num_rows))
+    rng.shuffle(rating_account_id)
+
+    # Assign 'customer_id's to 'rating_account_id's, allowing repeats
+    customer_id = unique_customer_ids[rng.integers(0, len(unique_customer_ids), size=num_rows)]
+
+    # Generate 'age' (integer between 18 and 100, peak between 35 and 55, few values >= 75)
+    age_component = rng.choice(3, size=num_rows, p=[0.80, 0.15, 0.05])
+    age = np.empty(num_rows)
+    age[age_component == 0] = rng.normal(45, 7, size=np.count_nonzero(age_component == 0))
+    age[age_component == 1] = rng.integers(18, 35, size=np.count_nonzero(age_component == 1))
+    age[age_component == 2] = rng.integers(75, 101, size=np.count_nonzero(age_component == 2))
+    age = np.clip(age, 18, 100).astype(int)
+
+    # Generate 'contract_lifetime_days' (integer between 7 and 5*365, few cases higher than 3*365)
+    contract_lifetime_days = np.where(
+        rng.random(num_rows) < 0.75,
+        rng.integers(7, 3 * 365 + 1, size=num_rows),
+        rng.integers(3 * 365 + 1, 5 * 365 + 1, size=num_rows),
+    )
+
+    # Generate 'remaining_binding_days' (integer between -2*365 and 2*365, abs value < contract_lifetime_days)
+    # Rejecting draws with abs(rbd) >= contract_lifetime_days from U[-2*365, max_remaining] is the same as
+    # drawing uniformly from the truncated interval, so every row is sampled exactly once.
+    remaining_binding_days = rng.integers(
+        np.maximum(-2 * 365, 1 - contract_lifetime_days),
+        np.minimum(2 * 365, contract_lifetime_days - 1) + 1,
+    )
+
+    # Generate 'has_special_offer' (binary 1 or 0, 30% are 1)
+    has_special_offer = (rng.random(num_rows) < 0.3).astype(int)
+
+    # Generate 'is_magenta1_customer' (binary 1 or 0, 30% are 1)
+    is_magenta1_customer = (rng.random(num_rows) < 0.3).astype(int)
+
+    # Generate 'available_gb' (integer, can be 0, 10, 20, 30, 40, 50, null)
+    available_gb_options = np.array([0, 10, 20, 30, 40, 50, np.nan])
+    available_gb = available_gb_options[rng.integers(0, len(available_gb_options), size=num_rows)]
+
+    # Generate 'gross_mrc' (float between 5 and 70, around 30 different values)
+    gross_mrc_values = np.round(np.linspace(5, 70, num=50), 2)
+    gross_mrc = gross_mrc_values[rng.integers(0, len(gross_mrc_values), size=num_rows)]
+
+    # Generate 'smartphone_brand' (categorical)
+    smartphone_brand = pd.Categorical.from_codes(
+        rng.choice(len(smartphone_brands), size=num_rows, p=[0.4, 0.35, 0.2, 0.025, 0.025]),
+        categories=smartphone_brands,
+    )
+
+    return pd.DataFrame(
+        {
+            "rating_account_id": rating_account_id,
+            "customer_id": customer_id,
+            "age": age,
+            "contract_lifetime_days": contract_lifetime_days,
+            "remaining_binding_days": remaining_binding_days,
+            "has_special_offer": has_special_offer,
+            "is_magenta1_customer": is_magenta1_customer,
+            "available_gb": available_gb,
+            "gross_mrc": gross_mrc,
+            "smartphone_brand": smartphone_brand,
+        }
+    )
+
+
+def generate_core_data(config: "CoreDataConfig") -> tuple[np.ndarray, Iterator[pd.DataFrame]]:
+    """Returns the unique customer ids and a generator of ``core_data`` chunks.
+
+    Chunks are drawn from independent child seeds of ``config.seed``, so the same
+    ``seed`` and ``chunk_size`` always reproduce the same dataset.
+    """
+    num_chunks = max(1, -(-config.num_rows // config.chunk_size))
+    customer_seed, *chunk_seeds = np.random.SeedSequence(config.seed).spawn(1 + num_chunks)
+
+    unique_customer_ids = generate_unique_customer_ids(
+        np.random.default_rng(customer_seed), int(config.num_rows * 0.85)
+    )
+    max_step = rating_account_id_max_step(config.num_rows)
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        rating_account_id_offset = 100000
+        for i, chunk_seed in enumerate(chunk_seeds):
+            chunk_rows = min(config.chunk_size, config.num_rows - i * config.chunk_size)
+            logger.info("core_data chunk %d/%d (%d rows)", i + 1, num_chunks, chunk_rows)
+            chunk = generate_core_data_chunk(
+                np.random.default_rng(chunk_seed),
+                chunk_rows,
+                rating_account_id_offset,
+                unique_customer_ids,
+                max_step,
+            )
+            rating_account_id_offset = int(chunk["rating_account_id"].max())
+            yield chunk
+
+    return unique_customer_ids, chunks()
+
+
+def generate_bills_chunk(
+    rng: np.random.Generator, rating_account_ids: np.ndarray, billed_period_month_ds: np.ndarray
+) -> pd.DataFrame:
+    num_rows = len(rating_account_ids) * len(billed_period_month_ds)
+
+    # one bill per rating account and month
+    bills = pd.DataFrame(
+        {
+            "rating_account_id": np.repeat(rating_account_ids, len(billed_period_month_ds)),
+            "billed_period_month_d": np.tile(billed_period_month_ds, len(rating_account_ids)),
+        }
+    )
+
+    # Generate 'has_used_roaming' (binary 0 or 1, 70% are 0)
+    bills["has_used_roaming"] = (rng.random(num_rows) < 0.3).astype(int)
+
+    # Generate 'used_gb' (float between 0 and 70, can be 0), a quarter of the bills in each usage band
+    used_gb_bands = np.array([0, 1, 5, 15, 70])
+    used_gb_band = rng.integers(0, len(used_gb_bands) - 1, size=num_rows)
+    used_gb_distribution = rng.uniform(used_gb_bands[used_gb_band], used_gb_bands[used_gb_band + 1])
+    bills["used_gb"] = np.round(np.clip(used_gb_distribution, 0, 70), 1)
+
+    # Generate 'has_used_gb' based on 'used_gb'
+    bills["has_used_gb"] = (bills["used_gb"] > 1).astype(int)
+
+    return bills
+
+
+def generate_customer_interactions_chunk(
+    rng: np.random.Generator, selected_customer_ids: np.ndarray
+) -> pd.DataFrame:
+    selected_num = len(selected_customer_ids)
+
+    # For each customer, assign a random number of topics (1 to 3)
+    num_topics = rng.choice(a=[1, 2, 3], size=selected_num, p=[0.6, 0.3, 0.1])
+
+    # distinct topics per customer without a call per customer: every row of a random
+    # matrix argsorts into a random permutation of the type_subtypes, the first
+    # num_topics of it are drawn without replacement
+    permutations = np.argsort(rng.random((selected_num, len(type_subtypes))), axis=1).astype(np.int8)
+    drawn = np.arange(len(type_subtypes)) < num_topics[:, np.newaxis]
+
+    # Create a DataFrame with 'customer_id' and 'type_subtype'
+    df_cases = pd.DataFrame(
+        {
+            "customer_id": np.repeat(selected_customer_ids, num_topics),
+            "type_subtype": pd.Categorical.from_codes(permutations[drawn], categories=type_subtypes),
+        }
+    )
+
+    # Generate 'n' values with specified distribution
+    n_values = rng.choice(
+        a=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10], size=len(df_cases), p=[0.5, 0.3, 0.1, 0.05, 0.02, 0.01, 0.005, 0.005, 0.005, 0.005]
+    )
+    df_cases["n"] = n_values
+
+    # Generate 'days_since_last' between 0 and 180
+    df_cases["days_since_last"] = rng.integers(0, 181, size=len(df_cases))
+
+    return df_cases
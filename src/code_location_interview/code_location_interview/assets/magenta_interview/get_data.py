@@ -1,10 +1,35 @@
 import logging
-import random
+import os
 import sys
+from typing import Iterator, Literal, Optional
+
+from dagster import AssetExecutionContext, AssetIn, AssetOut, Config, Output, TimeWindowPartitionMapping, asset, get_dagster_logger, multi_asset, AutomationCondition
+from code_location_interview.resources import get_asset_cache, get_asset_profiler
+from shared_library.orchestration.frame_schema import MemoryReduction, enforce_schema
+from shared_library.orchestration.memoize import memoized
+from shared_library.orchestration.profiling import profiled
+from shared_library.orchestration.parquet_dataset import ParquetDataset, as_pandas, dataset_path, scannable, write_parquet_dataset
+
+from .partitions import monthly_backfill_policy, monthly_partitions
+from .schema import (
+    aggregated_bills_schema,
+    bills_schema,
+    core_data_schema,
+    customer_interactions_schema,
+    features_schema,
+    pivoted_customer_interactions_schema,
+    days_since_last_case_columns,
+    n_case_columns,
+    raw_feature_columns,
+    raw_features_schema,
+    type_subtypes,
+)
+
+# numpy, pandas, duckdb and the generators/feature_pipeline modules are imported in
+# the asset bodies, so loading the code location does not import them
 
-import numpy as np
-import pandas as pd
-from dagster import AssetIn, AssetOut, asset, get_dagster_logger, multi_asset, AutomationCondition, file_relative_path
+# every asset enforces the compact dtypes of schema.py on its output and reports the
+# memory it saved (memory_bytes, memory_bytes_before_schema, memory_reduction)
 
 log_fmt = "[%(asctime)s] %(message)s"
 log_datefmt = "%Y-%m-%d %H:%M:%S"
@@ -14,6 +39,33 @@ logger = get_dagster_logger(__name__)
 
 group_name = "get_data"
 
+# number of billed months aggregated into one partition of aggregated_bills
+bills_rolling_window_months = 4
+
+
+class GeneratorConfig(Config):
+    # seed of the numpy Generator, leave empty for a fresh random dataset on every run
+    seed: Optional[int] = None
+    # number of rows drawn per generator step, bounds the size of temporary arrays
+    chunk_size: int = 1_000_000
+    # write the chunks to a Parquet dataset and return a lazy ParquetDataset handle
+    # instead of one in-memory DataFrame, the downstream assets scan it batch by batch
+    # or with DuckDB and only hold their (per account or customer) outputs in memory
+    streaming: bool = False
+    # root folder of the streamed datasets, defaults to the dagster instance storage
+    output_dir: Optional[str] = None
+
+
+class CoreDataConfig(GeneratorConfig):
+    # number of rating accounts to generate
+    num_rows: int = 100000
+
+
+class FeatureEngineConfig(Config):
+    # "pandas" runs every step eagerly, "polars" runs it as an optimized multi-core
+    # LazyFrame query plan (see feature_pipeline.py), both produce identical frames
+    engine: Literal["pandas", "polars"] = "pandas"
+
 
 @multi_asset(
     group_name=group_name,
@@ -29,100 +81,59 @@ group_name = "get_data"
         ),
     },
 )
-def core_data():
-    num_rows = 100000
-    num_unique_customers = int(num_rows * 0.85)
-    rating_account_id = np.random.choice(np.arange(100000, 1000000), size=num_rows, replace=False)
-    unique_customer_ids = list(
-        set([f"{random.randint(1, 5)}.{random.randint(100000, 999999)}" for _ in range(num_unique_customers)])
-    )
-
-    # Assign 'customer_id's to 'rating_account_id's, allowing repeats
-    customer_id = np.random.choice(unique_customer_ids, size=num_rows, replace=True)
-
-    # Generate 'age' (integer between 18 and 100, peak between 35 and 55, few values >= 75)
-    logger.info("Age")
-    age_distribution = np.concatenate(
-        [
-            np.random.normal(45, 7, int(num_rows * 0.80)),
-            np.random.randint(18, 35, int(num_rows * 0.15)),
-            np.random.randint(75, 101, int(num_rows * 0.05)),
-        ]
-    )
-    age = np.clip(age_distribution, 18, 100).astype(int)
-
-    # Generate 'contract_lifetime_days' (integer between 7 and 5*365, few cases higher than 3*365)
-    logger.info("contract_lifetime_days")
-    contract_lifetime_days = np.concatenate(
-        [
-            np.random.randint(7, 3 * 365 + 1, int(num_rows * 0.75)),
-            np.random.randint(3 * 365 + 1, 5 * 365 + 1, int(num_rows * 0.25)),
-        ]
-    )
-
-    # Generate 'remaining_binding_days' (integer between -2*365 and 2*365, abs value < contract_lifetime_days)
-    logger.info("remaining_binding_days")
-    remaining_binding_days = []
-    for cld in contract_lifetime_days:
-        max_remaining = min(2 * 365, cld - 1)  # Ensure abs(remaining_binding_days) < contract_lifetime_days
-        rbd = np.random.randint(-2 * 365, max_remaining + 1)
-        while abs(rbd) >= cld:
-            rbd = np.random.randint(-2 * 365, max_remaining + 1)
-        remaining_binding_days.append(rbd)
-    remaining_binding_days = np.array(remaining_binding_days)
-
-    # Generate 'has_special_offer' (binary 1 or 0, 30% are 1)
-    logger.info("has_special_offer")
-    has_special_offer = np.random.choice([0, 1], size=num_rows, p=[0.7, 0.3])
-
-    # Generate 'is_magenta1_customer' (binary 1 or 0, 30% are 1)
-    is_magenta1_customer = np.random.choice([0, 1], size=num_rows, p=[0.7, 0.3])
-
-    # Generate 'available_gb' (integer, can be 0, 10, 20, 30, 40, 50, null)
-    logger.info("available_gb")
-    available_gb_options = [0, 10, 20, 30, 40, 50, None]
-    available_gb = [random.choice(available_gb_options) for _ in range(num_rows)]
-    available_gb = np.array(available_gb)
-
-    # Generate 'gross_mrc' (float between 5 and 70, around 30 different values)
-    logger.info("gross_mrc")
-    gross_mrc_values = np.round(np.linspace(5, 70, num=50), 2)
-    gross_mrc = np.random.choice(gross_mrc_values, size=num_rows)
-
-    # Generate 'smartphone_brand' (categorical)
-    logger.info("smartphone_brand")
-    smartphone_brand_options = ["iPhone", "Samsung", "Huawei", "Xiaomi", "OnePlus"]
-    smartphone_brand = np.random.choice(smartphone_brand_options, size=num_rows, p=[0.4, 0.35, 0.2, 0.025, 0.025])
-
-    # Create DataFrame
-    logger.info("Create df")
-    core_data = pd.DataFrame(
-        {
-            "rating_account_id": rating_account_id,
-            "customer_id": customer_id,
-            "age": age,
-            "contract_lifetime_days": contract_lifetime_days,
-            "remaining_binding_days": remaining_binding_days,
-            "has_special_offer": has_special_offer,
-            "is_magenta1_customer": is_magenta1_customer,
-            "available_gb": available_gb,
-            "gross_mrc": gross_mrc,
-            "smartphone_brand": smartphone_brand,
-        }
-    )
+@profiled(get_asset_profiler)
+def core_data(context: AssetExecutionContext, config: CoreDataConfig):
+    import numpy as np
+    import pandas as pd
+
+    from .generators import generate_core_data
+
+    unique_customer_ids, chunks = generate_core_data(config)
+    reduction = MemoryReduction()
+    chunks = (enforce_schema(chunk, core_data_schema, reduction) for chunk in chunks)
+
+    if config.streaming:
+        rating_account_ids = []
+
+        def collect_ids(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+            for chunk in chunks:
+                rating_account_ids.append(chunk["rating_account_id"].to_numpy())
+                yield chunk
+
+        core_data = write_parquet_dataset(
+            dataset_path(context, "core_data", config.output_dir),
+            collect_ids(chunks),
+            max_rows_per_file=config.chunk_size,
+        )
+        rating_account_id = np.concatenate(rating_account_ids)
+    else:
+        # Create DataFrame
+        logger.info("Create df")
+        core_data = pd.concat(list(chunks), ignore_index=True)
+        rating_account_id = core_data["rating_account_id"]
 
     return (
         pd.DataFrame({"rating_account_id": rating_account_id}),
         pd.DataFrame({"customer_id": unique_customer_ids}),
-        core_data,
+        Output(core_data, metadata=reduction.metadata()),
     )
 
 
-@asset(
-    group_name=group_name,
-    automation_condition=AutomationCondition.eager()
-)
-def label(core_data):
+label_input_columns = [
+    "rating_account_id",
+    "age",
+    "contract_lifetime_days",
+    "remaining_binding_days",
+    "has_special_offer",
+    "is_magenta1_customer",
+    "available_gb",
+    "gross_mrc",
+]
+
+
+def _churn_probability(core_data):
+    import numpy as np
+
     # Generate 'has_churned' with correlations and adjusted mean churn rate
     churn_prob = (
         0.1 * (core_data.age > 45)
@@ -139,6 +150,29 @@ def label(core_data):
         * (core_data.gross_mrc > 35)  # Higher gross MRC increases churn probability
     )
     churn_prob = np.clip(churn_prob, 0, 1)  # Ensure probabilities are between 0 and 1
+    return churn_prob
+
+
+@asset(
+    group_name=group_name,
+    automation_condition=AutomationCondition.eager(),
+    ins={"core_data": AssetIn(metadata={"columns": label_input_columns})},
+)
+@profiled(get_asset_profiler)
+def label(core_data):
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(core_data, ParquetDataset):
+        # only the ids and probabilities of the streamed accounts are held in memory
+        frames = (batch.to_pandas() for batch in core_data.iter_batches(columns=label_input_columns))
+        batches = [(frame["rating_account_id"].to_numpy(), _churn_probability(frame).to_numpy()) for frame in frames]
+        rating_account_id = np.concatenate([ids for ids, _ in batches])
+        churn_prob = np.concatenate([probs for _, probs in batches])
+    else:
+        core_data = as_pandas(core_data, columns=label_input_columns)
+        rating_account_id = core_data.rating_account_id
+        churn_prob = _churn_probability(core_data)
     has_churned = np.random.binomial(1, churn_prob)
 
     # Adjust mean to be around 0.03 by scaling down/up if necessary
@@ -151,7 +185,7 @@ def label(core_data):
 
     label = pd.DataFrame(
         {
-            "rating_account_id": core_data.rating_account_id,
+            "rating_account_id": rating_account_id,
             "has_churned": has_churned,
         }
     )
@@ -161,169 +195,294 @@ def label(core_data):
 
 @asset(
     group_name=group_name,
-    automation_condition=AutomationCondition.eager()
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
 )
-def bills(rating_account_id):
-    rating_account_ids = rating_account_id["rating_account_id"].values
+@profiled(get_asset_profiler)
+def bills(context: AssetExecutionContext, config: GeneratorConfig, rating_account_id):
+    import numpy as np
+    import pandas as pd
 
-    date_range = pd.date_range(start="2024-04-01", end="2024-07-01", freq="MS")
-    billed_period_month_ds = date_range.strftime("%Y-%m-%d")
+    from .generators import chunk_rngs, generate_bills_chunk
 
-    index = pd.MultiIndex.from_product(
-        [rating_account_ids, billed_period_month_ds], names=["rating_account_id", "billed_period_month_d"]
-    )
-    num_rows = len(index)
-
-    bills = pd.DataFrame(index=index).reset_index()
-
-    # Generate 'has_used_roaming' (binary 0 or 1, 70% are 0)
-    bills["has_used_roaming"] = np.random.choice([0, 1], size=len(bills), p=[0.7, 0.3])
+    rating_account_ids = rating_account_id["rating_account_id"].values
 
-    # Generate 'used_gb' (float between 0 and 70, can be 0)
-    used_gb_distribution = np.concatenate(
-        [
-            np.random.uniform(0, 1, int(num_rows * 0.25)),
-            np.random.uniform(1, 5, int(num_rows * 0.25)),
-            np.random.uniform(5, 15, int(num_rows * 0.25)),
-            np.random.uniform(15, 70, int(num_rows * 0.25)),
-        ]
+    # every partition holds the bills of a single month
+    billed_period_month_d = context.partition_key
+    billed_period_month_ds = np.array([billed_period_month_d], dtype=object)
+
+    # the month is mixed into the seed so every partition draws different bills
+    reduction = MemoryReduction()
+    chunks = (
+        enforce_schema(generate_bills_chunk(rng, rating_account_ids[rows], billed_period_month_ds), bills_schema, reduction)
+        for rng, rows in chunk_rngs(
+            np.random.SeedSequence(config.seed, spawn_key=(int(billed_period_month_d.replace("-", "")),)),
+            len(rating_account_ids),
+            config.chunk_size,
+        )
     )
-    bills["used_gb"] = np.round(np.clip(used_gb_distribution, 0, 70), 1)
 
-    # Generate 'has_used_gb' based on 'used_gb'
-    bills["has_used_gb"] = (bills["used_gb"] > 1).astype(int)
+    if config.streaming:
+        bills = write_parquet_dataset(
+            dataset_path(context, os.path.join("bills", billed_period_month_d), config.output_dir),
+            chunks,
+            max_rows_per_file=config.chunk_size,
+        )
+    else:
+        bills = pd.concat(list(chunks), ignore_index=True)
+    return Output(bills, metadata=reduction.metadata())
+
 
-    return bills
+def _partition_values(value) -> list:
+    # a partition range is loaded as one value per partition by pickling IO managers
+    # and as one frame by the ParquetIOManager
+    if isinstance(value, dict):
+        return list(value.values())
+    return value if isinstance(value, list) else [value]
 
 
 @asset(
     group_name=group_name,
-    automation_condition=AutomationCondition.eager()
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
+    ins={
+        "bills": AssetIn(
+            # rolling window over the current and the previous months of bills
+            partition_mapping=TimeWindowPartitionMapping(
+                start_offset=1 - bills_rolling_window_months,
+                allow_nonexistent_upstream_partitions=True,
+            ),
+            metadata={"allow_missing_partitions": True},
+        )
+    },
 )
-def aggregated_bills(bills):
+@profiled(get_asset_profiler)
+def aggregated_bills(config: FeatureEngineConfig, bills):
+    import pandas as pd
+
+    bills = _partition_values(bills)
+    reduction = MemoryReduction()
+
+    if config.engine == "polars":
+        from . import feature_pipeline
+
+        aggregated_bills = feature_pipeline.aggregate_bills(feature_pipeline.to_lazy(bills)).collect().to_pandas()
+        aggregated_bills = enforce_schema(aggregated_bills, aggregated_bills_schema, reduction)
+        return Output(aggregated_bills, metadata=reduction.metadata())
+
+    if all(isinstance(month, ParquetDataset) for month in bills):
+        # aggregate the streamed datasets out of core, only the needed columns are scanned
+        import duckdb
+        import pyarrow.dataset as ds
+
+        con = duckdb.connect()
+        con.register("bills", ds.dataset([month.dataset() for month in bills]))
+        aggregated_bills = con.sql(
+            """
+            select
+                rating_account_id,
+                max(has_used_roaming) as has_used_roaming,
+                sum(used_gb) as used_gb,
+                max(has_used_gb) as has_used_gb
+            from bills
+            group by rating_account_id
+            order by rating_account_id
+            """
+        ).df()
+        aggregated_bills = enforce_schema(aggregated_bills, aggregated_bills_schema, reduction)
+        return Output(aggregated_bills, metadata=reduction.metadata())
+
+    bills = pd.concat([as_pandas(month) for month in bills], ignore_index=True)
     aggregated_bills = (
         bills.groupby("rating_account_id")
         .agg(has_used_roaming=("has_used_roaming", "max"), used_gb=("used_gb", "sum"), has_used_gb=("has_used_gb", "max"))
         .reset_index()
     )
+    aggregated_bills = enforce_schema(aggregated_bills, aggregated_bills_schema, reduction)
 
-    return aggregated_bills
+    return Output(aggregated_bills, metadata=reduction.metadata())
 
 
 @asset(
     group_name=group_name,
     automation_condition=AutomationCondition.eager()
 )
-def customer_interactions(unique_customer_ids):
+@profiled(get_asset_profiler)
+def customer_interactions(context: AssetExecutionContext, config: GeneratorConfig, unique_customer_ids):
+    import numpy as np
+    import pandas as pd
+
+    from .generators import chunk_rngs, generate_customer_interactions_chunk
+
+    selection_seed, chunks_seed = np.random.SeedSequence(config.seed).spawn(2)
+
     # Randomly select 50% of customer IDs without replacement
     customer_ids = unique_customer_ids["customer_id"].values
     num_unique_customers = len(customer_ids)
     selected_num = int(num_unique_customers * 0.5)
-    selected_customer_ids = np.random.choice(customer_ids, size=selected_num, replace=False)
-
-    # List of 'type_subtype' values
-    type_subtypes = [
-        "produkte&services-tarifdetails",
-        "produkte&services-tarifwechsel",
-        "rechnungsanfragen",
-        "vvl",
-    ]
-
-    # For each customer, assign a random number of topics (1 to 3)
-    num_topics = np.random.choice(a=[1, 2, 3], size=selected_num, p=[0.6, 0.3, 0.1])
-
-    # Create a DataFrame with 'customer_id' and 'type_subtype'
-    df_cases = pd.DataFrame(
-        {
-            "customer_id": np.repeat(selected_customer_ids, num_topics),
-            "type_subtype": np.concatenate([np.random.choice(type_subtypes, size=n, replace=False) for n in num_topics]),
-        }
-    )
-
-    # Generate 'n' values with specified distribution
-    n_values = np.random.choice(
-        a=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10], size=len(df_cases), p=[0.5, 0.3, 0.1, 0.05, 0.02, 0.01, 0.005, 0.005, 0.005, 0.005]
+    selected_customer_ids = np.random.default_rng(selection_seed).choice(customer_ids, size=selected_num, replace=False)
+
+    reduction = MemoryReduction()
+    chunks = (
+        enforce_schema(
+            generate_customer_interactions_chunk(rng, selected_customer_ids[rows]),
+            customer_interactions_schema,
+            reduction,
+        )
+        for rng, rows in chunk_rngs(chunks_seed, selected_num, config.chunk_size)
     )
-    df_cases["n"] = n_values
-
-    # Generate 'days_since_last' between 0 and 180
-    df_cases["days_since_last"] = np.random.randint(0, 181, size=len(df_cases))
 
-    return df_cases
+    if config.streaming:
+        customer_interactions = write_parquet_dataset(
+            dataset_path(context, "customer_interactions", config.output_dir),
+            chunks,
+            max_rows_per_file=config.chunk_size,
+        )
+    else:
+        customer_interactions = pd.concat(list(chunks), ignore_index=True)
+    return Output(customer_interactions, metadata=reduction.metadata())
+
+
+def _pivot_out_of_core(customer_interactions: ParquetDataset):
+    """Same frame as pivot_customer_interactions, DuckDB scans the streamed interactions."""
+    import duckdb
+
+    cells = [
+        f"""
+        coalesce(sum(n) filter (where type_subtype = '{type_subtype}'), 0)::bigint as "{n_case}",
+        min(days_since_last) filter (where type_subtype = '{type_subtype}') as "{days_since_last_case}"
+        """
+        for type_subtype, n_case, days_since_last_case in zip(
+            type_subtypes, n_case_columns, days_since_last_case_columns, strict=True
+        )
+    ]
+    with duckdb.connect() as con:
+        con.register("customer_interactions", scannable(customer_interactions))
+        df_cases_piv = con.sql(
+            f"""
+            select
+                customer_id,
+                {",".join(cells)},
+                sum(n)::bigint as n_cases,
+                min(days_since_last) as days_since_last_case
+            from customer_interactions
+            group by customer_id
+            order by customer_id
+            """
+        ).df()
+    # the same column order as the pandas pivot
+    columns = [*n_case_columns, *days_since_last_case_columns, "n_cases", "days_since_last_case"]
+    return df_cases_piv.set_index("customer_id")[columns]
 
 
 @asset(
     group_name=group_name,
     automation_condition=AutomationCondition.eager()
 )
-def pivoted_customer_interactions(customer_interactions):
-    customer_interactions = customer_interactions.set_index("customer_id")
+@profiled(get_asset_profiler)
+def pivoted_customer_interactions(config: FeatureEngineConfig, customer_interactions):
+    reduction = MemoryReduction()
+    if config.engine == "polars":
+        from . import feature_pipeline
 
-    df_cases_piv = (
-        customer_interactions.pivot(columns="type_subtype", values=["n", "days_since_last"])
-        .assign(n_cases=lambda df: df.n.sum(axis=1))
-        .assign(days_since_last_case=lambda df: df.days_since_last.min(axis=1))
-    )
+        df_cases_piv = (
+            feature_pipeline.pivot_customer_interactions(feature_pipeline.to_lazy(customer_interactions))
+            .collect()
+            .to_pandas()
+            .set_index("customer_id")
+        )
+        df_cases_piv = enforce_schema(df_cases_piv, pivoted_customer_interactions_schema, reduction)
+        return Output(df_cases_piv, metadata=reduction.metadata())
 
-    # Fill na using MultiIndex
-    df_cases_piv.n = df_cases_piv.n.fillna(0)
+    if isinstance(customer_interactions, ParquetDataset):
+        df_cases_piv = _pivot_out_of_core(customer_interactions)
+    else:
+        from .sparse_pivot import pivot_customer_interactions
 
-    # Remove MultiIndex
-    df_cases_piv.columns = ["_case_".join(col) if col[1] != "" else col[0] for col in df_cases_piv.columns]
+        df_cases_piv = pivot_customer_interactions(customer_interactions)
+    df_cases_piv = enforce_schema(df_cases_piv, pivoted_customer_interactions_schema, reduction)
 
-    return df_cases_piv
+    return Output(df_cases_piv, metadata=reduction.metadata())
 
 
-@asset(
-    group_name=group_name,
-    automation_condition=AutomationCondition.eager()
-)
-def raw_features(core_data, aggregated_bills, pivoted_customer_interactions):
+def _join_raw_features(core_data, aggregated_bills, pivoted_customer_interactions):
     raw_features = core_data.merge(aggregated_bills, on="rating_account_id", how="left").merge(
         pivoted_customer_interactions, on="customer_id", how="left"
     )
 
     # Selecting only the required columns
-    raw_features = raw_features[
-        [
-            "rating_account_id",
-            "customer_id",
-            "age",
-            "contract_lifetime_days",
-            "remaining_binding_days",
-            "has_special_offer",
-            "is_magenta1_customer",
-            "available_gb",
-            "gross_mrc",
-            "smartphone_brand",
-            "has_used_roaming",
-            "used_gb",
-            "has_used_gb",
-            "n_cases",
-            "days_since_last_case",
-            "n_case_produkte&services-tarifdetails",
-            "n_case_produkte&services-tarifwechsel",
-            "n_case_rechnungsanfragen",
-            "n_case_vvl",
-            "days_since_last_case_produkte&services-tarifdetails",
-            "days_since_last_case_produkte&services-tarifwechsel",
-            "days_since_last_case_rechnungsanfragen",
-            "days_since_last_case_vvl",
-        ]
-    ]
+    return raw_features[raw_feature_columns]
 
-    return raw_features
+
+@asset(
+    group_name=group_name,
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
+)
+@profiled(get_asset_profiler)
+def raw_features(config: FeatureEngineConfig, core_data, aggregated_bills, pivoted_customer_interactions):
+    reduction = MemoryReduction()
+    if config.engine == "polars":
+        from . import feature_pipeline
+
+        raw_features = (
+            feature_pipeline.join_raw_features(
+                feature_pipeline.to_lazy(core_data),
+                feature_pipeline.to_lazy(aggregated_bills),
+                feature_pipeline.to_lazy(pivoted_customer_interactions),
+            )
+            .collect()
+            .to_pandas()
+        )
+        raw_features = enforce_schema(raw_features, raw_features_schema, reduction)
+        return Output(raw_features, metadata=reduction.metadata())
+
+    if isinstance(core_data, ParquetDataset):
+        import pandas as pd
+
+        # a left join keeps the rows of core_data, the streamed accounts are joined
+        # batch by batch instead of loading them as a whole first
+        raw_features = pd.concat(
+            [
+                _join_raw_features(batch.to_pandas(), aggregated_bills, pivoted_customer_interactions)
+                for batch in core_data.iter_batches()
+            ],
+            ignore_index=True,
+        )
+    else:
+        raw_features = _join_raw_features(core_data, aggregated_bills, pivoted_customer_interactions)
+    raw_features = enforce_schema(raw_features, raw_features_schema, reduction)
+
+    return Output(raw_features, metadata=reduction.metadata())
 
 
 @asset(
     group_name=group_name,
-    automation_condition=AutomationCondition.eager()
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
 )
-def features(raw_features):
+@profiled(get_asset_profiler)
+# bump the version when feature_pipeline.py or schema.py change the features
+@memoized(get_asset_cache, version="1")
+def features(config: FeatureEngineConfig, raw_features):
     """
     - create perc_used_gb
     - reduce number of categories in smartphone_brand, and introduce Other category
     """
+    import numpy as np
+
+    reduction = MemoryReduction()
+    if config.engine == "polars":
+        from . import feature_pipeline
+
+        features = feature_pipeline.engineer_features(feature_pipeline.to_lazy(raw_features)).collect().to_pandas()
+        features = enforce_schema(features, features_schema, reduction)
+        logger.info("Number of records in the final dataset: %d", len(features))
+        return Output(features, metadata=reduction.metadata())
 
     """
     if available_gb=0, then perc_used_gb=used_gb to enhance the fact
@@ -334,7 +493,7 @@ def features(raw_features):
     to set it to inf is not possible because xgboost will raise an error
     """
     features = raw_features.assign(
-        available_gb=lambda df: df["available_gb"].fillna(0),
+        available_gb=lambda df: df["available_gb"].fillna(0).astype("int8"),
         perc_used_gb=lambda df: np.where(df["available_gb"] != 0, df["used_gb"] / df["available_gb"], df["used_gb"]),
         # Create categories for smartphone_brand
         smartphone_brand=lambda df: np.select(
@@ -353,8 +512,9 @@ def features(raw_features):
     )
     logger.info("Remove customer id")
     features = features.drop("customer_id", axis=1)
+    features = enforce_schema(features, features_schema, reduction)
     # Index will be insterted in the BigQuery table as first column (lower case).
     # But it is not recognised as index in future assets.
     logger.info("Number of records in the final dataset: %d", len(features))
 
-    return features
+    return Output(features, metadata=reduction.metadata())
@@ -0,0 +1,129 @@
+"""
+Successive halving search over XGBoost parameters
+
+Every candidate is trained on the preprocessed training data for a small number of
+boosting rounds, only the best 1/halving_factor of them continue in the next rung
+with halving_factor times more rounds, until one candidate is left. Within a rung
+XGBoost stops a candidate early once its validation AUC stops improving.
+
+Candidates are evaluated in parallel worker processes. The preprocessed matrices
+are written once as .npy files, every worker memory maps them and builds its
+DMatrix once, so the training data is never pickled to the workers.
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+import numpy as np
+import xgboost as xgb
+
+# DMatrices of a worker process by data directory, built on first use
+_dmatrices: dict[str, tuple[xgb.DMatrix, xgb.DMatrix]] = {}
+
+matrix_files = ["X_train", "y_train", "X_valid", "y_valid"]
+
+
+def sample_candidates(rng: np.random.Generator, num_candidates: int) -> list[dict[str, Any]]:
+    """The XGBoost defaults followed by random parameter sets, log-uniform where scale matters."""
+
+    def log_uniform(low: float, high: float) -> float:
+        return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+
+    return [{}] + [
+        {
+            "max_depth": int(rng.integers(3, 11)),
+            "learning_rate": log_uniform(0.01, 0.3),
+            "subsample": float(rng.uniform(0.5, 1.0)),
+            "colsample_bytree": float(rng.uniform(0.5, 1.0)),
+            "min_child_weight": log_uniform(1.0, 10.0),
+            "reg_lambda": log_uniform(0.1, 10.0),
+        }
+        for _ in range(num_candidates - 1)
+    ]
+
+
+def write_matrices(data_dir: str, **matrices: np.ndarray) -> None:
+    for name in matrix_files:
+        np.save(os.path.join(data_dir, f"{name}.npy"), matrices[name])
+
+
+def _load_dmatrices(data_dir: str) -> tuple[xgb.DMatrix, xgb.DMatrix]:
+    if data_dir not in _dmatrices:
+        X_train, y_train, X_valid, y_valid = (
+            np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode="r") for name in matrix_files
+        )
+        _dmatrices[data_dir] = (xgb.DMatrix(X_train, label=y_train), xgb.DMatrix(X_valid, label=y_valid))
+    return _dmatrices[data_dir]
+
+
+def evaluate_candidate(
+    data_dir: str, params: dict[str, Any], num_rounds: int, early_stopping_rounds: int, num_threads: int
+) -> dict[str, float]:
+    """Validation AUC of the candidate and the number of rounds it got there with."""
+    dtrain, dvalid = _load_dmatrices(data_dir)
+    booster = xgb.train(
+        {"objective": "binary:logistic", "eval_metric": "auc", "nthread": num_threads, **params},
+        dtrain,
+        num_boost_round=num_rounds,
+        evals=[(dvalid, "valid")],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False,
+    )
+    return {"auc": float(booster.best_score), "n_estimators": booster.best_iteration + 1}
+
+
+def successive_halving(
+    evaluate: Callable[[list[tuple[dict[str, Any], int]]], list[dict[str, float]]],
+    candidates: list[dict[str, Any]],
+    min_rounds: int,
+    max_rounds: int,
+    halving_factor: int,
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """Returns the parameters of the best candidate and the result of every evaluation."""
+    survivors = list(range(len(candidates)))
+    num_rounds = min_rounds
+    history: list[dict[str, Any]] = []
+    for rung in range(len(candidates)):
+        results = evaluate([(candidates[i], num_rounds) for i in survivors])
+        history += [
+            {"candidate": i, "rung": rung, "num_rounds": num_rounds, **result, **candidates[i]}
+            for i, result in zip(survivors, results, strict=True)
+        ]
+        ranked = sorted(zip(survivors, results, strict=True), key=lambda survivor: -survivor[1]["auc"])
+        if len(ranked) == 1 or num_rounds >= max_rounds:
+            break
+        survivors = [i for i, _ in ranked[: math.ceil(len(ranked) / halving_factor)]]
+        num_rounds = min(num_rounds * halving_factor, max_rounds)
+
+    best, result = ranked[0]
+    return {**candidates[best], "n_estimators": result["n_estimators"]}, history
+
+
+def search(
+    data_dir: str,
+    candidates: list[dict[str, Any]],
+    min_rounds: int,
+    max_rounds: int,
+    halving_factor: int,
+    early_stopping_rounds: int,
+    num_workers: Optional[int] = None,
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    num_cpus = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers or num_cpus, len(candidates)))
+    # workers times XGBoost threads stays within the cores
+    num_threads = max(1, num_cpus // num_workers)
+
+    # spawn, OpenMP (used by XGBoost) is not fork safe
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+
+        def evaluate(evaluations: list[tuple[dict[str, Any], int]]) -> list[dict[str, float]]:
+            futures = [
+                pool.submit(evaluate_candidate, data_dir, params, num_rounds, early_stopping_rounds, num_threads)
+                for params, num_rounds in evaluations
+            ]
+            return [future.result() for future in futures]
+
+        return successive_halving(evaluate, candidates, min_rounds, max_rounds, halving_factor)
@@ -0,0 +1,165 @@
+"""
+Out-of-core training for datasets larger than memory
+
+df_input joins features and label with DuckDB (which spills to disk) straight into
+a Parquet dataset partitioned by split. The split is a hash of rating_account_id,
+so an account always lands in the same split without shuffling anything in
+memory. Training streams the train split in chunks through an XGBoost DataIter
+into an external memory DMatrix: XGBoost writes the preprocessed chunks to cache
+pages in a temporary directory and reads them back page by page while it builds
+the trees (the hist tree method), so no copy of the whole train split is held in
+memory. The test split is scored chunk by chunk as well.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Any, Iterator, Optional, Union
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import xgboost as xgb
+from shared_library.orchestration.parquet_dataset import ParquetDataset, scannable
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from xgboost import XGBClassifier
+
+# stable across processes and DuckDB versions unlike hash(), unsigned unlike md5_number
+split_bucket = "md5_number_lower(CAST(rating_account_id AS VARCHAR)) % 10000"
+
+
+def write_split_dataset(
+    path: str,
+    features: Union[pd.DataFrame, ParquetDataset],
+    label: Union[pd.DataFrame, ParquetDataset],
+    test_size: float,
+) -> ParquetDataset:
+    """Joins features and label into ``path/split=train`` and ``path/split=test``."""
+    shutil.rmtree(path, ignore_errors=True)
+    with duckdb.connect() as connection:
+        connection.register("features", scannable(features))
+        connection.register("label", scannable(label))
+        connection.execute(
+            f"""
+            COPY (
+                SELECT
+                    features.*,
+                    label.has_churned,
+                    CASE WHEN {split_bucket} < {round(test_size * 10000)} THEN 'test' ELSE 'train' END AS split
+                FROM features
+                INNER JOIN label USING (rating_account_id)
+            ) TO '{path}' (FORMAT PARQUET, PARTITION_BY (split))
+            """
+        )
+    return ParquetDataset(path=path, partition_cols=("split",))
+
+
+def split_datasets(dataset: ParquetDataset) -> tuple[ParquetDataset, ParquetDataset]:
+    splits = []
+    for split in ("train", "test"):
+        split_path = os.path.join(dataset.path, f"split={split}")
+        split_dataset = ParquetDataset(path=split_path)
+        splits.append(ParquetDataset(path=split_path, num_rows=split_dataset.dataset().count_rows()))
+    return splits[0], splits[1]
+
+
+def _to_xy(batch: pa.RecordBatch) -> tuple[pd.DataFrame, np.ndarray]:
+    frame = batch.to_pandas()
+    y = frame.pop("has_churned").to_numpy()
+    return frame.set_index("rating_account_id"), y
+
+
+class ParquetBatchIter(xgb.DataIter):
+    """Feeds the preprocessed record batches of a dataset to XGBoost one at a time.
+
+    XGBoost caches the batches as pages on disk below cache_prefix and trains from
+    them, i.e. with the data in external memory.
+    """
+
+    def __init__(self, dataset: ParquetDataset, preprocessor: ColumnTransformer, batch_size: int, cache_prefix: str):
+        self._dataset = dataset
+        self._preprocessor = preprocessor
+        self._batch_size = batch_size
+        self._batches: Optional[Iterator[pa.RecordBatch]] = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self) -> None:
+        self._batches = None
+
+    def next(self, input_data: Any) -> bool:
+        if self._batches is None:
+            self._batches = self._dataset.iter_batches(batch_size=self._batch_size)
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        X, y = _to_xy(batch)
+        input_data(data=self._preprocessor.transform(X), label=y)
+        return True
+
+
+def _distinct_values(dataset: ParquetDataset, column: str) -> set:
+    values: set = set()
+    for batch in dataset.iter_batches(columns=[column]):
+        values.update(pc.unique(batch.column(0)).to_pylist())
+    return values
+
+
+def fit_preprocessor(preprocessor: ColumnTransformer, train_data: ParquetDataset, sample_rows: int) -> None:
+    """Fits on a sample, plus one row per category the sample misses.
+
+    The imputer fills a constant and learns nothing, the one-hot encoder only
+    learns the categories, so this fits the same preprocessor as all rows would.
+    """
+    sample, _ = _to_xy(next(train_data.iter_batches(batch_size=sample_rows)))
+    categorical_columns = [
+        column
+        for _, transformer, columns in preprocessor.transformers
+        if isinstance(transformer, OneHotEncoder)
+        for column in columns
+    ]
+    missing_rows = [
+        sample.iloc[[0]].assign(**{column: value})
+        for column in categorical_columns
+        for value in _distinct_values(train_data, column) - set(sample[column])
+    ]
+    preprocessor.fit(pd.concat([sample, *missing_rows]))
+
+
+def train(
+    pipeline: Pipeline,
+    train_data: ParquetDataset,
+    hyperparameters: dict[str, Any],
+    batch_size: int,
+) -> Pipeline:
+    """Fits the pipeline's preprocessor and XGBClassifier without loading train_data."""
+    (_, preprocessor), (_, classifier) = pipeline.steps
+    fit_preprocessor(preprocessor, train_data, batch_size)
+
+    params = {key: value for key, value in hyperparameters.items() if key != "n_estimators"}
+    with tempfile.TemporaryDirectory(prefix="xgboost-cache-") as cache_dir:
+        batches = ParquetBatchIter(train_data, preprocessor, batch_size, cache_prefix=os.path.join(cache_dir, "train"))
+        booster = xgb.train(
+            # external memory DMatrix are trained with the hist tree method
+            {"objective": "binary:logistic", "tree_method": "hist", **params},
+            xgb.DMatrix(batches),
+            num_boost_round=hyperparameters.get("n_estimators", classifier.n_estimators or 100),
+        )
+    # the sklearn wrapper around the booster, as fit would have returned it
+    trained_classifier = XGBClassifier(**hyperparameters)
+    trained_classifier.load_model(bytearray(booster.save_raw("ubj")))
+    pipeline.steps[-1] = (pipeline.steps[-1][0], trained_classifier)
+    return pipeline
+
+
+def predict(pipeline: Pipeline, test_data: ParquetDataset, batch_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Labels and churn probabilities of test_data, scored chunk by chunk."""
+    y_true, y_prob = [], []
+    for batch in test_data.iter_batches(batch_size=batch_size):
+        X, y = _to_xy(batch)
+        y_true.append(y)
+        y_prob.append(pipeline.predict_proba(X)[:, 1])
+    return np.concatenate(y_true), np.concatenate(y_prob)
@@ -0,0 +1,20 @@
+import os
+
+from dagster import BackfillPolicy, MonthlyPartitionsDefinition
+
+# one partition per billed month, the synthetic bills start in 2024-04
+monthly_partitions = MonthlyPartitionsDefinition(start_date="2024-04-01")
+
+# every partition of a backfill becomes its own run, so the run coordinator
+# (max_concurrent_runs in dagster_docker.yaml) executes them in parallel
+monthly_backfill_policy = BackfillPolicy.multi_run(max_partitions_per_run=1)
+
+# a backfill of the dbt models is one run per partition as well. With
+# DBT_SINGLE_RUN_BACKFILL=true it is a single run instead: process_dbt_assets splits
+# the range into chunks of partitions and runs their dbt invocations in one run
+# (DbtBuildConfig), which saves launching a run per month
+dbt_backfill_policy = (
+    BackfillPolicy.single_run()
+    if os.environ.get("DBT_SINGLE_RUN_BACKFILL", "false").lower() in ("1", "true")
+    else monthly_backfill_policy
+)
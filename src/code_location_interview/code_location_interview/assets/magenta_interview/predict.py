@@ -1,10 +1,28 @@
 import logging
+import os
 import sys
 from datetime import datetime
-import pandas as pd
+from typing import Literal, Optional
 
-from dagster import get_dagster_logger, asset, AutomationCondition
+from dagster import (
+    AssetExecutionContext,
+    AutomationCondition,
+    Config,
+    asset,
+    get_dagster_logger,
+)
+from shared_library.orchestration.parquet_dataset import (
+    dataset_path,
+    write_parquet_dataset,
+)
+from shared_library.orchestration.profiling import profiled
+from shared_library.orchestration.runs import run_started_at
+
+from code_location_interview.resources import get_asset_profiler
+from code_location_interview.resources.duckdb_path import DuckDBPathResource
+from code_location_interview.resources.model_registry import RegisteredModel
 
+from .partitions import monthly_backfill_policy, monthly_partitions
 
 log_fmt = "[%(asctime)s] %(message)s"
 log_datefmt = "%Y-%m-%d %H:%M:%S"
@@ -14,17 +32,133 @@ logger = get_dagster_logger(__name__)
 group_name = "predict"
 
 
+def _score_incrementally(
+    context: AssetExecutionContext,
+    model,
+    deployed_model: RegisteredModel,
+    features,
+    hashes,
+    prediction_store: DuckDBPathResource,
+    score_options: dict,
+):
+    """Scores the accounts that changed since their latest score in the prediction store."""
+    from .prediction_store import PredictionStore
+    from .scoring import score_incrementally
+
+    previous = PredictionStore(prediction_store.file_path).latest_feature_hashes()
+    if len(previous) and not (previous["model_id"] == deployed_model.model_id).any():
+        logger.info(f"The model changed to {deployed_model.model_id}, rescoring every account")
+    batches, num_scored = score_incrementally(model, deployed_model.model_id, features, hashes, previous, **score_options)
+    logger.info(f"Scoring {num_scored} of {len(features)} accounts, carrying the others forward")
+    context.add_output_metadata({"num_scored": num_scored})
+    return batches
+
+
+def _with_hashes(batches, hashes, run_dt: datetime):
+    start = 0
+    for batch in batches:
+        yield batch.assign(feature_hash=hashes[start : start + len(batch)], run_dt=run_dt)
+        start += len(batch)
+
+
+class PredictionsConfig(Config):
+    # rows per predict_proba call, 0 scores all features in one call
+    batch_size: int = 100_000
+    # batches scored concurrently, defaults to the number of cores
+    num_workers: Optional[int] = None
+    # "compiled" scores with a fixed NumPy plan of the fitted preprocessor (see
+    # compiled_inference.py), "sklearn" with the Pipeline, both return identical scores
+    engine: Literal["sklearn", "compiled"] = "compiled"
+    # "thread" shares the model between workers, "process" sends it once to each worker
+    executor: Literal["thread", "process"] = "thread"
+    # write the scored batches to a Parquet dataset as they complete and return a
+    # ParquetDataset handle instead of one DataFrame
+    streaming: bool = False
+    # directory of the Parquet dataset, defaults to <dagster storage>/datasets
+    output_dir: Optional[str] = None
+    # only score accounts whose feature_hash or model changed since their latest score
+    # in the prediction store, carry the others forward; the scores are the same as
+    # with a full rescore
+    incremental: bool = False
+
+
 @asset(
     group_name=group_name,
-    automation_condition=AutomationCondition.eager()
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
 )
-def predictions(features, deployed_model):
-    features = features.set_index("rating_account_id")
-    y_pred = deployed_model.predict_proba(features)[:, 1]
+@profiled(get_asset_profiler)
+def predictions(
+    context: AssetExecutionContext,
+    config: PredictionsConfig,
+    features,
+    deployed_model: RegisteredModel,
+    prediction_store: DuckDBPathResource,
+):
+    # imported here, so loading the code location does not import pandas, sklearn and xgboost
+    import pandas as pd
+
+    from .compiled_inference import CompiledPipeline
+    from .scoring import feature_hashes, score_batches
 
-    predictions_df = pd.DataFrame()
-    predictions_df["rating_account_id"] = features.index
-    predictions_df["churn_risk"] = y_pred
-    predictions_df["run_dt"] = datetime.now()
+    # repeated runs in the same process reuse the deserialized model
+    model = deployed_model.load()
+    if config.engine == "compiled":
+        model = CompiledPipeline(model)
+    # every run stamps its own run_dt, which is why predictions is not memoized
+    run_dt = run_started_at(context)
+    # stored with the scores by prediction_history, the state of the next incremental run
+    hashes = feature_hashes(model, features)
+    score_options = {"batch_size": config.batch_size, "num_workers": config.num_workers, "executor": config.executor}
+
+    if config.incremental:
+        batches = _score_incrementally(context, model, deployed_model, features, hashes, prediction_store, score_options)
+    else:
+        batches = score_batches(model, features, **score_options)
+    scored_batches = _with_hashes(batches, hashes, run_dt)
+
+    if config.streaming:
+        predictions_dataset = write_parquet_dataset(
+            dataset_path(context, os.path.join("predictions", context.partition_key), config.output_dir),
+            scored_batches,
+        )
+        logger.info(f"Wrote {predictions_dataset.num_rows} predictions to {predictions_dataset.path}")
+        return predictions_dataset
+
+    return pd.concat(scored_batches, ignore_index=True)
+
+
+class PredictionHistoryConfig(Config):
+    # compact the store once this many runs were appended since its last compaction,
+    # 0 never compacts (see prediction_store.py)
+    max_uncompacted_runs: int = 4
+
+
+@asset(
+    group_name=group_name,
+    automation_condition=AutomationCondition.eager(),
+    partitions_def=monthly_partitions,
+    backfill_policy=monthly_backfill_policy,
+)
+@profiled(get_asset_profiler)
+def prediction_history(
+    context: AssetExecutionContext,
+    config: PredictionHistoryConfig,
+    prediction_store: DuckDBPathResource,
+    predictions,
+    deployed_model: RegisteredModel,
+) -> None:
+    # appends the scores of every run to the prediction store, which keeps their
+    # history for lookups by rating_account_id. They are stored as the scores of this
+    # run, not of the run that materialized predictions: a retry replaces them, a new
+    # run of an unchanged predictions asset adds a run
+    from .prediction_store import PredictionStore
 
-    return predictions_df
+    store = PredictionStore(prediction_store.file_path)
+    num_rows = store.append(predictions, model_id=deployed_model.model_id, run_dt=run_started_at(context))
+    compacted = config.max_uncompacted_runs > 0 and store.needs_compaction(config.max_uncompacted_runs)
+    if compacted:
+        store.compact()
+    logger.info(f"Stored {num_rows} predictions in {prediction_store.file_path}")
+    context.add_output_metadata({"num_rows": num_rows, "compacted": compacted})
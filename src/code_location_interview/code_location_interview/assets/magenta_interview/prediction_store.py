@@ -0,0 +1,237 @@
+"""
+History of the churn scores of every predictions run in DuckDB
+
+predictions only holds the scores of its latest run. The store keeps all of them:
+
+- predictions has one row per run and account, keyed by run_dt and its run_date,
+  with the hash of the feature vector that was scored (see
+  scoring.feature_hashes). A run is appended in one Arrow scan (no row inserts),
+  sorted by rating_account_id; appending the same run_dt again replaces it
+- runs is the catalog of the appended runs (model_id, rows, compacted or not)
+- latest_predictions holds the latest score of every account. It is a table
+  updated with every append, so reading it costs one row per account instead of a
+  scan of the whole history. Incremental scoring carries these scores forward
+
+Lookups by rating_account_id are served from the min/max zonemaps DuckDB keeps per
+row group. Appended runs are clustered by run date, so every run adds row groups
+spanning all accounts and a lookup reads one of them per run. compact() rewrites
+the history clustered by rating_account_id, which brings a lookup back to the few
+row groups of one account; runs appended later stay clustered by run date until
+the next compaction.
+"""
+
+import contextlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+from shared_library.orchestration.duckdb_file import connect
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+# compact once this many runs were appended since the last compaction
+max_uncompacted_runs = 4
+
+_score_columns = "run_date DATE, run_dt TIMESTAMP, model_id VARCHAR, rating_account_id INTEGER, churn_risk FLOAT"
+_tables = {
+    "predictions": _score_columns,
+    "latest_predictions": _score_columns,
+    "runs": "run_dt TIMESTAMP, run_date DATE, model_id VARCHAR, num_rows BIGINT, appended_at TIMESTAMP, compacted BOOLEAN",
+}
+# columns added after the first version of the store, added to existing files on connect
+_added_columns = {
+    "predictions": {"feature_hash": "UBIGINT"},
+    "latest_predictions": {"feature_hash": "UBIGINT"},
+}
+_latest_per_account = "qualify row_number() over (partition by rating_account_id order by run_dt desc) = 1"
+
+
+def _arrow(predictions: Union[pd.DataFrame, ParquetDataset]) -> Any:
+    # DuckDB scans Arrow tables and datasets without copying them row by row
+    if isinstance(predictions, ParquetDataset):
+        return predictions.dataset()
+    return pa.Table.from_pandas(predictions, preserve_index=False)
+
+
+def _account_filter(rating_account_ids: Optional[Iterable[int]]) -> str:
+    if rating_account_ids is None:
+        return "true"
+    # literal ids are pruned with the zonemaps, ints can't inject anything
+    ids = [str(int(rating_account_id)) for rating_account_id in rating_account_ids]
+    return f"rating_account_id in ({', '.join(ids)})" if ids else "false"
+
+
+class PredictionStore:
+    """Scores of every predictions run in the DuckDB file at path.
+
+    Every call opens its own connection (see duckdb_file.connect), so runs in
+    other processes can use the file in between. Opening the file takes longer
+    than a lookup, so many lookups share one connection inside a with block::
+
+        with PredictionStore(path) as store:
+            scores = [store.latest([rating_account_id]) for rating_account_id in ...]
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._con = None
+
+    def __enter__(self) -> "PredictionStore":
+        self._con = connect(self.path)
+        self._create_tables(self._con)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._con.close()
+        self._con = None
+
+    @staticmethod
+    def _create_tables(con) -> None:
+        for table, columns in _tables.items():
+            con.execute(f"create table if not exists {table} ({columns})")
+        for table, columns in _added_columns.items():
+            for name, kind in columns.items():
+                con.execute(f"alter table {table} add column if not exists {name} {kind}")
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[Any]:
+        if self._con is not None:
+            yield self._con
+            return
+        with connect(self.path) as con:
+            self._create_tables(con)
+            yield con
+
+    def append(
+        self,
+        predictions: Union[pd.DataFrame, ParquetDataset],
+        model_id: Optional[str] = None,
+        run_dt: Optional[datetime] = None,
+    ) -> int:
+        """Stores the scores of predictions (rating_account_id, churn_risk, run_dt).
+
+        A run_dt that is already stored is replaced. model_id is the model that
+        scored them, the feature_hash column of predictions is stored if it has one.
+        run_dt stores them all as the run of run_dt instead of their run_dt column.
+        """
+        scores = _arrow(predictions)
+        feature_hash = "feature_hash" if "feature_hash" in scores.schema.names else "null"
+        stamped_run_dt = "run_dt" if run_dt is None else f"cast('{pd.Timestamp(run_dt).isoformat()}' as TIMESTAMP)"
+        with self._connect() as con:
+            con.begin()
+            con.register("scores", scores)
+            con.execute(f"create temporary view new_scores as select * replace ({stamped_run_dt} as run_dt) from scores")
+            con.execute("create temporary table new_run_dts as select distinct run_dt from new_scores")
+            (replaced_rows,) = con.execute(
+                "delete from predictions where run_dt in (select run_dt from new_run_dts)"
+            ).fetchone()
+            con.execute("delete from runs where run_dt in (select run_dt from new_run_dts)")
+            (num_rows,) = con.execute(
+                f"""
+                insert into predictions (run_date, run_dt, model_id, rating_account_id, churn_risk, feature_hash)
+                select cast(run_dt as DATE), run_dt, ?, rating_account_id, churn_risk, {feature_hash}
+                from new_scores
+                order by run_dt, rating_account_id
+                """,
+                [model_id],
+            ).fetchone()
+            con.execute(
+                """
+                insert into runs
+                select run_dt, cast(run_dt as DATE), ?, count(*), now(), false
+                from new_scores
+                group by run_dt
+                """,
+                [model_id],
+            )
+            if replaced_rows:
+                # the replaced scores may be the latest of accounts the new run lacks
+                latest = f"select * from predictions {_latest_per_account}"
+            else:
+                latest = f"""
+                select * from (
+                    select * from latest_predictions
+                    union all
+                    select * from predictions where run_dt in (select run_dt from new_run_dts)
+                )
+                {_latest_per_account}
+                """
+            con.execute(f"create or replace table latest_predictions as {latest} order by rating_account_id")
+            con.execute("drop table new_run_dts")
+            con.execute("drop view new_scores")
+            con.unregister("scores")
+            con.commit()
+        return num_rows
+
+    def runs(self) -> pd.DataFrame:
+        """run_dt, run_date, model_id, num_rows, appended_at and compacted of every run, in order."""
+        with self._connect() as con:
+            return con.sql("select * from runs order by run_dt").df()
+
+    def needs_compaction(self, max_uncompacted_runs: int = max_uncompacted_runs) -> bool:
+        with self._connect() as con:
+            (uncompacted_runs,) = con.sql("select count(*) from runs where not compacted").fetchone()
+        return uncompacted_runs >= max_uncompacted_runs
+
+    def compact(self) -> None:
+        """Rewrites the history clustered by rating_account_id, then run_dt."""
+        with self._connect() as con:
+            con.begin()
+            con.execute("create or replace table predictions as select * from predictions order by rating_account_id, run_dt")
+            con.execute("update runs set compacted = true")
+            con.commit()
+            # frees the blocks of the old table for later appends
+            con.execute("checkpoint")
+
+    def latest(self, rating_account_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """The latest score of the given accounts (all by default), by rating_account_id."""
+        with self._connect() as con:
+            return con.sql(
+                f"""
+                select rating_account_id, churn_risk, run_dt, run_date, model_id
+                from latest_predictions
+                where {_account_filter(rating_account_ids)}
+                order by rating_account_id
+                """
+            ).df()
+
+    def latest_feature_hashes(self) -> pd.DataFrame:
+        """rating_account_id, churn_risk, feature_hash and model_id of the latest scores with a hash."""
+        with self._connect() as con:
+            return con.sql(
+                """
+                select rating_account_id, churn_risk, feature_hash, model_id
+                from latest_predictions
+                where feature_hash is not null
+                """
+            ).df()
+
+    def history(
+        self,
+        rating_account_ids: Iterable[int],
+        since: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Every score of the given accounts (from run date since on), by account and run_dt.
+
+        churn_risk_change is the change since the previous score of the account,
+        missing for its first score.
+        """
+        with self._connect() as con:
+            history = con.execute(
+                f"""
+                select
+                    rating_account_id,
+                    run_dt,
+                    run_date,
+                    model_id,
+                    churn_risk,
+                    churn_risk - lag(churn_risk) over (partition by rating_account_id order by run_dt) as churn_risk_change
+                from predictions
+                where {_account_filter(rating_account_ids)}
+                order by rating_account_id, run_dt
+                """
+            ).df()
+        if since is not None:
+            # after the change is computed, so the first score since has its change too
+            history = history[history["run_date"] >= pd.Timestamp(since)].reset_index(drop=True)
+        return history
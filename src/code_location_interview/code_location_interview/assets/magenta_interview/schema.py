@@ -0,0 +1,125 @@
+"""
+Columns and compact dtypes of the churn datasets
+
+Kept free of pandas and polars, so the asset definitions can import them without
+loading a frame library. The dtypes are enforced at the boundary of every asset
+with shared_library.orchestration.frame_schema.enforce_schema:
+
+- flags are booleans, "boolean" where a left join leaves them missing
+- counts and days are the narrowest int that holds their range, nullable ("Int8")
+  where they can be missing
+- strings with few distinct values are categories (a list of them), i.e. dictionary
+  encoded in Parquet
+- customer_id is the integer code of "<prefix>.<suffix>", see generators.py
+
+features is the input of the model, so it only uses numpy dtypes: sklearn stacks
+them into one float matrix, flags and nullable columns would turn it into objects.
+"""
+
+smartphone_brands = ["iPhone", "Samsung", "Huawei", "Xiaomi", "OnePlus"]
+# smartphone_brand of features, fewer categories with an Other category
+smartphone_brand_features = ["Samsung", "Huawei, Xiaomi", "Other"]
+
+type_subtypes = [
+    "produkte&services-tarifdetails",
+    "produkte&services-tarifwechsel",
+    "rechnungsanfragen",
+    "vvl",
+]
+n_case_columns = [f"n_case_{type_subtype}" for type_subtype in type_subtypes]
+days_since_last_case_columns = [f"days_since_last_case_{type_subtype}" for type_subtype in type_subtypes]
+
+raw_feature_columns = [
+    "rating_account_id",
+    "customer_id",
+    "age",
+    "contract_lifetime_days",
+    "remaining_binding_days",
+    "has_special_offer",
+    "is_magenta1_customer",
+    "available_gb",
+    "gross_mrc",
+    "smartphone_brand",
+    "has_used_roaming",
+    "used_gb",
+    "has_used_gb",
+    "n_cases",
+    "days_since_last_case",
+    *n_case_columns,
+    *days_since_last_case_columns,
+]
+
+core_data_schema = {
+    # the random walk of generators.py keeps the ids below 2 million
+    "rating_account_id": "int32",
+    "customer_id": "int64",
+    "age": "int8",
+    "contract_lifetime_days": "int16",
+    "remaining_binding_days": "int16",
+    "has_special_offer": "bool",
+    "is_magenta1_customer": "bool",
+    "available_gb": "Int8",
+    "gross_mrc": "float64",
+    "smartphone_brand": smartphone_brands,
+}
+
+bills_schema = {
+    "rating_account_id": "int32",
+    # one month per partition
+    "billed_period_month_d": "category",
+    "has_used_roaming": "bool",
+    # sums of float32 would differ from the sums of the billed values
+    "used_gb": "float64",
+    "has_used_gb": "bool",
+}
+
+aggregated_bills_schema = {
+    "rating_account_id": "int32",
+    "has_used_roaming": "bool",
+    "used_gb": "float64",
+    "has_used_gb": "bool",
+}
+
+customer_interactions_schema = {
+    "customer_id": "int64",
+    "type_subtype": type_subtypes,
+    "n": "int8",
+    "days_since_last": "int16",
+}
+
+pivoted_customer_interactions_schema = {
+    "customer_id": "int64",
+    "n_cases": "int8",
+    "days_since_last_case": "int16",
+    **dict.fromkeys(n_case_columns, "int8"),
+    **dict.fromkeys(days_since_last_case_columns, "Int16"),
+}
+
+raw_features_schema = {
+    **core_data_schema,
+    # accounts without bills or interactions in the window
+    "has_used_roaming": "boolean",
+    "used_gb": "float64",
+    "has_used_gb": "boolean",
+    "n_cases": "Int8",
+    "days_since_last_case": "Int16",
+    **dict.fromkeys(n_case_columns, "Int8"),
+    **dict.fromkeys(days_since_last_case_columns, "Int16"),
+}
+
+features_schema = {
+    **{name: dtype for name, dtype in core_data_schema.items() if name != "customer_id"},
+    "has_special_offer": "int8",
+    "is_magenta1_customer": "int8",
+    # missing values are filled with 0
+    "available_gb": "int8",
+    "smartphone_brand": smartphone_brand_features,
+    # float32 holds the small integers and NaN of the nullable columns exactly
+    "has_used_roaming": "float32",
+    "has_used_gb": "float32",
+    "n_cases": "float32",
+    "days_since_last_case": "float32",
+    **dict.fromkeys(n_case_columns, "float32"),
+    **dict.fromkeys(days_since_last_case_columns, "float32"),
+    "perc_used_gb": "float64",
+}
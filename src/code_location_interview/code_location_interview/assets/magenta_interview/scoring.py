@@ -0,0 +1,203 @@
+"""
+Batched, parallel scoring of the churn model
+
+The features are cut into row batches which are scored concurrently on a thread or
+process pool. Only a bounded number of batches is in flight at any time and the
+scored batches are yielded in input order, so callers can stream them into their
+output without holding every prediction in memory.
+
+Incremental scoring only scores the accounts whose feature vector changed since
+their previous score by the same model, i.e. between two weekly refreshes of the
+features, and carries the previous scores of the others forward. A score is a
+function of the model and the feature vector alone, so the scores are the same as
+those of scoring every account.
+"""
+
+import copy
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from .compiled_inference import CompiledPipeline
+
+# the model of a process pool worker, set once per worker by _init_worker
+_worker_model: Any = None
+
+
+def feature_columns(model: Any, features: pd.DataFrame) -> list[str]:
+    # the pipeline was fitted on the features indexed by rating_account_id
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        return list(names)
+    return [column for column in features.columns if column != "rating_account_id"]
+
+
+def limit_model_threads(model: Any, num_threads: int) -> Any:
+    """A copy of model whose XGBoost uses num_threads per predict call (n_jobs / nthread).
+
+    The model itself is left alone, it is shared with every other user of the
+    deployed model in the process (see RegisteredModel.load).
+    """
+    if isinstance(model, CompiledPipeline):
+        limited = copy.copy(model)
+        limited.booster = model.booster.copy()
+        limited.booster.set_param({"nthread": num_threads})
+        return limited
+    limited = copy.deepcopy(model)
+    for _, step in getattr(limited, "steps", [(None, limited)]):
+        if "n_jobs" in step.get_params(deep=False):
+            step.set_params(n_jobs=num_threads)
+    return limited
+
+
+def predict_batch(model: Any, batch: pd.DataFrame) -> np.ndarray:
+    return model.predict_proba(batch)[:, 1]
+
+
+def _init_worker(model: Any) -> None:
+    global _worker_model
+    _worker_model = model
+
+
+def _predict_batch_in_worker(batch: pd.DataFrame) -> np.ndarray:
+    return predict_batch(_worker_model, batch)
+
+
+def _ordered_map(
+    executor: Executor, fn: Callable, items: Iterable, max_in_flight: int
+) -> Iterator:
+    # Executor.map submits every item up front, this keeps at most max_in_flight
+    # batches (and their results) alive
+    in_flight: deque[Future] = deque()
+    for item in items:
+        in_flight.append(executor.submit(fn, item))
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def _executor(
+    model: Any, executor: Literal["thread", "process"], num_workers: int
+) -> tuple[Executor, Callable[[pd.DataFrame], np.ndarray]]:
+    if executor == "process":
+        # spawn, OpenMP (used by XGBoost) is not fork safe; the model is sent once per worker
+        pool = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model,),
+        )
+        return pool, _predict_batch_in_worker
+    return ThreadPoolExecutor(max_workers=num_workers), partial(predict_batch, model)
+
+
+def score_batches(
+    model: Any,
+    features: pd.DataFrame,
+    batch_size: int = 100_000,
+    num_workers: Optional[int] = None,
+    executor: Literal["thread", "process"] = "thread",
+    rows: Optional[np.ndarray] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yields ``rating_account_id`` and ``churn_risk`` per batch of ``features``, in order.
+
+    ``num_workers`` batches are scored concurrently and XGBoost gets
+    ``cpu_count // num_workers`` threads per batch, so the two levels of
+    parallelism together use every core without oversubscribing them. ``rows``
+    scores only the rows at these positions, without copying them out first.
+    """
+    columns = feature_columns(model, features)
+    rows = np.arange(len(features)) if rows is None else rows
+    batch_size = batch_size if batch_size > 0 else max(1, len(rows))
+    starts = range(0, len(rows), batch_size)
+    num_cpus = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers or num_cpus, len(starts)))
+    model = limit_model_threads(model, max(1, num_cpus // num_workers))
+
+    rating_account_ids = features["rating_account_id"].to_numpy()
+    batches = (features.iloc[rows[start : start + batch_size]][columns] for start in starts)
+    pool, predict = _executor(model, executor, num_workers)
+    with pool:
+        scored = _ordered_map(pool, predict, batches, max_in_flight=2 * num_workers)
+        for start, churn_risk in zip(starts, scored, strict=True):
+            yield pd.DataFrame(
+                {
+                    "rating_account_id": rating_account_ids[rows[start : start + batch_size]],
+                    "churn_risk": churn_risk,
+                }
+            )
+
+
+def feature_hashes(model: Any, features: pd.DataFrame) -> np.ndarray:
+    """A uint64 hash of the feature vector of every row, of the columns the model uses."""
+    # categoricals hash their values, not their codes
+    return pd.util.hash_pandas_object(features[feature_columns(model, features)], index=False).to_numpy()
+
+
+def _merged_batches(
+    rating_account_ids: np.ndarray,
+    previous_churn_risk: np.ndarray,
+    positions: np.ndarray,
+    unchanged: np.ndarray,
+    rescored: Iterator[pd.DataFrame],
+    batch_size: int,
+) -> Iterator[pd.DataFrame]:
+    # the rescored rows come in the order of the changed rows, every batch takes the
+    # ones of its changed rows and keeps the rest for the next batches
+    pending = np.empty(0, dtype=np.float32)
+    for start in range(0, len(rating_account_ids), batch_size):
+        batch_changed = ~unchanged[start : start + batch_size]
+        num_changed = int(batch_changed.sum())
+        while len(pending) < num_changed:
+            pending = np.concatenate([pending, next(rescored)["churn_risk"].to_numpy()])
+        # the precision of predict_proba and of the stored scores
+        churn_risk = previous_churn_risk[positions[start : start + batch_size]].astype(np.float32)
+        churn_risk[batch_changed], pending = pending[:num_changed], pending[num_changed:]
+        yield pd.DataFrame(
+            {
+                "rating_account_id": rating_account_ids[start : start + batch_size],
+                "churn_risk": churn_risk,
+            }
+        )
+
+
+def score_incrementally(
+    model: Any,
+    model_id: str,
+    features: pd.DataFrame,
+    hashes: np.ndarray,
+    previous: pd.DataFrame,
+    batch_size: int = 100_000,
+    **score_options: Any,
+) -> tuple[Iterator[pd.DataFrame], int]:
+    """Batches of ``rating_account_id`` and ``churn_risk`` like score_batches, and the rows scored.
+
+    ``previous`` has the previous ``churn_risk``, ``feature_hash`` and ``model_id`` of
+    accounts (one row per ``rating_account_id``). Accounts with a previous score of
+    ``model_id`` for the same hash keep it, the others (new accounts, changed
+    features, scores of another model) are scored with score_batches. Rescored and
+    carried forward rows are merged batch by batch, in the order of ``features``.
+    """
+    positions = pd.Index(previous["rating_account_id"]).get_indexer(features["rating_account_id"])
+    known = positions >= 0
+    unchanged = np.zeros(len(features), dtype=bool)
+    unchanged[known] = (previous["feature_hash"].to_numpy()[positions[known]] == hashes[known]) & (
+        previous["model_id"].to_numpy()[positions[known]] == model_id
+    )
+    changed = np.flatnonzero(~unchanged)
+    rescored = score_batches(model, features, batch_size=batch_size, rows=changed, **score_options)
+
+    # new accounts (position -1) pick the trailing nan, which their rescored score replaces
+    previous_churn_risk = np.append(previous["churn_risk"].to_numpy(), np.nan)
+    batch_size = batch_size if batch_size > 0 else max(1, len(features))
+    batches = _merged_batches(
+        features["rating_account_id"].to_numpy(), previous_churn_risk, positions, unchanged, rescored, batch_size
+    )
+    return batches, len(changed)
@@ -0,0 +1,93 @@
+"""
+Pivot of customer_interactions on integer codes, used by the pandas engine
+
+A pandas pivot builds a MultiIndex frame through set_index/unstack, reduces it
+across axes and flattens the column names in Python. The pivot here works on
+integer codes instead: customers are factorized to rows, type_subtypes are the
+codes of the categorical column, so every interaction is one cell of a
+(customers x type_subtypes) matrix. n is summed into its cells with a bincount,
+days_since_last is scattered into them (np.minimum.at where a cell repeats). Both
+are linear in the number of interactions, customers are ranked with a counting sort over their id range.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .schema import days_since_last_case_columns, n_case_columns, type_subtypes
+
+# days_since_last of a cell without an interaction, larger than any real value
+_no_case = np.iinfo(np.int16).max
+# customer ids spanning up to this many ids per interaction are ranked with a
+# counting sort over their range (5 bytes per id of the range), sparser ids are
+# factorized with a hash table; generated customer ids span about 8 per interaction
+_max_ids_per_interaction = 16
+
+
+def _customer_rows(customer_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The row of every interaction and the sorted unique customer ids."""
+    if len(customer_ids) == 0:
+        return np.zeros(0, dtype=np.int64), customer_ids
+    low = customer_ids.min()
+    offsets = customer_ids - low
+    span = int(offsets.max()) + 1
+    if span > _max_ids_per_interaction * len(customer_ids):
+        # sort=True only sorts the unique customers
+        rows, unique_customer_ids = pd.factorize(customer_ids, sort=True)
+        return rows, unique_customer_ids
+    # linear in the interactions and the id range, a hash table with a sort of the
+    # unique customers takes several times longer for millions of them
+    present = np.zeros(span, dtype=bool)
+    present[offsets] = True
+    rank = np.cumsum(present, dtype=np.int64 if span > np.iinfo(np.int32).max else np.int32) - 1
+    return rank[offsets], np.flatnonzero(present) + low
+
+
+def pivot_customer_interactions(customer_interactions: pd.DataFrame) -> pd.DataFrame:
+    """n and days_since_last per customer and type_subtype, sorted by customer_id.
+
+    Same frame as a pivot of customer_interactions: n_case_<type_subtype> is 0 and
+    days_since_last_case_<type_subtype> missing for type_subtypes without a case,
+    n_cases sums and days_since_last_case is the minimum over all type_subtypes.
+    Repeated (customer, type_subtype) rows are summed (n) and reduced to their
+    minimum (days_since_last).
+    """
+    rows, customer_ids = _customer_rows(customer_interactions["customer_id"].to_numpy())
+    type_subtype = customer_interactions["type_subtype"]
+    if not (isinstance(type_subtype.dtype, pd.CategoricalDtype) and list(type_subtype.cat.categories) == type_subtypes):
+        type_subtype = type_subtype.astype(pd.CategoricalDtype(type_subtypes))
+    codes = type_subtype.cat.codes.to_numpy()
+    if (codes < 0).any():
+        raise ValueError(f"type_subtype has values outside of {type_subtypes}")
+
+    num_customers, num_type_subtypes = len(customer_ids), len(type_subtypes)
+    cells = rows.astype(np.int64) * num_type_subtypes + codes
+
+    num_cells = num_customers * num_type_subtypes
+
+    n = (
+        np.bincount(cells, weights=customer_interactions["n"].to_numpy(), minlength=num_cells)
+        .astype(np.int64)
+        .reshape(num_customers, num_type_subtypes)
+    )
+    days_since_last = np.full(num_cells, _no_case, dtype=np.int16)
+    if np.bincount(cells, minlength=num_cells).max(initial=0) <= 1:
+        # every cell has at most one interaction (as generated), a plain scatter is
+        # ten times faster than np.minimum.at
+        days_since_last[cells] = customer_interactions["days_since_last"].to_numpy()
+    else:
+        np.minimum.at(days_since_last, cells, customer_interactions["days_since_last"].to_numpy())
+    days_since_last = days_since_last.reshape(num_customers, num_type_subtypes)
+    no_case = days_since_last == _no_case
+
+    columns = {
+        # the asset narrows the counts with enforce_schema, which checks their range
+        **{column: n[:, i] for i, column in enumerate(n_case_columns)},
+        **{
+            column: pd.arrays.IntegerArray(days_since_last[:, i].copy(), no_case[:, i].copy())
+            for i, column in enumerate(days_since_last_case_columns)
+        },
+        "n_cases": n.sum(axis=1),
+        # every customer has at least one case
+        "days_since_last_case": days_since_last.min(axis=1),
+    }
+    return pd.DataFrame(columns, index=pd.Index(customer_ids, name="customer_id"))
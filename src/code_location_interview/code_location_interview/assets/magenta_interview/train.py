@@ -1,14 +1,37 @@
 import logging
 import sys
+import tempfile
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal, Optional
 
-from dagster import get_dagster_logger, AutomationCondition, AssetOut, Output, asset, multi_asset
-from sklearn.model_selection import train_test_split
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OneHotEncoder
-from xgboost import XGBClassifier
-from sklearn.metrics import precision_score, recall_score, f1_score, roc_auc_score
+from dagster import (
+    AssetExecutionContext,
+    AssetIn,
+    AssetOut,
+    AutomationCondition,
+    Config,
+    LastPartitionMapping,
+    MetadataValue,
+    Output,
+    asset,
+    get_dagster_logger,
+    multi_asset,
+)
+from shared_library.orchestration.memoize import memoized
+from shared_library.orchestration.parquet_dataset import (
+    ParquetDataset,
+    as_pandas,
+    dataset_path,
+)
+from shared_library.orchestration.profiling import profiled
+
+from code_location_interview.resources import get_asset_cache, get_asset_profiler
+
+# sklearn, xgboost and the hyperparameter_search/out_of_core modules are imported in
+# the asset bodies, so loading the code location does not import them
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
 
 
 log_fmt = "[%(asctime)s] %(message)s"
@@ -19,12 +42,36 @@ logger = get_dagster_logger(__name__)
 group_name = "training"
 
 
+class TrainingDataConfig(Config):
+    # "in_memory" merges and splits pandas frames, "out_of_core" joins features and
+    # label with DuckDB into an on-disk Parquet dataset and splits it by a hash of
+    # rating_account_id (see out_of_core.py), for data larger than memory
+    mode: Literal["in_memory", "out_of_core"] = "in_memory"
+    # share of the accounts in the test split of the out_of_core mode
+    test_size: float = 0.2
+    # directory of the out_of_core dataset, defaults to <dagster storage>/datasets
+    output_dir: Optional[str] = None
+
+
 @asset(
     group_name=group_name,
-    automation_condition=AutomationCondition.on_cron("0 1 8-14,22-28 * 1")
+    automation_condition=AutomationCondition.on_cron("0 1 8-14,22-28 * 1"),
+    # train on the features of the latest month, the Parquet IO manager hands over
+    # file handles so the out_of_core mode never loads them
+    ins={
+        "features": AssetIn(partition_mapping=LastPartitionMapping(), metadata={"lazy": True}),
+        "label": AssetIn(metadata={"lazy": True}),
+    },
 )
-def df_input(features, label):
-    inputs = features.merge(label, on="rating_account_id")
+@profiled(get_asset_profiler)
+def df_input(context: AssetExecutionContext, config: TrainingDataConfig, features, label):
+    if config.mode == "out_of_core":
+        from . import out_of_core
+
+        path = dataset_path(context, "df_input", config.output_dir)
+        return out_of_core.write_split_dataset(path, features, label, config.test_size)
+
+    inputs = as_pandas(features).merge(as_pandas(label), on="rating_account_id")
     return inputs
 
 
@@ -39,15 +86,27 @@ def df_input(features, label):
         ),
     }
 )
+@profiled(get_asset_profiler)
 def split_train_test(df_input):
+    from sklearn.model_selection import train_test_split
+
+    if isinstance(df_input, ParquetDataset):
+        from . import out_of_core
+
+        return out_of_core.split_datasets(df_input)
+
     train_data, test_data = train_test_split(df_input, test_size=0.2, random_state=42, stratify=df_input["has_churned"])
     return train_data, test_data
 
 
-@asset(group_name=group_name, automation_condition=AutomationCondition.eager())
-def trained_model(train_data, test_data):
+def build_pipeline(columns, classifier: "XGBClassifier") -> "Pipeline":
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
     # Dynamically select columns to impute
-    columns_to_impute = [col for col in train_data.columns if col.startswith("n_case") or col.startswith("days_since_last_case")]
+    columns_to_impute = [col for col in columns if col.startswith("n_case") or col.startswith("days_since_last_case")]
 
     # Define imputation for numeric columns
     imputer = SimpleImputer(strategy="constant", fill_value=0)
@@ -70,17 +129,105 @@ def trained_model(train_data, test_data):
     )
 
     # Define the complete pipeline
-    pipeline = Pipeline(
+    return Pipeline(
         [
             ("preprocessing", preprocessor),
-            ("classifier", XGBClassifier()),
+            ("classifier", classifier),
         ]
     )
 
+
+class HyperparameterSearchConfig(Config):
+    # parameter sets to try, the first are the XGBoost defaults; the default 1 skips
+    # the search, so trained_model keeps the baseline parameters unless it is enabled
+    num_candidates: int = 1
+    # boosting rounds of the first successive halving rung, every rung keeps the best
+    # 1/halving_factor candidates and trains them halving_factor times longer
+    min_rounds: int = 25
+    max_rounds: int = 500
+    halving_factor: int = 3
+    # a candidate stops once its validation AUC did not improve for this many rounds
+    early_stopping_rounds: int = 20
+    # share of train_data held out to compare candidates, test_data stays untouched
+    validation_size: float = 0.2
+    # worker processes, defaults to the number of cores
+    num_workers: Optional[int] = None
+    seed: int = 42
+    # rows of an out_of_core train_data the search runs on
+    max_rows: int = 1_000_000
+
+
+@asset(group_name=group_name, automation_condition=AutomationCondition.eager())
+@profiled(get_asset_profiler)
+def tuned_hyperparameters(context: AssetExecutionContext, config: HyperparameterSearchConfig, train_data) -> dict:
+    if config.num_candidates <= 1:
+        return {}
+    import numpy as np
+    from sklearn.model_selection import train_test_split
+    from xgboost import XGBClassifier
+
+    from . import hyperparameter_search
+
+    if isinstance(train_data, ParquetDataset):
+        train_data = train_data.dataset().head(config.max_rows).to_pandas()
+
+    search_data, valid_data = train_test_split(
+        train_data, test_size=config.validation_size, random_state=config.seed, stratify=train_data["has_churned"]
+    )
+    y_search = search_data.pop("has_churned")
+    y_valid = valid_data.pop("has_churned")
+    preprocessor = build_pipeline(search_data.columns, XGBClassifier()).steps[0][1]
+    X_search = preprocessor.fit_transform(search_data.set_index("rating_account_id"))
+    X_valid = preprocessor.transform(valid_data.set_index("rating_account_id"))
+
+    candidates = hyperparameter_search.sample_candidates(np.random.default_rng(config.seed), config.num_candidates)
+    with tempfile.TemporaryDirectory() as data_dir:
+        hyperparameter_search.write_matrices(
+            data_dir,
+            X_train=X_search.astype(np.float32),
+            y_train=y_search.to_numpy(np.float32),
+            X_valid=X_valid.astype(np.float32),
+            y_valid=y_valid.to_numpy(np.float32),
+        )
+        best, evaluations = hyperparameter_search.search(
+            data_dir,
+            candidates,
+            min_rounds=config.min_rounds,
+            max_rounds=config.max_rounds,
+            halving_factor=config.halving_factor,
+            early_stopping_rounds=config.early_stopping_rounds,
+            num_workers=config.num_workers,
+        )
+
+    final_rung = evaluations[-1]["rung"]
+    best_auc = max(evaluation["auc"] for evaluation in evaluations if evaluation["rung"] == final_rung)
+    logger.info(f"Best of {len(candidates)} candidates: {best} with validation AUC {best_auc:.4f}")
+    context.add_output_metadata({
+        "best_validation_auc": best_auc,
+        "num_evaluations": len(evaluations),
+        "candidates": MetadataValue.json(evaluations),
+    })
+    return best
+
+
+@dataclass(frozen=True)
+class TrainedModel:
+    """The fitted Pipeline and its metrics on the test split, registered together by model_candidates."""
+
+    pipeline: "Pipeline"
+    metrics: dict[str, float]
+
+
+class TrainedModelConfig(Config):
+    # rows per chunk streamed to XGBoost when train_data is an out_of_core dataset
+    batch_size: int = 500_000
+
+
+def _train_in_memory(pipeline: "Pipeline", train_data, test_data):
     # Separate target variable
     y_train = train_data.pop("has_churned")
     train_data = train_data.set_index("rating_account_id")
-     
+
     y_test = test_data.pop("has_churned")
     test_data = test_data.set_index("rating_account_id")
 
@@ -91,6 +238,36 @@ def trained_model(train_data, test_data):
     y_pred = trained_model.predict(test_data)
     # Predicted probabilities
     y_prob = trained_model.predict_proba(test_data)[:, 1]
+    return trained_model, y_test, y_pred, y_prob
+
+
+def _train_out_of_core(config: TrainedModelConfig, pipeline: "Pipeline", train_data: ParquetDataset, test_data: ParquetDataset, hyperparameters: dict):
+    from . import out_of_core
+
+    trained_model = out_of_core.train(pipeline, train_data, hyperparameters, config.batch_size)
+    y_test, y_prob = out_of_core.predict(trained_model, test_data, config.batch_size)
+    # XGBClassifier.predict of a binary classifier
+    y_pred = (y_prob > 0.5).astype(int)
+    return trained_model, y_test, y_pred, y_prob
+
+
+@asset(group_name=group_name, automation_condition=AutomationCondition.eager())
+@profiled(get_asset_profiler)
+# bump the version when build_pipeline or out_of_core.py change the trained model
+@memoized(get_asset_cache, version="3")
+def trained_model(config: TrainedModelConfig, train_data, test_data, tuned_hyperparameters: dict):
+    from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+    from xgboost import XGBClassifier
+
+    if isinstance(train_data, ParquetDataset):
+        # Define the complete pipeline
+        pipeline = build_pipeline(train_data.dataset().schema.names, XGBClassifier(**tuned_hyperparameters))
+        trained_model, y_test, y_pred, y_prob = _train_out_of_core(config, pipeline, train_data, test_data, tuned_hyperparameters)
+    else:
+        # Define the complete pipeline
+        pipeline = build_pipeline(train_data.columns, XGBClassifier(**tuned_hyperparameters))
+        trained_model, y_test, y_pred, y_prob = _train_in_memory(pipeline, train_data, test_data)
+
     # Metrics calculation
     metrics = {
         "precision_score": float(precision_score(y_test, y_pred)),
@@ -98,5 +275,8 @@ def trained_model(train_data, test_data):
         "f1_score": float(f1_score(y_test, y_pred)),
         "roc_auc_score": float(roc_auc_score(y_test, y_prob)),
     }
-    return Output(value=trained_model, metadata={**metrics})
-
+    return Output(
+        value=TrainedModel(pipeline=trained_model, metrics=metrics),
+        # one key, the floats @profiled adds to the metadata are not model metrics
+        metadata={"metrics": MetadataValue.json(metrics), "hyperparameters": MetadataValue.json(tuned_hyperparameters)},
+    )
@@ -0,0 +1,401 @@
+"""Benchmark of the magenta_interview asset graph at several dataset sizes.
+
+Materializes core_data through predictions in-process with ``materialize()`` and
+records the wall time, peak RSS and bytes written of every step, i.e. of every
+asset (multi assets like core_data are one step). Every dataset size runs in a
+fresh interpreter, so the RSS of one size does not carry over into the next::
+
+    python -m code_location_interview.benchmark --rows 100000 1000000 10000000
+    python -m code_location_interview.benchmark --rows 100000 --baseline <earlier>.json
+
+The results are written as JSON. Worker processes (hyperparameter search, the
+process executor of predictions) are not part of the RSS of the run.
+
+The results also time the definition of a ``@dbt_assets`` of a synthetic manifest
+(``--dbt-models``, 0 skips it) with the translator's manifest index and with every
+answer derived again, i.e. the cost of loading a large dbt project, and the
+seconds per predict_proba call of the compiled inference plan against the fitted
+Pipeline at several batch sizes (``--inference-rows``, 0 skips it).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from collections import Counter
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Optional
+from unittest import mock
+
+from dagster import (
+    AssetKey,
+    DagsterEventType,
+    DagsterInstance,
+    build_asset_context,
+    file_relative_path,
+    load_assets_from_modules,
+    materialize,
+)
+from shared_library.orchestration.dbt_translator import build_DbtTranslator
+from shared_library.orchestration.profiling import RssSampler
+
+from code_location_interview.assets.magenta_interview import (
+    deployment,
+    get_data,
+    predict,
+    train,
+)
+from code_location_interview.assets.magenta_interview.partitions import (
+    monthly_partitions,
+)
+from code_location_interview.resources.duckdb_path import DuckDBPathResource
+from code_location_interview.resources.model_registry import ModelRegistry
+from code_location_interview.resources.parquet_io_manager import ParquetIOManager
+
+BENCHMARK_DIR = file_relative_path(__file__, "../../../dagster_runs/benchmarks")
+
+default_num_rows = [100_000, 1_000_000, 10_000_000]
+default_num_dbt_models = 5000
+default_num_inference_rows = 10_000
+default_inference_batch_sizes = (1, 100, 10_000)
+
+
+def benchmark_run_config(num_rows: int, seed: int, num_candidates: int) -> dict:
+    generator_config = {"config": {"seed": seed}}
+    return {
+        "ops": {
+            "core_data": {"config": {"num_rows": num_rows, "seed": seed}},
+            "bills": generator_config,
+            "customer_interactions": generator_config,
+            "tuned_hyperparameters": {"config": {"num_candidates": num_candidates}},
+        }
+    }
+
+
+def _measure_step_event(steps: dict[str, dict[str, Any]], step_starts: dict[str, float], record: Any, rss: RssSampler) -> None:
+    event = record.dagster_event
+    if event.event_type == DagsterEventType.STEP_START:
+        step_starts[event.step_key] = record.timestamp
+        steps[event.step_key] = {"assets": [], "bytes_written": 0}
+    elif event.event_type == DagsterEventType.ASSET_MATERIALIZATION:
+        materialization = event.event_specific_data.materialization
+        steps[event.step_key]["assets"].append(materialization.asset_key.to_user_string())
+        bytes_written = materialization.metadata.get("bytes_written")
+        steps[event.step_key]["bytes_written"] += bytes_written.value if bytes_written else 0
+    elif event.event_type == DagsterEventType.STEP_SUCCESS:
+        step_start = step_starts[event.step_key]
+        steps[event.step_key]["wall_seconds"] = record.timestamp - step_start
+        steps[event.step_key]["peak_rss_bytes"] = rss.peak(step_start, record.timestamp)
+
+
+def _step_measurements(instance: DagsterInstance, run_id: str, rss: RssSampler) -> dict[str, dict[str, Any]]:
+    """Assets, bytes written, wall time and peak RSS of every step of the run, from its event log."""
+    step_starts: dict[str, float] = {}
+    steps: dict[str, dict[str, Any]] = {}
+    for record in instance.all_logs(run_id):
+        if record.dagster_event is not None and record.dagster_event.step_key is not None:
+            _measure_step_event(steps, step_starts, record, rss)
+    return steps
+
+
+def run_benchmark(num_rows: int, seed: int = 42, num_candidates: int = 1) -> dict[str, Any]:
+    """Materializes the graph once with num_rows rating accounts and measures every step."""
+    assets = [
+        assets_def
+        for assets_def in load_assets_from_modules([get_data, train, deployment, predict])
+        # appends to a store outside of the run, not part of computing the predictions
+        if AssetKey("prediction_history") not in assets_def.keys
+    ]
+    with (
+        tempfile.TemporaryDirectory() as storage,
+        DagsterInstance.ephemeral() as instance,
+        # every run computes all assets, memoized outputs of earlier runs are not reused
+        mock.patch.dict(os.environ, {"ASSET_CACHE_MAX_BYTES": "0"}),
+    ):
+        resources = {
+            "io_manager": ParquetIOManager(base_path=os.path.join(storage, "parquet")),
+            "model_registry": ModelRegistry(base_path=os.path.join(storage, "models")),
+            # read by incremental predictions only
+            "prediction_store": DuckDBPathResource(file_path=os.path.join(storage, "prediction_store.duckdb")),
+        }
+        start = time.time()
+        with RssSampler() as rss:
+            result = materialize(
+                assets,
+                resources=resources,
+                run_config=benchmark_run_config(num_rows, seed, num_candidates),
+                # training reads the features of the latest month
+                partition_key=monthly_partitions.get_last_partition_key(),
+                instance=instance,
+            )
+        wall_seconds = time.time() - start
+        if not result.success:
+            raise RuntimeError(f"The benchmark run of {num_rows} rows failed")
+
+        steps = _step_measurements(instance, result.run_id, rss)
+
+    return {
+        "num_rows": num_rows,
+        "wall_seconds": wall_seconds,
+        "peak_rss_bytes": max(sample for _, sample in rss.samples),
+        "steps": steps,
+    }
+
+
+def scaling_report(runs: list[dict[str, Any]], baseline: Optional[dict[str, Any]] = None) -> str:
+    """Seconds per step and size, with the factor over linear scaling from the previous size.
+
+    A factor well above 1 marks the step that stops scaling first. With a baseline,
+    the ratio to the baseline run of the same size follows.
+    """
+    baseline_runs = {run["num_rows"]: run for run in (baseline or {}).get("runs", [])}
+    lines = []
+    for step in runs[0]["steps"]:
+        cells = []
+        for previous, run in itertools.pairwise([None, *runs]):
+            seconds = run["steps"][step]["wall_seconds"]
+            cell = f"{run['num_rows']:>10,}: {seconds:8.2f}s"
+            if previous is not None:
+                linear = previous["steps"][step]["wall_seconds"] * run["num_rows"] / previous["num_rows"]
+                cell += f" x{seconds / linear:5.2f} of linear"
+            baseline_step = baseline_runs.get(run["num_rows"], {}).get("steps", {}).get(step)
+            if baseline_step:
+                cell += f" x{seconds / baseline_step['wall_seconds']:5.2f} of baseline"
+            cells.append(cell)
+        lines.append(f"{step:<30} " + " | ".join(cells))
+    return "\n".join(lines)
+
+
+def synthetic_dbt_manifest(num_models: int) -> dict:
+    """A dbt manifest of a chain of models, every model also depends on the model at half its index."""
+    nodes, parent_map, child_map = {}, {}, {}
+    for i in range(num_models):
+        name = f"model_{i}"
+        unique_id = f"model.interview.{name}"
+        parents = [f"model.interview.model_{j}" for j in sorted({i - 1, i // 2}) if 0 <= j < i]
+        nodes[unique_id] = {
+            "unique_id": unique_id,
+            "name": name,
+            "resource_type": "model",
+            "package_name": "interview",
+            "database": "analytics_database_dev",
+            "schema": "bar_dev",
+            "alias": name,
+            "path": f"feature_pipeline/{name}.sql",
+            "original_file_path": f"models/feature_pipeline/{name}.sql",
+            "fqn": ["interview", "feature_pipeline", name],
+            "config": {"enabled": True, "materialized": "table", "tags": [], "meta": {}, "group": None},
+            "checksum": {"name": "sha256", "checksum": str(i)},
+            "columns": {"rating_account_id": {"name": "rating_account_id", "description": "", "meta": {}, "data_type": None, "tags": []}},
+            "depends_on": {"nodes": parents, "macros": []},
+            "relation_name": f'"analytics_database_dev"."bar_dev"."{name}"',
+            "raw_code": "select 1",
+            "description": "",
+            "tags": [],
+            "meta": {},
+            "group": None,
+        }
+        parent_map[unique_id] = parents
+        child_map[unique_id] = []
+        for parent in parents:
+            child_map[parent].append(unique_id)
+    return {
+        "metadata": {"project_name": "interview", "adapter_type": "duckdb"},
+        "nodes": nodes,
+        "sources": {},
+        "parent_map": parent_map,
+        "child_map": child_map,
+        **{key: {} for key in ("macros", "docs", "exposures", "metrics", "groups", "selectors", "disabled", "group_map", "saved_queries", "semantic_models", "unit_tests")},
+    }
+
+
+AsciiDbtTranslator = build_DbtTranslator("duckdb_bar", "ascii")
+
+
+class DerivingDbtTranslator(AsciiDbtTranslator):
+    """Derives every answer again, like the translator did before its manifest index."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.derived: Counter = Counter()
+
+    def _lookup(self, dbt_resource_props):
+        self.derived[dbt_resource_props["unique_id"]] += 1
+        return self._index(dbt_resource_props)
+
+
+def run_translator_benchmark(num_models: int = default_num_dbt_models) -> dict[str, Any]:
+    """Seconds to define a @dbt_assets of num_models models, with and without the index."""
+    from dagster_dbt import dbt_assets
+
+    manifest = synthetic_dbt_manifest(num_models)
+    seconds = {}
+    for name, build_translator in (
+        ("derived_seconds", DerivingDbtTranslator),
+        ("indexed_seconds", lambda: AsciiDbtTranslator(manifest=manifest)),
+    ):
+        start = time.perf_counter()
+
+        @dbt_assets(manifest=manifest, dagster_dbt_translator=build_translator())
+        def synthetic_models(context): ...
+
+        seconds[name] = time.perf_counter() - start
+    return {"num_models": num_models, **seconds}
+
+
+def _trained_pipeline(num_rows: int, seed: int) -> tuple[Any, Any]:
+    """The features of num_rows accounts, indexed by rating_account_id, and a model trained on them."""
+    generator_config = {"config": {"seed": seed}}
+    with mock.patch.dict(os.environ, {"ASSET_CACHE_MAX_BYTES": "0"}):
+        result = materialize(
+            [
+                get_data.core_data,
+                get_data.label,
+                get_data.bills,
+                get_data.aggregated_bills,
+                get_data.customer_interactions,
+                get_data.pivoted_customer_interactions,
+                get_data.raw_features,
+                get_data.features,
+            ],
+            run_config={
+                "ops": {
+                    "core_data": {"config": {"num_rows": num_rows, "seed": seed}},
+                    "bills": generator_config,
+                    "customer_interactions": generator_config,
+                }
+            },
+            partition_key=monthly_partitions.get_last_partition_key(),
+        )
+        features = result.output_for_node("features")
+        inputs = train.df_input(build_asset_context(), train.TrainingDataConfig(), features, result.output_for_node("label"))
+        train_data, test_data = train.split_train_test(inputs)
+        trained_model = train.trained_model(train.TrainedModelConfig(), train_data, test_data, {}).value
+    return features.set_index("rating_account_id"), trained_model.pipeline
+
+
+def run_inference_benchmark(
+    num_rows: int = default_num_inference_rows,
+    batch_sizes: tuple[int, ...] = default_inference_batch_sizes,
+    seed: int = 42,
+) -> dict[str, Any]:
+    """Seconds per predict_proba call of the Pipeline and of its CompiledPipeline, per batch size.
+
+    Every call is timed as the best of five repeats, the scores of both are checked
+    to be identical first.
+    """
+    import numpy as np
+
+    from code_location_interview.assets.magenta_interview.compiled_inference import (
+        CompiledPipeline,
+    )
+
+    features, pipeline = _trained_pipeline(num_rows, seed)
+    engines = {"sklearn": pipeline, "compiled": CompiledPipeline(pipeline)}
+    if not np.array_equal(engines["sklearn"].predict_proba(features), engines["compiled"].predict_proba(features)):
+        raise RuntimeError("The compiled pipeline scores differ from the Pipeline")
+
+    batches = []
+    for batch_size in batch_sizes:
+        batch = features.head(batch_size)
+        # about a second of calls per engine for the smallest batches
+        number = max(1, 1000 // batch_size)
+        seconds = {
+            f"{name}_seconds": min(timeit.repeat(partial(model.predict_proba, batch), number=number, repeat=5)) / number
+            for name, model in engines.items()
+        }
+        batches.append({"batch_size": len(batch), **seconds, "speedup": seconds["sklearn_seconds"] / seconds["compiled_seconds"]})
+    return {"num_rows": num_rows, "batches": batches}
+
+
+def _run_isolated(num_rows: int, seed: int, num_candidates: int) -> dict[str, Any]:
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-W",
+            "ignore",
+            "-m",
+            "code_location_interview.benchmark",
+            "--single-run",
+            "--rows",
+            str(num_rows),
+            "--seed",
+            str(seed),
+            "--num-candidates",
+            str(num_candidates),
+        ],
+        # the errors of a failing run show up in the terminal
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    ).stdout
+    # the last line, logging of the run goes to stdout as well
+    return json.loads(output.splitlines()[-1])
+
+
+def _component_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    components = {}
+    if args.dbt_models > 0:
+        components["dbt_translator"] = run_translator_benchmark(args.dbt_models)
+    if args.inference_rows > 0:
+        components["inference"] = run_inference_benchmark(args.inference_rows, seed=args.seed)
+    return components
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=default_num_rows, help="rating accounts per run")
+    parser.add_argument("--seed", type=int, default=42)
+    # 1 skips the hyperparameter search, it runs in worker processes and scales on its own
+    parser.add_argument("--num-candidates", type=int, default=1)
+    parser.add_argument("--dbt-models", type=int, default=default_num_dbt_models, help="models of the translator benchmark")
+    parser.add_argument(
+        "--inference-rows", type=int, default=default_num_inference_rows, help="rating accounts of the inference benchmark"
+    )
+    parser.add_argument("--output", help="JSON file of the results, defaults to dagster_runs/benchmarks")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare with")
+    parser.add_argument("--single-run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single_run:
+        print(json.dumps(run_benchmark(args.rows[0], args.seed, args.num_candidates)))
+        return {}
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "num_candidates": args.num_candidates,
+        "runs": [_run_isolated(num_rows, args.seed, args.num_candidates) for num_rows in args.rows],
+    }
+    components = _component_benchmarks(args)
+    results.update(components)
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, f"benchmark-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(scaling_report(results["runs"], baseline))
+    for component in components.values():
+        print(json.dumps(component))
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
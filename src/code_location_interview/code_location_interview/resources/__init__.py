@@ -1,17 +1,32 @@
+import json
+import os
+from functools import cache
 from pathlib import Path
 
 from dagster import file_relative_path, get_dagster_logger
 from dagster_dbt import DbtCliResource, DbtProject
+from shared_library.orchestration.memoize import AssetCache
+from shared_library.orchestration.profiling import AssetProfiler
 from shared_library.orchestration.resources.utils import (
     get_dagster_deployment_environment,
 )
 
 from .duckdb_path import DuckDBPathResource
+from .model_registry import ModelRegistry
+from .parquet_io_manager import ParquetIOManager
 
 DBT_PROJECT_DIR = file_relative_path(__file__, "../../code_location_interview_dbt")
 
 
-def get_dbt_project(target: str, DBT_PROJECT_DIR: str):
+# dbt target of every dagster deployment
+dbt_target_by_deployment_name = {
+    "dev": "dev",
+    "prod": "prod",
+}
+
+
+@cache
+def get_dbt_project(target: str, DBT_PROJECT_DIR: str = DBT_PROJECT_DIR) -> DbtProject:
     # dbt_project_path = Path(__file__).parent.parent.joinpath("dbt_project")
     dbt_project = DbtProject(
         project_dir=DBT_PROJECT_DIR,
@@ -19,24 +34,56 @@ def get_dbt_project(target: str, DBT_PROJECT_DIR: str):
         # state_path="target/slim_ci",
         target=target,
     )
-    dbt_project.prepare_if_dev()
+    # both targets write target/manifest.json, so only the target of this
+    # deployment is parsed, once per process
+    if target == dbt_target_by_deployment_name[get_dagster_deployment_environment()]:
+        dbt_project.prepare_if_dev()
     return dbt_project
 
 
+@cache
+def load_dbt_manifest(DBT_PROJECT_DIR: str = DBT_PROJECT_DIR) -> dict:
+    """The parsed manifest of this deployment's target, shared by all dbt asset definitions."""
+    target = dbt_target_by_deployment_name[get_dagster_deployment_environment()]
+    with open(get_dbt_project(target, DBT_PROJECT_DIR).manifest_path) as f:
+        return json.load(f)
+
+
+# manifests of the last successful dbt builds, the state of DbtBuildConfig.only_modified
+# runs (see shared_library.orchestration.dbt_translator)
+DBT_STATE_PATHS = {
+    "dev": file_relative_path(__file__, "../../../../dagster_runs/dbt_state"),
+    "prod": "/opt/dagster/local_artifact_storage/dbt_state",
+}
+
 dbt_resource_dev = DbtCliResource(
-    project_dir=get_dbt_project(target="dev", DBT_PROJECT_DIR=DBT_PROJECT_DIR),
+    project_dir=DBT_PROJECT_DIR,
     global_config_flags=["--no-use-colors"],
     target="dev",
+    state_path=os.environ.get("DBT_STATE_PATH", DBT_STATE_PATHS["dev"]),
 )
 
 dbt_resource_prod = DbtCliResource(
-    project_dir=get_dbt_project(target="prod", DBT_PROJECT_DIR=DBT_PROJECT_DIR),
+    project_dir=DBT_PROJECT_DIR,
     global_config_flags=["--no-use-colors"],
     target="prod",
+    state_path=os.environ.get("DBT_STATE_PATH", DBT_STATE_PATHS["prod"]),
 )
 
 RESOURCES_LOCAL = {
     "dbt": dbt_resource_dev,
+    "io_manager": ParquetIOManager(
+        base_path=os.environ.get(
+            "PARQUET_IO_MANAGER_BASE_PATH",
+            file_relative_path(__file__, "../../../../dagster_runs/parquet"),
+        )
+    ),
+    "model_registry": ModelRegistry(
+        base_path=os.environ.get(
+            "MODEL_REGISTRY_PATH",
+            file_relative_path(__file__, "../../../../trained_models"),
+        )
+    ),
     "ddb": DuckDBPathResource(
         file_path=str(
             Path(
@@ -46,10 +93,34 @@ RESOURCES_LOCAL = {
             .resolve()
         )
     ),
+    # point-in-time history of the churn datasets, see assets/magenta_interview/feature_store.py
+    "feature_store": DuckDBPathResource(
+        file_path=os.environ.get(
+            "FEATURE_STORE_PATH",
+            file_relative_path(__file__, "../../../../dagster_runs/feature_store.duckdb"),
+        )
+    ),
+    # scores of every predictions run, see assets/magenta_interview/prediction_store.py
+    "prediction_store": DuckDBPathResource(
+        file_path=os.environ.get(
+            "PREDICTION_STORE_PATH",
+            file_relative_path(__file__, "../../../../dagster_runs/prediction_store.duckdb"),
+        )
+    ),
 }
 
 RESOURCES_PROD = {
     "dbt": dbt_resource_prod,
+    "io_manager": ParquetIOManager(
+        base_path=os.environ.get(
+            "PARQUET_IO_MANAGER_BASE_PATH", "/opt/dagster/local_artifact_storage/parquet"
+        )
+    ),
+    "model_registry": ModelRegistry(
+        base_path=os.environ.get(
+            "MODEL_REGISTRY_PATH", "/opt/dagster/local_artifact_storage/trained_models"
+        )
+    ),
     "ddb": DuckDBPathResource(
         file_path=str(
             Path(
@@ -57,6 +128,28 @@ RESOURCES_PROD = {
             )
         )
     ),
+    "feature_store": DuckDBPathResource(
+        file_path=os.environ.get(
+            "FEATURE_STORE_PATH", "/opt/dagster/local_artifact_storage/feature_store.duckdb"
+        )
+    ),
+    "prediction_store": DuckDBPathResource(
+        file_path=os.environ.get(
+            "PREDICTION_STORE_PATH", "/opt/dagster/local_artifact_storage/prediction_store.duckdb"
+        )
+    ),
+}
+
+# outputs of memoized assets, see shared_library.orchestration.memoize
+ASSET_CACHE_DIRS = {
+    "dev": file_relative_path(__file__, "../../../../dagster_runs/asset_cache"),
+    "prod": "/opt/dagster/local_artifact_storage/asset_cache",
+}
+
+# profiles of profiled assets, see shared_library.orchestration.profiling
+ASSET_PROFILE_DIRS = {
+    "dev": file_relative_path(__file__, "../../../../dagster_runs/profiles"),
+    "prod": "/opt/dagster/local_artifact_storage/profiles",
 }
 
 resource_defs_by_deployment_name = {
@@ -71,3 +164,27 @@ def get_resources_for_deployment(log_env: bool = True):
         get_dagster_logger().info(f"Using deployment of: {deployment_name}")
 
     return resource_defs_by_deployment_name[deployment_name]
+
+
+def get_asset_cache() -> AssetCache:
+    # read on every call, so runs (and tests) can point it elsewhere or disable it
+    # with ASSET_CACHE_MAX_BYTES=0
+    return AssetCache(
+        path=os.environ.get(
+            "ASSET_CACHE_DIR", ASSET_CACHE_DIRS[get_dagster_deployment_environment()]
+        ),
+        max_bytes=int(os.environ.get("ASSET_CACHE_MAX_BYTES", 10 * 2**30)),
+    )
+
+
+def get_asset_profiler() -> AssetProfiler:
+    # ASSET_PROFILER=cprofile|pyinstrument profiles every run of the deployment, the
+    # asset_profiler run tag a single run
+    return AssetProfiler(
+        path=os.environ.get(
+            "ASSET_PROFILE_DIR", ASSET_PROFILE_DIRS[get_dagster_deployment_environment()]
+        ),
+        profiler=os.environ.get("ASSET_PROFILER") or None,
+        trace_allocations=os.environ.get("ASSET_TRACE_ALLOCATIONS", "false").lower()
+        in ("1", "true"),
+    )
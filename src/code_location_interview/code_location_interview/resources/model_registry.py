@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from dagster import ConfigurableResource
+
+# sklearn and xgboost are imported when a model is loaded or registered, not when
+# the code location defines the resource
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+booster_file = "booster.ubj"
+preprocessor_file = "preprocessor.pickle"
+index_file = "registry.sqlite"
+# loaded pipelines kept per process, i.e. for repeated scoring runs and the service
+loaded_models_cache_size = 8
+
+index_schema = """
+CREATE TABLE IF NOT EXISTS models (
+    model_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    lineage TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_created_at ON models (created_at);
+CREATE TABLE IF NOT EXISTS metrics (
+    model_id TEXT NOT NULL REFERENCES models (model_id),
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (model_id, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_name_value ON metrics (name, value);
+"""
+
+
+@dataclass(frozen=True)
+class RegisteredModel:
+    """Handle to a model in the registry, cheap to pass between assets."""
+
+    model_id: str
+    path: str
+    created_at: str
+    metrics: dict[str, float] = field(default_factory=dict)
+    lineage: dict[str, Any] = field(default_factory=dict)
+
+    def load(self) -> "Pipeline":
+        return _load_model(self.path)
+
+
+@lru_cache(maxsize=loaded_models_cache_size)
+def _load_model(path: str) -> "Pipeline":
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
+
+    # artifacts are content addressed and never change, caching by path is safe
+    with open(os.path.join(path, preprocessor_file), "rb") as f:
+        steps, classifier_name = pickle.load(f)
+    classifier = XGBClassifier()
+    classifier.load_model(os.path.join(path, booster_file))
+    return Pipeline([*steps, (classifier_name, classifier)])
+
+
+def _save_artifacts(model: "Pipeline", path: str) -> str:
+    """Writes the booster as UBJSON and the preprocessing steps as pickle, returns their hash."""
+    *steps, (classifier_name, classifier) = model.steps
+    classifier.save_model(os.path.join(path, booster_file))
+    with open(os.path.join(path, preprocessor_file), "wb") as f:
+        pickle.dump((steps, classifier_name), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    content_hash = hashlib.sha256()
+    for file_name in (booster_file, preprocessor_file):
+        with open(os.path.join(path, file_name), "rb") as f:
+            content_hash.update(f.read())
+    return content_hash.hexdigest()[:16]
+
+
+class ModelRegistry(ConfigurableResource):
+    """Local registry of trained models.
+
+    Every model is stored once below ``base_path/<model_id>``, where the id is the
+    hash of its artifacts: the XGBoost booster in its native UBJSON format and the
+    fitted preprocessing steps of the Pipeline. A SQLite index next to them holds
+    the metrics and lineage of every model, so the latest or best model is found
+    without touching the artifacts.
+    """
+
+    base_path: str
+
+    @contextmanager
+    def _index(self) -> Iterator[sqlite3.Connection]:
+        os.makedirs(self.base_path, exist_ok=True)
+        with closing(sqlite3.connect(os.path.join(self.base_path, index_file))) as connection:
+            connection.executescript(index_schema)
+            with connection:
+                yield connection
+
+    def register(
+        self,
+        model: "Pipeline",
+        metrics: Optional[dict[str, float]] = None,
+        lineage: Optional[dict[str, Any]] = None,
+    ) -> RegisteredModel:
+        """Stores the model unless the same artifacts were registered before."""
+        os.makedirs(self.base_path, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.base_path, prefix=".staging-")
+        try:
+            model_id = _save_artifacts(model, staging)
+            if not os.path.exists(self._model_path(model_id)):
+                os.replace(staging, self._model_path(model_id))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        with self._index() as index:
+            index.execute(
+                "INSERT OR IGNORE INTO models VALUES (?, ?, ?)",
+                (model_id, datetime.now(timezone.utc).isoformat(), json.dumps(lineage or {})),
+            )
+            index.executemany(
+                "INSERT OR IGNORE INTO metrics VALUES (?, ?, ?)",
+                [(model_id, name, float(value)) for name, value in (metrics or {}).items()],
+            )
+        return self.get(model_id)
+
+    def _model_path(self, model_id: str) -> str:
+        return os.path.join(self.base_path, model_id)
+
+    def get(self, model_id: str) -> RegisteredModel:
+        with self._index() as index:
+            return self._registered_model(index, "SELECT * FROM models WHERE model_id = ?", (model_id,))
+
+    def latest(self) -> RegisteredModel:
+        with self._index() as index:
+            return self._registered_model(index, "SELECT * FROM models ORDER BY created_at DESC LIMIT 1")
+
+    def best(self, metric: str = "roc_auc_score", higher_is_better: bool = True) -> RegisteredModel:
+        order = "DESC" if higher_is_better else "ASC"
+        with self._index() as index:
+            return self._registered_model(
+                index,
+                f"""
+                SELECT models.*
+                FROM metrics
+                INNER JOIN models ON metrics.model_id = models.model_id
+                WHERE metrics.name = ?
+                ORDER BY metrics.value {order}, models.created_at DESC
+                LIMIT 1
+                """,
+                (metric,),
+            )
+
+    def model_ids(self) -> list[str]:
+        """Ids of all registered models, oldest first."""
+        with self._index() as index:
+            return [row[0] for row in index.execute("SELECT model_id FROM models ORDER BY created_at")]
+
+    def _registered_model(
+        self, index: sqlite3.Connection, query: str, parameters: tuple = ()
+    ) -> RegisteredModel:
+        row = index.execute(query, parameters).fetchone()
+        if row is None:
+            raise LookupError(f"No registered model in {self.base_path} matches {parameters or 'the query'}")
+        model_id, created_at, lineage = row
+        metrics = index.execute("SELECT name, value FROM metrics WHERE model_id = ?", (model_id,))
+        return RegisteredModel(
+            model_id=model_id,
+            path=self._model_path(model_id),
+            created_at=created_at,
+            metrics=dict(metrics.fetchall()),
+            lineage=json.loads(lineage),
+        )
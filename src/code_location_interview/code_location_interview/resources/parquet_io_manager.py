@@ -0,0 +1,160 @@
+import os
+import pickle
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+from dagster import ConfigurableIOManager, InputContext, OutputContext
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+# the frame libraries are imported on the first output, not when the resource is defined
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+class ParquetIOManager(ConfigurableIOManager):
+    """Stores pandas, polars and Arrow outputs as Parquet files.
+
+    Every asset (partition) is one file below ``base_path`` which can be queried
+    directly, e.g. ``select * from read_parquet('<base_path>/core_data.parquet')`` in
+    DuckDB. Downstream assets can project columns with
+    ``AssetIn(metadata={"columns": [...]})``, files are memory mapped and inputs
+    annotated as ``pl.DataFrame`` or ``pa.Table`` are handed over without copying.
+    ``AssetIn(metadata={"lazy": True})`` hands over a ParquetDataset handle of the
+    file instead, for assets which stream it in chunks.
+    All other outputs (models, lists, dataset handles) fall back to pickle. A run
+    of a partition range returns ``{partition_key: value}`` and stores a file per
+    partition, like it is loaded.
+    """
+
+    base_path: str
+
+    def _base(self, context: OutputContext | InputContext) -> str:
+        return os.path.join(self.base_path, *context.asset_key.path)
+
+    def _paths(
+        self, context: OutputContext | InputContext, extension: str
+    ) -> dict[Optional[str], str]:
+        base = self._base(context)
+        if context.has_asset_partitions:
+            return {
+                partition_key: os.path.join(base, f"{partition_key}{extension}")
+                for partition_key in context.asset_partition_keys
+            }
+        return {None: base + extension}
+
+    def _existing_paths(
+        self, context: InputContext, extension: str
+    ) -> dict[Optional[str], str]:
+        # same flag as dagster's UPathIOManager, i.e. for rolling windows with gaps
+        paths = self._paths(context, extension)
+        if (context.definition_metadata or {}).get("allow_missing_partitions", False):
+            return {key: path for key, path in paths.items() if os.path.exists(path)}
+        return paths if all(os.path.exists(path) for path in paths.values()) else {}
+
+    def handle_output(self, context: OutputContext, obj: Any) -> None:
+        if obj is None:
+            return
+
+        values = self._partition_values(context, obj)
+        written = [self._write(context, partition_key, value) for partition_key, value in values.items()]
+        num_rows = [rows for _, rows in written if rows is not None]
+        if num_rows:
+            context.add_output_metadata({"num_rows": sum(num_rows)})
+        context.add_output_metadata(
+            {
+                "path": written[0][0] if len(written) == 1 else self._base(context),
+                "bytes_written": sum(os.path.getsize(path) for path, _ in written),
+            }
+        )
+
+    def _partition_values(self, context: OutputContext, obj: Any) -> dict[Optional[str], Any]:
+        """The value of every partition of the output, one file is written per partition."""
+        partition_keys = list(self._paths(context, ".parquet"))
+        if len(partition_keys) == 1:
+            return {partition_keys[0]: obj}
+        # a partition range is returned as {partition_key: value} like UPathIOManager
+        if not isinstance(obj, dict) or set(obj) != set(partition_keys):
+            asset = context.asset_key.to_user_string()
+            raise ValueError(
+                f"{asset} ran for the partition range {partition_keys[0]}...{partition_keys[-1]},"
+                " return a dict of a value per partition key to store it"
+            )
+        return obj
+
+    def _write(self, context: OutputContext, partition_key: Optional[str], obj: Any) -> tuple[str, Optional[int]]:
+        """Writes the value of one partition, returns its path and rows (None for pickles)."""
+        table = _to_arrow(obj)
+        extension, stale_extension = (
+            (".parquet", ".pickle") if table is not None else (".pickle", ".parquet")
+        )
+        path = self._paths(context, extension)[partition_key]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if table is not None:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        else:
+            with open(path, "wb") as f:
+                pickle.dump(obj, f)
+
+        # the output type of an asset can change between runs, i.e. streaming mode
+        stale_path = self._paths(context, stale_extension)[partition_key]
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+        return path, table.num_rows if table is not None else None
+
+    def load_input(self, context: InputContext) -> Any:
+        paths = self._existing_paths(context, ".parquet")
+        if not paths:
+            return self._load_pickle(context)
+
+        import polars as pl
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        definition_metadata = context.definition_metadata or {}
+        if definition_metadata.get("lazy", False) and len(paths) == 1:
+            (path,) = paths.values()
+            return ParquetDataset(path=path, num_rows=pq.read_metadata(path).num_rows)
+
+        columns: Optional[Sequence[str]] = definition_metadata.get("columns")
+        # several partitions are read as one table
+        table = pq.ParquetDataset(list(paths.values()), memory_map=True).read(
+            columns=list(columns) if columns is not None else None,
+            use_pandas_metadata=True,
+        )
+
+        typing_type = context.dagster_type.typing_type
+        if typing_type is pa.Table:
+            return table
+        if typing_type is pl.DataFrame:
+            return pl.from_arrow(table)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _load_pickle(self, context: InputContext) -> Any:
+        paths = self._existing_paths(context, ".pickle") or self._paths(
+            context, ".pickle"
+        )
+        objs = {}
+        for key, path in paths.items():
+            with open(path, "rb") as f:
+                objs[key] = pickle.load(f)
+        # a partition range is returned as {partition_key: value} like UPathIOManager
+        if context.has_asset_partitions and len(context.asset_partition_keys) > 1:
+            return objs
+        (obj,) = objs.values()
+        return obj
+
+
+def _to_arrow(obj: Any) -> Optional["pa.Table"]:
+    import pandas as pd
+    import polars as pl
+    import pyarrow as pa
+
+    if isinstance(obj, pd.DataFrame):
+        return pa.Table.from_pandas(obj)
+    if isinstance(obj, pl.DataFrame):
+        return obj.to_arrow()
+    if isinstance(obj, pa.Table):
+        return obj
+    return None
@@ -0,0 +1,43 @@
+"""
+Serves the deployed model over HTTP
+
+    python -m code_location_interview.serving --registry trained_models --select best
+
+uvicorn is a dependency of the codelocation-interview environment.
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+from ..assets.magenta_interview.deployment import DeployedModelConfiguration
+from ..resources.model_registry import ModelRegistry
+from .service import ScoringService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Online churn scoring service")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY_PATH", "trained_models"), help="base path of the model registry")
+    parser.add_argument("--model-id", help="registered model to serve, as in DeployedModelConfiguration")
+    parser.add_argument("--select", choices=["latest", "best"], default="latest", help="model to serve without --model-id")
+    parser.add_argument("--metric", default="roc_auc_score", help="metric of --select best")
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled", help="see compiled_inference.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=1024, help="rows per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="how long a micro-batch collects requests")
+    args = parser.parse_args()
+
+    service = ScoringService.from_config(
+        ModelRegistry(base_path=args.registry),
+        DeployedModelConfiguration(model_id=args.model_id, select=args.select, metric=args.metric),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        engine=args.engine,
+    )
+    uvicorn.run(service, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load generator for the scoring service
+
+Replays rows of a features Parquet file (e.g. written by the ParquetIOManager) as
+concurrent requests and prints client side and server side latencies as JSON.
+
+    python -m code_location_interview.serving.load_generator \
+        dagster_runs/parquet/features/2024-07-01.parquet --concurrency 32
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+def _request(url: str, data: bytes | None = None) -> Any:
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def _payloads(features_path: str, num_requests: int, rows_per_request: int) -> list[bytes]:
+    features = pd.read_parquet(features_path)
+    rows = json.loads(features.to_json(orient="records"))
+    payloads = []
+    for i in range(num_requests):
+        start = (i * rows_per_request) % len(rows)
+        chunk = rows[start : start + rows_per_request]
+        payloads.append(json.dumps(chunk if rows_per_request > 1 else chunk[0]).encode())
+    return payloads
+
+
+def run(url: str, payloads: list[bytes], concurrency: int) -> dict[str, Any]:
+    def timed_request(payload: bytes) -> float:
+        started = time.perf_counter()
+        _request(f"{url}/score", payload)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.fromiter(pool.map(timed_request, payloads), float)
+    elapsed = time.perf_counter() - started
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {
+        "requests": len(payloads),
+        "concurrency": concurrency,
+        "requests_per_second": len(payloads) / elapsed,
+        "client_p50_ms": float(p50),
+        "client_p99_ms": float(p99),
+        "server": _request(f"{url}/metrics"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test for the churn scoring service")
+    parser.add_argument("features_path", help="Parquet file with the columns of the features asset")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows-per-request", type=int, default=1, help="1 sends single account payloads")
+    args = parser.parse_args()
+
+    payloads = _payloads(args.features_path, args.requests, args.rows_per_request)
+    print(json.dumps(run(args.url, payloads, args.concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
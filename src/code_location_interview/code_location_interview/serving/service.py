@@ -0,0 +1,268 @@
+"""
+Online scoring of the deployed churn model
+
+A plain ASGI application (served with uvicorn, see __main__.py) which loads the
+model selected by DeployedModelConfiguration once and scores JSON payloads with the
+same fitted preprocessing Pipeline as the predictions asset. Concurrent requests
+are grouped into micro-batches, so predict_proba runs once per batch instead of
+once per request.
+
+    POST /score    one account {...} or several [{...}, ...] with the columns of the
+                   features asset, returns churn_risk per rating_account_id
+    GET  /metrics  number of requests, p50/p99 latency and mean micro-batch size
+    GET  /health
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Literal, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import OneHotEncoder
+
+from ..assets.magenta_interview.compiled_inference import CompiledPipeline
+from ..assets.magenta_interview.deployment import (
+    DeployedModelConfiguration,
+    resolve_model,
+)
+from ..assets.magenta_interview.scoring import predict_batch
+from ..resources.model_registry import ModelRegistry
+
+Pending = tuple[pd.DataFrame, asyncio.Future]
+
+
+class LatencyTracker:
+    """Percentiles over the latencies of the most recent requests."""
+
+    def __init__(self, window: int = 10_000):
+        self._latencies: deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        self.count += 1
+
+    def summary(self) -> dict[str, float]:
+        if not self._latencies:
+            return {"count": 0}
+        p50, p99 = np.percentile(np.fromiter(self._latencies, float), [50, 99]) * 1000
+        return {"count": self.count, "p50_ms": float(p50), "p99_ms": float(p99)}
+
+
+class MicroBatcher:
+    """Groups concurrent predict calls into one predict_proba call.
+
+    A batch is closed when it holds ``max_batch_size`` rows or ``max_wait_ms``
+    after its first request arrived. Batches are scored one at a time on a single
+    thread, XGBoost parallelizes within a batch and the event loop keeps
+    accepting requests for the next one in the meantime.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[pd.DataFrame], np.ndarray],
+        max_batch_size: int = 1024,
+        max_wait_ms: float = 2.0,
+    ):
+        self._predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.num_batches = 0
+        self.num_rows = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue: Optional[asyncio.Queue[Pending]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future))  # type: ignore[union-attr]
+        return await future
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = self._queue = None
+
+    async def _next_batch(self, queue: asyncio.Queue[Pending]) -> list[Pending]:
+        batch = [await queue.get()]
+        num_rows = len(batch[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while num_rows < self.max_batch_size:
+            try:
+                pending = await asyncio.wait_for(
+                    queue.get(), deadline - asyncio.get_running_loop().time()
+                )
+            except TimeoutError:
+                break
+            batch.append(pending)
+            num_rows += len(pending[0])
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch(self._queue)  # type: ignore[arg-type]
+            frames = [frame for frame, _ in batch]
+            try:
+                scores = await loop.run_in_executor(
+                    self._executor, self._predict, pd.concat(frames, ignore_index=True)
+                )
+            except Exception as error:
+                _set_exception(batch, error)
+                continue
+            self.num_batches += 1
+            self.num_rows += len(scores)
+            _set_results(batch, scores)
+
+
+# the client may have disconnected while its request was being scored
+def _set_results(batch: list[Pending], scores: np.ndarray) -> None:
+    splits = np.split(scores, np.cumsum([len(frame) for frame, _ in batch])[:-1])
+    for (_, future), split in zip(batch, splits, strict=True):
+        if not future.done():
+            future.set_result(split)
+
+
+def _set_exception(batch: list[Pending], error: Exception) -> None:
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+def categorical_columns(model: Any) -> list[str]:
+    """Columns the fitted preprocessing step one-hot encodes."""
+    preprocessing = model.steps[0][1]
+    return [
+        column
+        for _, transformer, columns in preprocessing.transformers_
+        if isinstance(transformer, OneHotEncoder)
+        for column in columns
+    ]
+
+
+class ScoringService:
+    def __init__(
+        self,
+        model: Any,
+        max_batch_size: int = 1024,
+        max_wait_ms: float = 2.0,
+        engine: Literal["sklearn", "compiled"] = "compiled",
+    ):
+        self.model = model
+        self.columns = list(model.feature_names_in_)
+        self.categorical_columns = categorical_columns(model)
+        # same scores either way, see compiled_inference.py
+        predictor = CompiledPipeline(model) if engine == "compiled" else model
+        self.batcher = MicroBatcher(
+            lambda batch: predict_batch(predictor, batch), max_batch_size, max_wait_ms
+        )
+        self.latency = LatencyTracker()
+        self._routes: dict[tuple[str, str], Callable[[bytes], Awaitable[tuple[int, Any]]]] = {
+            ("POST", "/score"): self.score,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/health"): self.health,
+        }
+
+    @classmethod
+    def from_config(
+        cls, model_registry: ModelRegistry, config: DeployedModelConfiguration, **kwargs: Any
+    ) -> "ScoringService":
+        return cls(resolve_model(model_registry, config).load(), **kwargs)
+
+    def to_frame(self, payload: Any) -> pd.DataFrame:
+        """Feature rows with the dtypes the pipeline was fitted on.
+
+        JSON has no NaN, missing values arrive as null (or absent keys) and become
+        NaN in the numeric columns, booleans become 0.0/1.0 like in XGBoost.
+        """
+        records = payload if isinstance(payload, list) else [payload]
+        if not records:
+            raise ValueError("Expected at least one feature row")
+        frame = pd.DataFrame.from_records(records, columns=["rating_account_id", *self.columns])
+        numeric_columns = [column for column in self.columns if column not in self.categorical_columns]
+        frame[numeric_columns] = frame[numeric_columns].astype("float64")
+        for column in self.categorical_columns:
+            frame[column] = frame[column].astype(object).where(frame[column].notna(), np.nan)
+        return frame
+
+    async def score(self, body: bytes) -> tuple[int, Any]:
+        started = time.perf_counter()
+        try:
+            payload = json.loads(body)
+            frame = self.to_frame(payload)
+        except (ValueError, TypeError) as error:
+            return 400, {"error": str(error)}
+
+        churn_risk = await self.batcher.predict(frame[self.columns])
+        scores = [
+            {"rating_account_id": rating_account_id, "churn_risk": risk}
+            for rating_account_id, risk in zip(
+                frame["rating_account_id"].tolist(), churn_risk.tolist(), strict=True
+            )
+        ]
+        self.latency.record(time.perf_counter() - started)
+        return 200, scores if isinstance(payload, list) else scores[0]
+
+    async def metrics(self, body: bytes) -> tuple[int, Any]:
+        num_batches = self.batcher.num_batches
+        return 200, {
+            **self.latency.summary(),
+            "num_batches": num_batches,
+            "mean_batch_size": self.batcher.num_rows / num_batches if num_batches else 0.0,
+        }
+
+    async def health(self, body: bytes) -> tuple[int, Any]:
+        return 200, {"status": "ok"}
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.batcher.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope: dict, receive: Callable, send: Callable) -> None:
+        route = self._routes.get((scope["method"], scope["path"]))
+        if route is None:
+            await _send_json(send, 404, {"error": f"{scope['method']} {scope['path']} not found"})
+            return
+        status, content = await route(await _read_body(receive))
+        await _send_json(send, status, content)
+
+
+async def _read_body(receive: Callable) -> bytes:
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def _send_json(send: Callable, status: int, content: Any) -> None:
+    body = json.dumps(content).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,38 @@
+-- usage per rating account over all billed months
+-- incremental runs only aggregate the new months of int_bills and fold them into the
+-- existing aggregates, this relies on months arriving in order (use --full-refresh otherwise)
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='rating_account_id',
+    )
+}}
+
+WITH new_aggregates AS (
+    SELECT
+        rating_account_id,
+        MAX(has_used_roaming) AS has_used_roaming,
+        SUM(used_gb) AS used_gb,
+        MAX(has_used_gb) AS has_used_gb,
+        MAX(billed_period_month_d) AS last_billed_period_month_d
+    FROM {{ ref('int_bills') }}
+    {% if is_incremental() %}
+        WHERE billed_period_month_d > (SELECT MAX(last_billed_period_month_d) FROM {{ this }})
+    {% endif %}
+    GROUP BY rating_account_id
+)
+
+{% if is_incremental() %}
+    SELECT
+        new_aggregates.rating_account_id,
+        GREATEST(new_aggregates.has_used_roaming, COALESCE(existing.has_used_roaming, false)) AS has_used_roaming,
+        new_aggregates.used_gb + COALESCE(existing.used_gb, 0) AS used_gb,
+        GREATEST(new_aggregates.has_used_gb, COALESCE(existing.has_used_gb, false)) AS has_used_gb,
+        new_aggregates.last_billed_period_month_d
+    FROM new_aggregates
+    LEFT JOIN {{ this }} AS existing
+        ON new_aggregates.rating_account_id = existing.rating_account_id
+{% else %}
+    SELECT * FROM new_aggregates
+{% endif %}
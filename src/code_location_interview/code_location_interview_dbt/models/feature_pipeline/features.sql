@@ -0,0 +1,18 @@
+-- same features as the python `features` asset:
+-- - perc_used_gb, falls back to used_gb when no GB are included in the tariff
+-- - smartphone_brand reduced to fewer categories with an Other category
+SELECT
+    * EXCLUDE (customer_id) REPLACE (
+        COALESCE(available_gb, 0) AS available_gb,
+        CASE
+            WHEN smartphone_brand IS NULL THEN NULL
+            WHEN LOWER(smartphone_brand) IN ('samsung', 'apple') THEN smartphone_brand
+            WHEN LOWER(smartphone_brand) IN ('huawei', 'xiaomi') THEN 'Huawei, Xiaomi'
+            ELSE 'Other'
+        END AS smartphone_brand
+    ),
+    CASE
+        WHEN COALESCE(available_gb, 0) != 0 THEN used_gb / available_gb
+        ELSE used_gb
+    END AS perc_used_gb
+FROM {{ ref('raw_features') }}
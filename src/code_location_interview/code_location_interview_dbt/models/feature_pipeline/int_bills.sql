@@ -0,0 +1,27 @@
+-- history of all bills
+-- partitioned runs (re)load the months of their partition window (min_date/max_date vars),
+-- other incremental runs only load the months that are not in the table yet
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='delete+insert',
+        unique_key='billed_period_month_d',
+        tags=['monthly'],
+    )
+}}
+
+SELECT
+    rating_account_id,
+    CAST(billed_period_month_d AS DATE) AS billed_period_month_d,
+    -- booleans in the compact schema of the python assets, 0/1 in older files
+    CAST(has_used_roaming AS BOOLEAN) AS has_used_roaming,
+    used_gb,
+    CAST(has_used_gb AS BOOLEAN) AS has_used_gb
+FROM {{ source('magenta_interview', 'bills') }}
+{% if var('min_date', none) is not none %}
+    WHERE
+        CAST(billed_period_month_d AS DATE) >= CAST(LEFT('{{ var("min_date") }}', 10) AS DATE)
+        AND CAST(billed_period_month_d AS DATE) < CAST(LEFT('{{ var("max_date") }}', 10) AS DATE)
+{% elif is_incremental() %}
+    WHERE CAST(billed_period_month_d AS DATE) > (SELECT MAX(billed_period_month_d) FROM {{ this }})
+{% endif %}
@@ -0,0 +1,29 @@
+SELECT
+    core_data.rating_account_id,
+    core_data.customer_id,
+    core_data.age,
+    core_data.contract_lifetime_days,
+    core_data.remaining_binding_days,
+    core_data.has_special_offer,
+    core_data.is_magenta1_customer,
+    core_data.available_gb,
+    core_data.gross_mrc,
+    core_data.smartphone_brand,
+    aggregated_bills.has_used_roaming,
+    aggregated_bills.used_gb,
+    aggregated_bills.has_used_gb,
+    interactions.n_cases,
+    interactions.days_since_last_case,
+    interactions."n_case_produkte&services-tarifdetails",
+    interactions."n_case_produkte&services-tarifwechsel",
+    interactions.n_case_rechnungsanfragen,
+    interactions.n_case_vvl,
+    interactions."days_since_last_case_produkte&services-tarifdetails",
+    interactions."days_since_last_case_produkte&services-tarifwechsel",
+    interactions.days_since_last_case_rechnungsanfragen,
+    interactions.days_since_last_case_vvl
+FROM {{ source('magenta_interview', 'core_data') }} AS core_data
+LEFT JOIN {{ ref('aggregated_bills') }} AS aggregated_bills
+    ON core_data.rating_account_id = aggregated_bills.rating_account_id
+LEFT JOIN {{ source('magenta_interview', 'pivoted_customer_interactions') }} AS interactions
+    ON core_data.customer_id = interactions.customer_id
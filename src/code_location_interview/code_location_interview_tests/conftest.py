@@ -0,0 +1,79 @@
+import pytest
+from code_location_interview.assets.magenta_interview.get_data import (
+    aggregated_bills,
+    bills,
+    core_data,
+    customer_interactions,
+    features,
+    label,
+    pivoted_customer_interactions,
+    raw_features,
+)
+from code_location_interview.assets.magenta_interview.train import (
+    TrainedModelConfig,
+    TrainingDataConfig,
+    df_input,
+    split_train_test,
+    trained_model,
+)
+from code_location_interview.resources.model_registry import ModelRegistry
+from dagster import build_asset_context, materialize
+
+partition_key = "2024-07-01"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def asset_cache(tmp_path_factory):
+    # memoized assets must not reuse outputs of earlier test sessions
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        path = tmp_path_factory.mktemp("asset_cache")
+        monkeypatch.setenv("ASSET_CACHE_DIR", str(path))
+        yield path
+
+
+@pytest.fixture(scope="session")
+def training_data():
+    generator_config = {"config": {"seed": 5}}
+    result = materialize(
+        [
+            core_data,
+            label,
+            bills,
+            aggregated_bills,
+            customer_interactions,
+            pivoted_customer_interactions,
+            raw_features,
+            features,
+        ],
+        run_config={
+            "ops": {
+                "core_data": {"config": {"num_rows": 5000, "seed": 5}},
+                "bills": generator_config,
+                "customer_interactions": generator_config,
+            }
+        },
+        partition_key=partition_key,
+    )
+    assert result.success
+    features_df = result.output_for_node("features")
+    train_data, test_data = split_train_test(
+        df_input(build_asset_context(), TrainingDataConfig(), features_df, result.output_for_node("label"))
+    )
+    return features_df, train_data, test_data
+
+
+@pytest.fixture(scope="session")
+def training_result(training_data):
+    features_df, train_data, test_data = training_data
+    return features_df, trained_model(TrainedModelConfig(), train_data.copy(), test_data.copy(), {}).value.pipeline
+
+
+@pytest.fixture(scope="session")
+def model_registry(tmp_path_factory):
+    return ModelRegistry(base_path=str(tmp_path_factory.mktemp("model_registry")))
+
+
+@pytest.fixture(scope="session")
+def registered_model(training_result, model_registry):
+    _, model = training_result
+    return model_registry.register(model, metrics={"roc_auc_score": 0.5})
@@ -0,0 +1,58 @@
+from code_location_interview.benchmark import (
+    run_benchmark,
+    run_inference_benchmark,
+    run_translator_benchmark,
+    scaling_report,
+)
+
+steps = [
+    "core_data",
+    "label",
+    "bills",
+    "aggregated_bills",
+    "customer_interactions",
+    "pivoted_customer_interactions",
+    "raw_features",
+    "features",
+    "df_input",
+    "split_train_test",
+    "tuned_hyperparameters",
+    "trained_model",
+    "model_candidates",
+    "deployed_model",
+    "predictions",
+]
+
+
+def test_benchmark_measures_every_step_of_the_graph():
+    run = run_benchmark(num_rows=2000, seed=5)
+
+    assert run["num_rows"] == 2000
+    assert sorted(run["steps"]) == sorted(steps)
+    assert run["steps"]["core_data"]["assets"] == ["rating_account_id", "unique_customer_ids", "core_data"]
+    for step in run["steps"].values():
+        assert 0 < step["wall_seconds"] < run["wall_seconds"]
+        assert 0 < step["peak_rss_bytes"] <= run["peak_rss_bytes"]
+    # every output is stored by the Parquet IO manager
+    assert all(run["steps"][step]["bytes_written"] > 0 for step in steps)
+
+    report = scaling_report([run, {**run, "num_rows": 4000}], baseline={"runs": [run]})
+    assert report.splitlines()[0].startswith("core_data")
+    assert "x 0.50 of linear" in report and "x 1.00 of baseline" in report
+
+
+def test_translator_benchmark_times_both_translators():
+    result = run_translator_benchmark(num_models=20)
+
+    assert result["num_models"] == 20
+    assert result["derived_seconds"] > 0 and result["indexed_seconds"] > 0
+
+
+def test_inference_benchmark_times_both_engines():
+    result = run_inference_benchmark(num_rows=2000, batch_sizes=(1, 100))
+
+    assert result["num_rows"] == 2000
+    assert [batch["batch_size"] for batch in result["batches"]] == [1, 100]
+    for batch in result["batches"]:
+        assert batch["sklearn_seconds"] > 0 and batch["compiled_seconds"] > 0
+        assert batch["speedup"] == batch["sklearn_seconds"] / batch["compiled_seconds"]
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from code_location_interview.assets.magenta_interview.compiled_inference import (
+    CompiledPipeline,
+)
+
+
+@pytest.fixture(scope="module")
+def features_and_model(training_result):
+    features_df, model = training_result
+    return features_df.set_index("rating_account_id"), model
+
+
+def test_compiled_transform_matches_the_column_transformer(features_and_model):
+    features_df, model = features_and_model
+    preprocessor = model.named_steps["preprocessing"]
+
+    np.testing.assert_array_equal(
+        CompiledPipeline(model).transform(features_df),
+        preprocessor.transform(features_df).astype(np.float32),
+    )
+
+
+def test_compiled_predictions_are_bit_for_bit_identical(features_and_model):
+    features_df, model = features_and_model
+    # features of other sources (i.e. the dbt features) are not in the compact schema
+    features_df = features_df.astype({"smartphone_brand": object, "age": float})
+    # missing and unknown categories, missing values in imputed and passthrough columns
+    features_df.iloc[:50, features_df.columns.get_loc("smartphone_brand")] = None
+    features_df.iloc[50:100, features_df.columns.get_loc("smartphone_brand")] = "Nokia"
+    features_df.iloc[100:150, features_df.columns.get_loc("n_cases")] = np.nan
+    features_df.iloc[150:200, features_df.columns.get_loc("age")] = np.nan
+
+    np.testing.assert_array_equal(
+        CompiledPipeline(model).predict_proba(features_df),
+        model.predict_proba(features_df),
+    )
@@ -0,0 +1,217 @@
+import json
+import shutil
+from pathlib import Path
+
+import duckdb
+import pytest
+from code_location_interview.resources import DBT_PROJECT_DIR
+from dagster import (
+    BackfillPolicy,
+    MonthlyPartitionsDefinition,
+    OpExecutionContext,
+    materialize,
+)
+from dagster._core.storage.tags import (
+    ASSET_PARTITION_RANGE_END_TAG,
+    ASSET_PARTITION_RANGE_START_TAG,
+)
+from dagster_dbt import DbtCliResource, dbt_assets
+from shared_library.orchestration.dbt_translator import (
+    DbtBuildConfig,
+    build_DbtTranslator,
+    process_dbt_assets,
+)
+
+# the feature_pipeline models, built against a DuckDB file of the test
+model_names = ["int_bills", "aggregated_bills", "raw_features", "features"]
+bill_months = ["2024-01-01", "2024-02-01", "2024-03-01"]
+
+profile = """
+code_location_interview:
+  target: dev
+  outputs:
+    dev:
+      type: duckdb
+      schema: bar_dev
+      path: {path}
+      threads: 2
+"""
+
+
+def _write_sources(parquet_path: Path) -> None:
+    """A few rows of the Parquet files the ParquetIOManager writes for the dbt sources."""
+    parquet_path.joinpath("bills").mkdir(parents=True)
+    interaction_columns = ", ".join(
+        f'1 AS "{prefix}{type_subtype}"'
+        for prefix in ("n_case_", "days_since_last_case_")
+        for type_subtype in (
+            "produkte&services-tarifdetails",
+            "produkte&services-tarifwechsel",
+            "rechnungsanfragen",
+            "vvl",
+        )
+    )
+    for query, file_name in (
+        (
+            """SELECT i AS rating_account_id, i AS customer_id, 40 AS age,
+                100 AS contract_lifetime_days, 10 AS remaining_binding_days,
+                false AS has_special_offer, true AS is_magenta1_customer,
+                10.0 AS available_gb, 30.0 AS gross_mrc, 'Apple' AS smartphone_brand
+            FROM range(3) t(i)""",
+            "core_data.parquet",
+        ),
+        *(
+            (
+                f"""SELECT i AS rating_account_id, DATE '{month}' AS billed_period_month_d,
+                    0 AS has_used_roaming, 2.5 AS used_gb, 1 AS has_used_gb
+                FROM range(3) t(i)""",
+                f"bills/{month}.parquet",
+            )
+            for month in bill_months
+        ),
+        (
+            f"""SELECT i AS customer_id, 2 AS n_cases, 5 AS days_since_last_case,
+                {interaction_columns}
+            FROM range(3) t(i)""",
+            "pivoted_customer_interactions.parquet",
+        ),
+    ):
+        duckdb.sql(f"COPY ({query}) TO '{parquet_path.joinpath(file_name)}' (FORMAT PARQUET)")
+
+
+@pytest.fixture
+def dbt_project(tmp_path, monkeypatch) -> Path:
+    """A copy of the dbt project whose models the tests can change, with local sources."""
+    project_dir = tmp_path.joinpath("dbt")
+    # packages.yml is left out, the models do not use dbt_utils and the tests run offline
+    for name in ("models", "macros", "dbt_project.yml"):
+        source = Path(DBT_PROJECT_DIR, name)
+        copy = shutil.copytree if source.is_dir() else shutil.copy
+        copy(source, project_dir.joinpath(name))
+    # the dev target without the extensions that are downloaded on first use
+    project_dir.joinpath("profiles.yml").write_text(
+        profile.format(path=tmp_path.joinpath("warehouse.duckdb"))
+    )
+
+    _write_sources(tmp_path.joinpath("parquet"))
+    monkeypatch.setenv("PARQUET_IO_MANAGER_BASE_PATH", str(tmp_path.joinpath("parquet")))
+    DbtCliResource(project_dir=str(project_dir)).cli(["parse"], target_path=Path("target")).wait()
+    return project_dir
+
+
+def _materialize(dbt_project: Path, only_modified: bool, selected_models=None) -> set[str]:
+    """Names of the models the run built."""
+    manifest = json.loads(dbt_project.joinpath("target", "manifest.json").read_text())
+    translator = build_DbtTranslator("duckdb_bar", "ascii")(manifest=manifest)
+
+    @dbt_assets(manifest=manifest, dagster_dbt_translator=translator)
+    def feature_pipeline(context: OpExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig):
+        yield from process_dbt_assets(
+            context=context,
+            dbt2=dbt,
+            dagster_dbt_translator2=translator,
+            only_modified=config.only_modified,
+            manifest=manifest,
+        )
+
+    result = materialize(
+        [feature_pipeline],
+        selection=[key for key in feature_pipeline.keys if key.path[-1] in (selected_models or model_names)],
+        resources={
+            "dbt": DbtCliResource(
+                project_dir=str(dbt_project), state_path=str(dbt_project.joinpath("state"))
+            )
+        },
+        run_config={"ops": {"feature_pipeline": {"config": {"only_modified": only_modified}}}},
+    )
+    assert result.success
+    return {
+        materialization.asset_key.path[-1]
+        for materialization in result.asset_materializations_for_node("feature_pipeline")
+    }
+
+
+def _change_model(dbt_project: Path, model_name: str) -> None:
+    model_path = dbt_project.joinpath("models", "feature_pipeline", f"{model_name}.sql")
+    model_path.write_text(model_path.read_text() + "\n-- changed\n")
+
+
+def test_only_modified_builds_changed_models_and_their_children(dbt_project):
+    # without a state everything is built, and the build becomes the state
+    assert _materialize(dbt_project, only_modified=True) == set(model_names)
+    assert dbt_project.joinpath("state", "feature_pipeline", "manifest.json").exists()
+
+    assert _materialize(dbt_project, only_modified=True) == set()
+
+    _change_model(dbt_project, "raw_features")
+    assert _materialize(dbt_project, only_modified=True) == {"raw_features", "features"}
+    # the last run built everything that changed, it is the new state
+    assert _materialize(dbt_project, only_modified=True) == set()
+
+
+def test_subsets_build_exactly_the_selected_models(dbt_project):
+    assert _materialize(dbt_project, only_modified=False) == set(model_names)
+    state = dbt_project.joinpath("state", "feature_pipeline", "manifest.json").read_bytes()
+
+    _change_model(dbt_project, "aggregated_bills")
+    assert _materialize(dbt_project, only_modified=False, selected_models=["aggregated_bills"]) == {
+        "aggregated_bills"
+    }
+    # a subset does not leave every model at the state of the manifest
+    assert dbt_project.joinpath("state", "feature_pipeline", "manifest.json").read_bytes() == state
+
+    selected_models = ["int_bills", "aggregated_bills", "features"]
+    # raw_features is downstream of the change but not selected
+    assert _materialize(dbt_project, only_modified=True, selected_models=selected_models) == {
+        "aggregated_bills",
+        "features",
+    }
+    # the subsets kept the previous state, the next run still builds all of the change
+    assert _materialize(dbt_project, only_modified=True) == {
+        "aggregated_bills",
+        "raw_features",
+        "features",
+    }
+
+
+def test_partition_range_is_built_month_by_month(dbt_project, tmp_path):
+    manifest = json.loads(dbt_project.joinpath("target", "manifest.json").read_text())
+    translator = build_DbtTranslator("duckdb_bar", "ascii")(manifest=manifest)
+
+    @dbt_assets(
+        manifest=manifest,
+        select="tag:monthly",
+        dagster_dbt_translator=translator,
+        partitions_def=MonthlyPartitionsDefinition(start_date="2024-01-01"),
+        backfill_policy=BackfillPolicy.single_run(),
+    )
+    def monthly_models(context: OpExecutionContext, dbt: DbtCliResource, config: DbtBuildConfig):
+        yield from process_dbt_assets(
+            context=context,
+            dbt2=dbt,
+            dagster_dbt_translator2=translator,
+            partitions_per_invocation=config.partitions_per_invocation,
+            max_parallel_invocations=config.max_parallel_invocations,
+            manifest=manifest,
+        )
+
+    result = materialize(
+        [monthly_models],
+        resources={"dbt": DbtCliResource(project_dir=str(dbt_project))},
+        tags={ASSET_PARTITION_RANGE_START_TAG: bill_months[0], ASSET_PARTITION_RANGE_END_TAG: bill_months[-1]},
+    )
+
+    assert result.success
+    assert [m.partition for m in result.asset_materializations_for_node("monthly_models")] == [
+        month[:7] + "-01" for month in bill_months
+    ]
+    # the not_null test of int_bills ran once, after the months were loaded
+    assert [check.passed for check in result.get_asset_check_evaluations()] == [True]
+    # every month was loaded by its own invocation, into its own target path
+    target_paths = list(dbt_project.joinpath("target").glob("monthly_models-*-parallel-*"))
+    assert len(target_paths) == len(bill_months)
+    with duckdb.connect(str(tmp_path.joinpath("warehouse.duckdb")), read_only=True) as connection:
+        months = connection.sql(
+            "SELECT DISTINCT billed_period_month_d::VARCHAR FROM bar_dev.int_bills ORDER BY 1"
+        ).fetchall()
+    assert [month for (month,) in months] == bill_months
@@ -0,0 +1,268 @@
+import copy
+import json
+import threading
+import time
+from collections import Counter
+
+from code_location_interview.benchmark import (
+    AsciiDbtTranslator,
+    DerivingDbtTranslator,
+    synthetic_dbt_manifest,
+)
+from dagster import (
+    AssetKey,
+    AssetOut,
+    BackfillPolicy,
+    MonthlyPartitionsDefinition,
+    Nothing,
+    Output,
+    materialize,
+    multi_asset,
+)
+from dagster._core.storage.tags import (
+    ASSET_PARTITION_RANGE_END_TAG,
+    ASSET_PARTITION_RANGE_START_TAG,
+)
+from dagster_dbt import dbt_assets
+from shared_library.orchestration.dbt_translator import process_dbt_assets
+
+unique_ids = ["model.interview.int_bills", "model.interview.aggregated_bills"]
+
+
+class FakeDbtCliInvocation:
+    """Stands in for DbtCliInvocation, records how far dbt got and which artifacts were read."""
+
+    def __init__(self):
+        self.manifest = {
+            "nodes": {unique_id: {"meta": {"owner": "data-team"}} for unique_id in unique_ids}
+        }
+        self.emitted: list[str] = []
+        self.artifact_reads: Counter = Counter()
+
+    def stream(self):
+        for unique_id in unique_ids:
+            self.emitted.append(unique_id)
+            yield Output(None, output_name=unique_id.split(".")[-1], metadata={"unique_id": unique_id})
+
+    def get_artifact(self, artifact: str) -> dict:
+        self.artifact_reads[artifact] += 1
+        if artifact == "run_results.json":
+            return {
+                "results": [
+                    {"unique_id": unique_id, "adapter_response": {"rows_affected": 10 * i}}
+                    for i, unique_id in enumerate(unique_ids, start=1)
+                ]
+            }
+        return {"nodes": {unique_id: {"compiled_code": f"select {unique_id}"} for unique_id in unique_ids}}
+
+
+class FakeDbtCliResource:
+    state_path = None
+
+    def __init__(self, invocation: FakeDbtCliInvocation):
+        self.invocation = invocation
+
+    def cli(self, args, context, raise_on_error):
+        return self.invocation
+
+
+def test_dbt_events_are_streamed_and_enriched_after_the_run():
+    invocation = FakeDbtCliInvocation()
+
+    @multi_asset(outs={name.split(".")[-1]: AssetOut(dagster_type=Nothing) for name in unique_ids})
+    def dbt_models(context):
+        events = process_dbt_assets(context, dbt2=FakeDbtCliResource(invocation), dagster_dbt_translator2=None)
+        first = next(events)
+        # the first output arrives while dbt still works on the second model
+        assert invocation.emitted == unique_ids[:1]
+        yield first
+        yield from events
+
+    result = materialize([dbt_models])
+
+    assert result.success
+    materialization = result.asset_materializations_for_node("dbt_models")[0]
+    assert materialization.metadata["owner"].value == "data-team"
+    observations = {
+        observation.asset_key: observation.metadata
+        for observation in result.asset_observations_for_node("dbt_models")
+    }
+    assert observations[AssetKey("aggregated_bills")]["rows_affected"].value == 20
+    assert observations[AssetKey("int_bills")]["compiled_sql"].value == "select model.interview.int_bills"
+    # the artifacts are read once per invocation, not once per event
+    assert invocation.artifact_reads == {"run_results.json": 1, "manifest.json": 1}
+
+
+def test_indexed_translator_matches_the_derived_answers():
+    manifest = synthetic_dbt_manifest(50)
+    indexed = AsciiDbtTranslator(partitioning_overrides={"model_3": "billed_period_month_d"}, manifest=manifest)
+    unindexed = DerivingDbtTranslator(partitioning_overrides={"model_3": "billed_period_month_d"})
+
+    for node in manifest["nodes"].values():
+        assert indexed.get_asset_key(node) == unindexed.get_asset_key(node)
+        assert indexed.get_group_name(node) == unindexed.get_group_name(node) == "feature_pipeline"
+        assert indexed.get_metadata(node) == unindexed.get_metadata(node)
+    assert indexed.get_metadata(manifest["nodes"]["model.interview.model_3"])["partition_expr"] == "billed_period_month_d"
+
+    # the same node of another target's manifest is not answered from the index
+    prod_node = {**copy.deepcopy(manifest["nodes"]["model.interview.model_3"]), "schema": "bar"}
+    assert indexed.get_asset_key(prod_node) == AssetKey(["analytics_database_dev", "bar", "model_3"])
+
+
+class CountingDbtTranslator(AsciiDbtTranslator):
+    """Counts the derivations of the translator, i.e. its calls of _index."""
+
+    def __init__(self, *args, **kwargs):
+        self.derived: Counter = Counter()
+        super().__init__(*args, **kwargs)
+
+    def _index(self, dbt_resource_props):
+        self.derived[dbt_resource_props["unique_id"]] += 1
+        return super()._index(dbt_resource_props)
+
+
+def test_indexed_translator_derives_nothing_after_indexing_the_manifest():
+    manifest = synthetic_dbt_manifest(200)
+    translator = CountingDbtTranslator(manifest=manifest)
+    assert translator.derived == dict.fromkeys(manifest["nodes"], 1)
+    translator.derived.clear()
+
+    @dbt_assets(manifest=manifest, dagster_dbt_translator=translator)
+    def synthetic_models(context): ...
+
+    assert len(synthetic_models.keys) == 200
+    # dagster-dbt asks for every node several times, all of it is served from the index
+    assert not translator.derived
+
+
+class FakeDbtEvent:
+    """Stands in for the DbtCliEventMessage of a built model."""
+
+    def __init__(self, unique_id: str):
+        self.unique_id = unique_id
+
+    def to_default_asset_events(self, manifest, dagster_dbt_translator, context, target_path):
+        asset_key = dagster_dbt_translator.get_asset_key(manifest["nodes"][self.unique_id])
+        output_name = context.assets_def.get_output_name_for_asset_key(asset_key)
+        yield Output(None, output_name=output_name, metadata={"unique_id": self.unique_id})
+
+
+class FakeChunkInvocation:
+    """Stands in for the DbtCliInvocation of one partition chunk, builds the selected models."""
+
+    def __init__(self, resource: "FakeChunkedDbtCliResource", args, manifest, translator, target_path):
+        self.resource = resource
+        self.args = args
+        self.manifest = manifest
+        self.dagster_dbt_translator = translator
+        self.target_path = target_path
+        self.command = args[0]
+        self.min_date = json.loads(args[args.index("--vars") + 1])["min_date"] if "--vars" in args else None
+        selected_fqns = {selector.removeprefix("fqn:") for selector in args[args.index("--select") + 1].split(" ")}
+        self.unique_ids = [
+            unique_id for unique_id, node in manifest["nodes"].items() if ".".join(node["fqn"]) in selected_fqns
+        ]
+
+    def stream_raw_events(self):
+        self.resource.started(self)
+        time.sleep(0.2)
+        if self.command != "test":
+            yield from map(FakeDbtEvent, self.unique_ids)
+        self.resource.finished(self)
+
+    def get_artifact(self, artifact: str) -> dict:
+        return {"results": []} if artifact == "run_results.json" else {"nodes": {}}
+
+    def is_successful(self) -> bool:
+        return True
+
+
+class FakeChunkedDbtCliResource:
+    state_path = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        # (started or finished, invocation) in the order they happened
+        self.log: list[tuple[str, FakeChunkInvocation]] = []
+
+    def cli(self, args, *, manifest, dagster_dbt_translator, raise_on_error, target_path):
+        return FakeChunkInvocation(self, args, manifest, dagster_dbt_translator, target_path)
+
+    def started(self, invocation):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.log.append(("started", invocation))
+
+    def finished(self, invocation):
+        with self.lock:
+            self.running -= 1
+            self.log.append(("finished", invocation))
+
+
+def test_partition_range_is_built_in_parallel_chunks_with_serial_scd2_models():
+    manifest = synthetic_dbt_manifest(4)
+    # model_3 depends on model_1 and model_2 and historizes them
+    manifest["nodes"]["model.interview.model_3"]["tags"] = ["stateful_scd2"]
+    translator = AsciiDbtTranslator(manifest=manifest)
+    dbt = FakeChunkedDbtCliResource()
+
+    @dbt_assets(
+        manifest=manifest,
+        dagster_dbt_translator=translator,
+        partitions_def=MonthlyPartitionsDefinition(start_date="2024-01-01"),
+        backfill_policy=BackfillPolicy.single_run(),
+    )
+    def synthetic_models(context):
+        yield from process_dbt_assets(
+            context, dbt, translator, partitions_per_invocation=1, max_parallel_invocations=2, manifest=manifest
+        )
+
+    result = materialize(
+        [synthetic_models],
+        tags={ASSET_PARTITION_RANGE_START_TAG: "2024-01-01", ASSET_PARTITION_RANGE_END_TAG: "2024-04-01"},
+    )
+
+    assert result.success
+    # one output per asset for the whole range, i.e. one materialization per month
+    materializations = result.asset_materializations_for_node("synthetic_models")
+    assert Counter(m.asset_key.path[-1] for m in materializations) == {f"model_{i}": 4 for i in range(4)}
+
+    invocations = [invocation for event, invocation in dbt.log if event == "started"]
+    chunks = [invocation for invocation in invocations if invocation.command == "build"]
+    assert len({invocation.target_path for invocation in chunks}) == len(chunks) == 8
+    assert dbt.max_running == 2
+
+    parallel = [invocation for invocation in chunks if "model.interview.model_3" not in invocation.unique_ids]
+    serial = [invocation for invocation in chunks if invocation.unique_ids == ["model.interview.model_3"]]
+    assert len(parallel) == len(serial) == 4
+    # the scd2 model runs after its parents were built for all months, month by month
+    assert invocations[4:8] == serial
+    assert [invocation.min_date[:10] for invocation in serial] == ["2024-01-01", "2024-02-01", "2024-03-01", "2024-04-01"]
+    serial_log = [(event, invocation) for event, invocation in dbt.log if invocation in serial]
+    assert [event for event, _ in serial_log] == ["started", "finished"] * 4
+    # tests check the whole tables once
+    assert [invocation.command for invocation in invocations[8:]] == ["test"]
+
+
+def test_only_modified_rejects_partitioned_definitions():
+    manifest = synthetic_dbt_manifest(2)
+    translator = AsciiDbtTranslator(manifest=manifest)
+    dbt = FakeChunkedDbtCliResource()
+
+    @dbt_assets(
+        manifest=manifest,
+        dagster_dbt_translator=translator,
+        partitions_def=MonthlyPartitionsDefinition(start_date="2024-01-01"),
+    )
+    def synthetic_models(context):
+        yield from process_dbt_assets(context, dbt, translator, only_modified=True, manifest=manifest)
+
+    result = materialize([synthetic_models], partition_key="2024-01-01", raise_on_error=False)
+
+    # the dbt state is kept per definition, not per partition
+    assert not result.success
+    assert "only_modified" in str(result.failure_data_for_node("synthetic_models").error)
+    assert dbt.log == []
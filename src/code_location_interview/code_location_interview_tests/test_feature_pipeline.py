@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+from code_location_interview.assets.magenta_interview import feature_pipeline
+from code_location_interview.assets.magenta_interview.get_data import (
+    aggregated_bills,
+    bills,
+    core_data,
+    customer_interactions,
+    features,
+    pivoted_customer_interactions,
+    raw_features,
+)
+from code_location_interview.assets.magenta_interview.schema import features_schema
+from dagster import materialize
+from shared_library.orchestration.frame_schema import enforce_schema
+
+feature_assets = [
+    "aggregated_bills",
+    "pivoted_customer_interactions",
+    "raw_features",
+    "features",
+]
+
+
+def _materialize(engine: str):
+    engine_config = {"config": {"engine": engine}}
+    generator_config = {"config": {"seed": 11}}
+    result = materialize(
+        [
+            core_data,
+            bills,
+            aggregated_bills,
+            customer_interactions,
+            pivoted_customer_interactions,
+            raw_features,
+            features,
+        ],
+        run_config={
+            "ops": {
+                "core_data": {"config": {"num_rows": 5000, "seed": 11}},
+                "bills": generator_config,
+                "customer_interactions": generator_config,
+                **dict.fromkeys(feature_assets, engine_config),
+            }
+        },
+        partition_key="2024-07-01",
+    )
+    assert result.success
+    return result
+
+
+@pytest.fixture(scope="module")
+def pandas_result():
+    return _materialize("pandas")
+
+
+@pytest.fixture(scope="module")
+def polars_result():
+    return _materialize("polars")
+
+
+@pytest.mark.parametrize("asset_name", feature_assets)
+def test_polars_engine_matches_pandas_engine(pandas_result, polars_result, asset_name):
+    pd.testing.assert_frame_equal(
+        pandas_result.output_for_node(asset_name),
+        polars_result.output_for_node(asset_name),
+    )
+
+
+def test_fused_polars_plan_matches_pandas_features(pandas_result):
+    fused = feature_pipeline.build_features(
+        feature_pipeline.to_lazy(pandas_result.output_for_node("core_data", "core_data")),
+        feature_pipeline.to_lazy(pandas_result.output_for_node("bills")),
+        feature_pipeline.to_lazy(pandas_result.output_for_node("customer_interactions")),
+    )
+    pd.testing.assert_frame_equal(
+        pandas_result.output_for_node("features"),
+        enforce_schema(fused.collect().to_pandas(), features_schema),
+    )
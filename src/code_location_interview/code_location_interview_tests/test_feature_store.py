@@ -0,0 +1,181 @@
+from datetime import datetime
+
+import pandas as pd
+from code_location_interview.assets.magenta_interview.feature_history import (
+    bills_history,
+    core_data_history,
+    customer_interactions_history,
+)
+from code_location_interview.assets.magenta_interview.feature_store import FeatureStore
+from code_location_interview.assets.magenta_interview.get_data import (
+    aggregated_bills,
+    bills,
+    core_data,
+    customer_interactions,
+    features,
+    pivoted_customer_interactions,
+    raw_features,
+)
+from code_location_interview.assets.magenta_interview.schema import (
+    bills_schema,
+    core_data_schema,
+    days_since_last_case_columns,
+    n_case_columns,
+    pivoted_customer_interactions_schema,
+    raw_feature_columns,
+)
+from code_location_interview.resources.duckdb_path import DuckDBPathResource
+from dagster import DagsterInstance, materialize
+from shared_library.orchestration.frame_schema import enforce_schema
+
+from .conftest import partition_key
+
+
+def test_feature_store_serves_the_features_of_the_assets(tmp_path):
+    generator_config = {"config": {"seed": 11}}
+    snapshot_config = {"config": {"snapshot_ts": partition_key}}
+    result = materialize(
+        [
+            core_data,
+            bills,
+            aggregated_bills,
+            customer_interactions,
+            pivoted_customer_interactions,
+            raw_features,
+            features,
+            bills_history,
+            core_data_history,
+            customer_interactions_history,
+        ],
+        resources={"feature_store": DuckDBPathResource(file_path=str(tmp_path / "feature_store.duckdb"))},
+        run_config={
+            "ops": {
+                "core_data": {"config": {"num_rows": 2000, "seed": 11}},
+                "bills": generator_config,
+                "customer_interactions": generator_config,
+                "core_data_history": snapshot_config,
+                "customer_interactions_history": snapshot_config,
+            }
+        },
+        partition_key=partition_key,
+    )
+    assert result.success
+    store = FeatureStore(str(tmp_path / "feature_store.duckdb"))
+
+    # the bills of the partition are served once its month is over
+    month_end = pd.Timestamp(partition_key) + pd.DateOffset(months=1)
+    expected = result.output_for_node("raw_features").sort_values("rating_account_id", ignore_index=True)
+    served = store.raw_features_as_of([month_end])
+    pd.testing.assert_frame_equal(served[raw_feature_columns], expected, check_exact=False)
+
+    # a spine of the same accounts keeps its order and passes its labels through
+    spine = pd.DataFrame({"rating_account_id": expected["rating_account_id"][::-1], "cutoff_ts": month_end, "label": 1})
+    training = store.training_frame(spine)
+    assert training["rating_account_id"].tolist() == spine["rating_account_id"].tolist()
+    assert (training["label"] == 1).all()
+
+    expected_features = result.output_for_node("features").sort_values("rating_account_id", ignore_index=True)
+    pd.testing.assert_frame_equal(store.scoring_frame(month_end), expected_features, check_exact=False)
+    # one snapshot of core_data and of the pivoted interactions
+    assert len(store.snapshots()) == 2
+
+
+def _core_data(age: int) -> pd.DataFrame:
+    return enforce_schema(
+        pd.DataFrame(
+            {
+                "rating_account_id": [1, 2],
+                "customer_id": [10, 20],
+                "age": age,
+                "contract_lifetime_days": 100,
+                "remaining_binding_days": 10,
+                "has_special_offer": False,
+                "is_magenta1_customer": True,
+                "available_gb": 5,
+                "gross_mrc": 20.0,
+                "smartphone_brand": "iPhone",
+            }
+        ),
+        core_data_schema,
+    )
+
+
+def _bills(month: str, used_gb: float) -> pd.DataFrame:
+    return enforce_schema(
+        pd.DataFrame(
+            {
+                "rating_account_id": [1],
+                "billed_period_month_d": month,
+                "has_used_roaming": False,
+                "used_gb": used_gb,
+                "has_used_gb": True,
+            }
+        ),
+        bills_schema,
+    )
+
+
+def _interactions(n: int) -> pd.DataFrame:
+    return enforce_schema(
+        pd.DataFrame(
+            {
+                "customer_id": [10],
+                "n_cases": n,
+                "days_since_last_case": 3,
+                **dict.fromkeys(n_case_columns, 0),
+                **dict.fromkeys(days_since_last_case_columns),
+                n_case_columns[0]: n,
+                days_since_last_case_columns[0]: 3,
+            }
+        ).set_index("customer_id"),
+        pivoted_customer_interactions_schema,
+    )
+
+
+def test_features_are_served_as_of_their_cutoff(tmp_path):
+    store = FeatureStore(str(tmp_path / "feature_store.duckdb"))
+    store.write_snapshot("core_data", _core_data(age=30), "2024-05-01")
+    store.write_snapshot("core_data", _core_data(age=31), "2024-07-01")
+    store.write_snapshot("customer_interactions", _interactions(1), "2024-05-01")
+    store.write_snapshot("customer_interactions", _interactions(2), "2024-07-01")
+    for month in range(2, 9):
+        store.write_bills(_bills(f"2024-{month:02d}-01", used_gb=2.0 ** (month - 2)))
+    # ingesting a month again replaces it
+    store.write_bills(_bills("2024-08-01", 128.0))
+
+    spine = pd.DataFrame(
+        {
+            "rating_account_id": [1, 1, 2, 1, 1],
+            "cutoff_ts": pd.to_datetime(["2024-06-15", "2024-08-01", "2024-08-01", "2024-09-01", "2024-04-30"]),
+        }
+    )
+    served = store.historical_raw_features(spine)
+
+    # before the first snapshot the account did not exist yet
+    assert served["cutoff_ts"].tolist() == list(spine["cutoff_ts"][:4])
+    # the snapshots of a cutoff are the latest at or before it
+    assert served["age"].tolist() == [30, 31, 31, 31]
+    assert served["n_cases"].tolist() == [1, 2, pd.NA, 2]
+    # the bills of the four months closed by the cutoff: in the middle of June its
+    # bill is not final yet, later months are never seen
+    assert served["used_gb"][0] == 1.0 + 2.0 + 4.0 + 8.0
+    assert served["used_gb"][1] == 4.0 + 8.0 + 16.0 + 32.0
+    assert pd.isna(served["used_gb"][2])
+    assert served["used_gb"][3] == 8.0 + 16.0 + 32.0 + 128.0
+    assert store.billed_months()[-1] == pd.Timestamp("2024-08-01").date()
+    assert len(store.raw_features_as_of(["2024-04-01", "2024-06-01", "2024-08-01"])) == 4
+
+
+def test_snapshots_default_to_the_start_of_their_run(tmp_path):
+    feature_store = DuckDBPathResource(file_path=str(tmp_path / "feature_store.duckdb"))
+    with DagsterInstance.ephemeral() as instance:
+        result = materialize(
+            [core_data, core_data_history],
+            resources={"feature_store": feature_store},
+            run_config={"ops": {"core_data": {"config": {"num_rows": 100, "seed": 11}}}},
+            instance=instance,
+        )
+        started_at = datetime.fromtimestamp(instance.get_run_record_by_id(result.run_id).start_time)
+
+    # a retry of the step stamps the same snapshot_ts, which replaces the snapshot
+    assert FeatureStore(feature_store.file_path).snapshots()["snapshot_ts"].tolist() == [pd.Timestamp(started_at)]
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from shared_library.orchestration.frame_schema import MemoryReduction, enforce_schema
+
+schema = {"age": "int8", "has_special_offer": "bool", "available_gb": "Int8", "smartphone_brand": ["Samsung", "Other"]}
+
+
+def test_enforce_schema_casts_to_compact_dtypes():
+    frame = pd.DataFrame(
+        {
+            "age": [30, 45],
+            "has_special_offer": [1, 0],
+            "available_gb": [10.0, None],
+            "smartphone_brand": pd.Categorical(["Other", "Samsung"]),
+            "gross_mrc": [5.0, 7.5],
+        }
+    )
+    reduction = MemoryReduction()
+
+    compact = enforce_schema(frame, schema, reduction)
+
+    assert compact.dtypes.astype(str).to_dict() == {
+        "age": "int8",
+        "has_special_offer": "bool",
+        "available_gb": "Int8",
+        "smartphone_brand": "category",
+        # columns the schema does not declare are kept
+        "gross_mrc": "float64",
+    }
+    # in the declared order of the categories
+    assert list(compact["smartphone_brand"].cat.categories) == ["Samsung", "Other"]
+    assert compact["smartphone_brand"].tolist() == ["Other", "Samsung"]
+    assert compact["available_gb"].isna().tolist() == [False, True]
+    metadata = reduction.metadata()
+    assert metadata["memory_bytes"] < metadata["memory_bytes_before_schema"]
+    assert 0 < metadata["memory_reduction"] < 1
+
+
+def test_enforce_schema_raises_instead_of_losing_values():
+    with pytest.raises(ValueError, match="age"):
+        enforce_schema(pd.DataFrame({"age": [30, 300]}), schema)
+    with pytest.raises(ValueError, match="smartphone_brand"):
+        enforce_schema(pd.DataFrame({"smartphone_brand": ["Samsung", "Nokia"]}), schema)
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+from code_location_interview.assets.magenta_interview.generators import (
+    format_customer_ids,
+    generate_core_data,
+    generate_customer_interactions_chunk,
+)
+from code_location_interview.assets.magenta_interview.get_data import (
+    CoreDataConfig,
+    aggregated_bills,
+    bills,
+    core_data,
+    customer_interactions,
+    label,
+    pivoted_customer_interactions,
+    raw_features,
+)
+from code_location_interview.assets.magenta_interview.sparse_pivot import (
+    pivot_customer_interactions,
+)
+from dagster import DagsterInstance, materialize
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+
+def _core_data(config: CoreDataConfig) -> pd.DataFrame:
+    _, chunks = generate_core_data(config)
+    return pd.concat(list(chunks), ignore_index=True)
+
+
+def test_core_data_is_reproducible_for_a_seed():
+    config = CoreDataConfig(num_rows=25000, seed=7, chunk_size=10000)
+    pd.testing.assert_frame_equal(_core_data(config), _core_data(config))
+
+
+def test_core_data_respects_constraints():
+    unique_customer_ids, chunks = generate_core_data(
+        CoreDataConfig(num_rows=25000, seed=7, chunk_size=10000)
+    )
+    core_data = pd.concat(list(chunks), ignore_index=True)
+
+    assert len(core_data) == 25000
+    assert core_data["rating_account_id"].is_unique
+    assert core_data["customer_id"].isin(unique_customer_ids).all()
+    # integer codes of "<1-5>.<6 digits>"
+    assert pd.Series(format_customer_ids(unique_customer_ids)).str.fullmatch(r"[1-5]\.\d{6}").all()
+    assert core_data["age"].between(18, 100).all()
+    assert core_data["contract_lifetime_days"].between(7, 5 * 365).all()
+    assert (
+        core_data["remaining_binding_days"].abs() < core_data["contract_lifetime_days"]
+    ).all()
+    assert core_data["remaining_binding_days"].between(-2 * 365, 2 * 365).all()
+
+
+def test_customer_interactions_have_distinct_type_subtypes_per_customer():
+    interactions = generate_customer_interactions_chunk(np.random.default_rng(3), np.arange(100_000))
+
+    topics_per_customer = interactions.groupby("customer_id")["type_subtype"].agg(["size", "nunique"])
+    assert (topics_per_customer["size"] == topics_per_customer["nunique"]).all()
+    assert topics_per_customer["size"].between(1, 3).all()
+    # about 60/30/10% of the customers have 1, 2 and 3 topics
+    shares = topics_per_customer["size"].value_counts(normalize=True).sort_index()
+    np.testing.assert_allclose(shares, [0.6, 0.3, 0.1], atol=0.01)
+    # every type_subtype is drawn about as often
+    np.testing.assert_allclose(interactions["type_subtype"].value_counts(normalize=True), 0.25, atol=0.01)
+
+
+def test_sparse_pivot_matches_a_pandas_pivot():
+    interactions = pd.DataFrame(
+        {
+            "customer_id": [30, 10, 10, 20, 30, 30],
+            "type_subtype": ["vvl", "vvl", "rechnungsanfragen", "vvl", "rechnungsanfragen", "produkte&services-tarifwechsel"],
+            "n": [1, 2, 3, 4, 5, 6],
+            "days_since_last": [7, 8, 9, 10, 11, 12],
+        }
+    )
+
+    pivoted = pivot_customer_interactions(interactions)
+
+    expected = interactions.pivot(index="customer_id", columns="type_subtype")
+    assert pivoted.index.tolist() == [10, 20, 30]
+    assert pivoted["n_case_vvl"].tolist() == expected[("n", "vvl")].tolist() == [2, 4, 1]
+    assert pivoted["n_case_produkte&services-tarifdetails"].tolist() == [0, 0, 0]
+    assert pivoted["days_since_last_case_rechnungsanfragen"].tolist() == [9, pd.NA, 11]
+    assert pivoted["n_cases"].tolist() == [5, 4, 12]
+    assert pivoted["days_since_last_case"].tolist() == [8, 10, 7]
+
+    # sparse ids are factorized instead of ranked over their range
+    sparse = pivot_customer_interactions(interactions.assign(customer_id=interactions["customer_id"] * 10**9))
+    pd.testing.assert_frame_equal(sparse.set_axis(pivoted.index), pivoted)
+    # repeated cells sum n and keep the latest case
+    repeated = pivot_customer_interactions(pd.concat([interactions, interactions.assign(n=1, days_since_last=0)]))
+    assert repeated["n_case_vvl"].tolist() == [3, 5, 2]
+    assert repeated["days_since_last_case_vvl"].tolist() == [0, 0, 0]
+
+
+def test_streaming_mode_matches_in_memory_mode(tmp_path):
+    outputs = {}
+    for streaming in (False, True):
+        config = {
+            "seed": 7,
+            "chunk_size": 4000,
+            "streaming": streaming,
+            "output_dir": str(tmp_path),
+        }
+        result = materialize(
+            [core_data, bills, aggregated_bills, customer_interactions, pivoted_customer_interactions, raw_features, label],
+            run_config={
+                "ops": {
+                    "core_data": {"config": {"num_rows": 10000, **config}},
+                    "bills": {"config": config},
+                    "customer_interactions": {"config": config},
+                }
+            },
+            partition_key="2024-07-01",
+        )
+        assert result.success
+        outputs[streaming] = result
+
+    streamed_bills = outputs[True].output_for_node("bills")
+    assert isinstance(streamed_bills, ParquetDataset)
+    assert streamed_bills.num_rows == 10000
+    # the streamed inputs are pivoted and joined with DuckDB
+    for asset_name in ["aggregated_bills", "pivoted_customer_interactions", "raw_features"]:
+        pd.testing.assert_frame_equal(outputs[False].output_for_node(asset_name), outputs[True].output_for_node(asset_name))
+    # the churn is drawn without a seed, only the accounts match
+    pd.testing.assert_series_equal(
+        outputs[False].output_for_node("label")["rating_account_id"],
+        outputs[True].output_for_node("label")["rating_account_id"],
+    )
+
+
+def test_aggregated_bills_rolls_over_previous_months():
+    instance = DagsterInstance.ephemeral()
+    assets = [core_data, bills, aggregated_bills]
+    materialize(
+        assets,
+        selection=[core_data],
+        instance=instance,
+        run_config={"ops": {"core_data": {"config": {"num_rows": 1000, "seed": 3}}}},
+    )
+    monthly_bills = []
+    for partition_key in ["2024-05-01", "2024-06-01", "2024-07-01"]:
+        result = materialize(
+            assets, selection=[bills], instance=instance, partition_key=partition_key
+        )
+        monthly_bills.append(result.output_for_node("bills"))
+
+    result = materialize(
+        assets,
+        selection=[aggregated_bills],
+        instance=instance,
+        partition_key="2024-07-01",
+    )
+
+    # 2024-04 is inside the window but was never materialized
+    expected = (
+        pd.concat(monthly_bills)
+        .groupby("rating_account_id")["used_gb"]
+        .sum()
+        .reset_index(drop=True)
+    )
+    pd.testing.assert_series_equal(
+        result.output_for_node("aggregated_bills")["used_gb"], expected
+    )
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+# every run worker container imports the code location before it runs an op, the
+# libraries only asset bodies need must stay out of it
+heavy_modules = ["duckdb", "pandas", "polars", "pyarrow", "sklearn", "xgboost"]
+# seconds for a cold import, raise it with CODE_LOCATION_IMPORT_BUDGET on slow machines
+import_budget = float(os.environ.get("CODE_LOCATION_IMPORT_BUDGET", 5.0))
+
+cold_import = f"""
+import json, sys, time
+start = time.perf_counter()
+import code_location_interview
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "imported": [m for m in {heavy_modules!r} if m in sys.modules]}}))
+"""
+
+
+def _cold_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", cold_import],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    # the last line, logging of the definitions goes to stdout as well
+    return json.loads(output.splitlines()[-1])
+
+
+def test_code_location_does_not_import_heavy_libraries():
+    assert _cold_import()["imported"] == []
+
+
+def test_cold_import_time_stays_within_budget():
+    # the best of a few fresh interpreters, so one slow start does not fail the test
+    seconds = min(_cold_import()["seconds"] for _ in range(3))
+    assert seconds < import_budget, f"importing code_location_interview took {seconds:.2f}s"
@@ -0,0 +1,84 @@
+import pickle
+
+import pandas as pd
+from dagster import Output, asset, materialize
+from shared_library.orchestration.memoize import AssetCache, fingerprint, memoized
+
+
+def test_cache_evicts_the_least_recently_used_entries(tmp_path):
+    entry_bytes = len(pickle.dumps(b"x" * 1000, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = AssetCache(path=str(tmp_path), max_bytes=2 * entry_bytes)
+
+    cache.put("a", b"x" * 1000)
+    cache.put("b", b"x" * 1000)
+    assert cache.get("a") == (True, b"x" * 1000)
+    cache.put("c", b"x" * 1000)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+
+
+def test_fingerprint_depends_on_the_content_only():
+    frame = pd.DataFrame({"rating_account_id": [1, 2], "age": [30.0, None]})
+
+    assert fingerprint(frame) == fingerprint(frame.copy())
+    assert fingerprint(frame) != fingerprint(frame.assign(age=[31.0, None]))
+    assert fingerprint(frame) != fingerprint(frame.astype({"rating_account_id": "int32"}))
+    assert fingerprint({"a": 1, "b": [frame]}) == fingerprint({"b": [frame.copy()], "a": 1})
+
+
+def test_memoized_asset_skips_unchanged_inputs(tmp_path):
+    cache = AssetCache(path=str(tmp_path), max_bytes=1 << 20)
+    calls = []
+
+    @memoized(lambda: cache, version="1")
+    def doubled(numbers):
+        calls.append(numbers)
+        return Output(numbers * 2, metadata={"num_rows": len(numbers)})
+
+    numbers = pd.DataFrame({"n": [1, 2, 3]})
+    first, second = doubled(numbers), doubled(numbers.copy())
+    changed = doubled(numbers.assign(n=[1, 2, 4]))
+
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(first.value, second.value)
+    assert [first.metadata["memoized"].value, second.metadata["memoized"].value] == [False, True]
+    assert first.data_version == second.data_version != changed.data_version
+    assert second.metadata["num_rows"].value == 3
+
+
+def test_memoized_version_invalidates_the_cache(tmp_path):
+    cache = AssetCache(path=str(tmp_path), max_bytes=1 << 20)
+    calls = []
+
+    def doubled(numbers):
+        calls.append(numbers)
+        return Output(numbers * 2)
+
+    numbers = pd.DataFrame({"n": [1, 2, 3]})
+    # i.e. a helper of doubled changed and its version was bumped
+    first = memoized(lambda: cache, version="1")(doubled)(numbers)
+    second = memoized(lambda: cache, version="2")(doubled)(numbers)
+
+    assert len(calls) == 2
+    assert first.data_version != second.data_version
+
+
+def test_memoized_assets_run_in_dagster(tmp_path):
+    cache = AssetCache(path=str(tmp_path), max_bytes=1 << 20)
+
+    @asset
+    def numbers() -> pd.DataFrame:
+        return pd.DataFrame({"n": [1, 2, 3]})
+
+    @asset
+    @memoized(lambda: cache, version="1")
+    def total(numbers: pd.DataFrame):
+        return Output(int(numbers["n"].sum()))
+
+    results = [materialize([numbers, total]) for _ in range(2)]
+
+    assert [result.output_for_node("total") for result in results] == [6, 6]
+    materializations = [result.asset_materializations_for_node("total")[0] for result in results]
+    assert [m.metadata["memoized"].value for m in materializations] == [False, True]
+    assert materializations[0].tags["dagster/data_version"] == materializations[1].tags["dagster/data_version"]
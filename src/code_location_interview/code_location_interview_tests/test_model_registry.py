@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from code_location_interview.assets.magenta_interview.deployment import (
+    DeployedModelConfiguration,
+    deployed_model,
+    model_candidates,
+)
+from code_location_interview.assets.magenta_interview.train import trained_model
+from code_location_interview.resources.model_registry import ModelRegistry
+from dagster import Failure, asset, materialize
+from sklearn.base import clone
+
+
+def test_loaded_model_predicts_like_the_trained_model(training_result, registered_model):
+    features_df, model = training_result
+    features_df = features_df.set_index("rating_account_id")
+
+    loaded = registered_model.load()
+
+    assert loaded is registered_model.load()
+    np.testing.assert_array_equal(
+        loaded.predict_proba(features_df), model.predict_proba(features_df)
+    )
+
+
+def test_models_are_content_addressed_and_looked_up_by_metric(training_result, tmp_path):
+    features_df, model = training_result
+    features_df = features_df.set_index("rating_account_id")
+    other_model = clone(model).fit(features_df, features_df["age"] > 50)
+    model_registry = ModelRegistry(base_path=str(tmp_path))
+
+    first = model_registry.register(model, metrics={"roc_auc_score": 0.9})
+    again = model_registry.register(model, metrics={"roc_auc_score": 0.9})
+    second = model_registry.register(other_model, metrics={"roc_auc_score": 0.7})
+
+    assert first.model_id == again.model_id != second.model_id
+    assert model_registry.model_ids() == [first.model_id, second.model_id]
+    assert model_registry.latest().model_id == second.model_id
+    assert model_registry.best("roc_auc_score").model_id == first.model_id
+    assert model_registry.best("roc_auc_score", higher_is_better=False) == second
+
+
+def test_deployed_model_resolves_the_configured_model(model_registry, registered_model):
+    candidates = model_registry.model_ids()
+
+    deployed = deployed_model(
+        model_candidates=candidates,
+        config=DeployedModelConfiguration(select="best"),
+        model_registry=model_registry,
+    )
+    assert deployed.value == registered_model
+
+    with pytest.raises(Failure):
+        deployed_model(
+            model_candidates=candidates,
+            config=DeployedModelConfiguration(model_id="unknown"),
+            model_registry=model_registry,
+        )
+
+
+def test_registered_metrics_are_the_evaluation_metrics(training_data, tmp_path):
+    _, train, test = training_data
+
+    @asset
+    def train_data():
+        return train.copy()
+
+    @asset
+    def test_data():
+        return test.copy()
+
+    @asset
+    def tuned_hyperparameters() -> dict:
+        return {"n_estimators": 10}
+
+    model_registry = ModelRegistry(base_path=str(tmp_path))
+    result = materialize(
+        [train_data, test_data, tuned_hyperparameters, trained_model, model_candidates],
+        resources={"model_registry": model_registry},
+    )
+
+    assert result.success
+    # not the wall_seconds and other floats @profiled adds to the metadata
+    assert set(model_registry.latest().metrics) == {"precision_score", "recall_score", "f1_score", "roc_auc_score"}
@@ -0,0 +1,69 @@
+import pandas as pd
+import polars as pl
+import pytest
+from code_location_interview.assets.magenta_interview.get_data import core_data, label
+from code_location_interview.resources.parquet_io_manager import ParquetIOManager
+from dagster import AssetIn, MonthlyPartitionsDefinition, asset, materialize
+from dagster._core.storage.tags import (
+    ASSET_PARTITION_RANGE_END_TAG,
+    ASSET_PARTITION_RANGE_START_TAG,
+)
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+
+@asset(ins={"core_data": AssetIn(metadata={"columns": ["rating_account_id", "age"]})})
+def projected_core_data(core_data: pl.DataFrame) -> pl.DataFrame:
+    return core_data
+
+
+@asset(ins={"label": AssetIn(metadata={"lazy": True})})
+def lazy_label(label) -> int:
+    assert isinstance(label, ParquetDataset)
+    return label.num_rows
+
+
+def test_dataframes_are_stored_as_parquet_and_projected_on_load(tmp_path):
+    result = materialize(
+        [core_data, label, projected_core_data, lazy_label],
+        resources={"io_manager": ParquetIOManager(base_path=str(tmp_path))},
+        run_config={"ops": {"core_data": {"config": {"num_rows": 1000, "seed": 1}}}},
+    )
+
+    assert result.success
+    assert (tmp_path / "core_data.parquet").exists()
+    assert (tmp_path / "label.parquet").exists()
+
+    projected = result.output_for_node("projected_core_data")
+    assert isinstance(projected, pl.DataFrame)
+    assert projected.columns == ["rating_account_id", "age"]
+    assert projected.height == 1000
+    assert result.output_for_node("lazy_label") == 1000
+
+
+monthly = MonthlyPartitionsDefinition(start_date="2024-01-01", end_date="2024-04-01")
+partition_range = {ASSET_PARTITION_RANGE_START_TAG: "2024-01-01", ASSET_PARTITION_RANGE_END_TAG: "2024-03-01"}
+
+
+@asset(partitions_def=monthly)
+def monthly_rows(context) -> dict:
+    return {partition_key: pd.DataFrame({"month": [partition_key]}) for partition_key in context.partition_keys}
+
+
+@asset(partitions_def=monthly)
+def monthly_frame(context) -> pd.DataFrame:
+    return pd.DataFrame({"month": context.partition_keys})
+
+
+def test_partition_ranges_are_stored_per_partition(tmp_path):
+    io_manager = ParquetIOManager(base_path=str(tmp_path))
+
+    result = materialize([monthly_rows], resources={"io_manager": io_manager}, tags=partition_range)
+
+    assert result.success
+    assert sorted(path.name for path in (tmp_path / "monthly_rows").iterdir()) == [
+        "2024-01-01.parquet",
+        "2024-02-01.parquet",
+        "2024-03-01.parquet",
+    ]
+    with pytest.raises(ValueError, match="monthly_frame ran for the partition range 2024-01-01...2024-03-01"):
+        materialize([monthly_frame], resources={"io_manager": io_manager}, tags=partition_range)
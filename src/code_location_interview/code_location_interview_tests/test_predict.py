@@ -0,0 +1,165 @@
+import pandas as pd
+import pytest
+from code_location_interview.assets.magenta_interview.predict import (
+    PredictionHistoryConfig,
+    PredictionsConfig,
+    prediction_history,
+    predictions,
+)
+from code_location_interview.assets.magenta_interview.prediction_store import (
+    PredictionStore,
+)
+from code_location_interview.assets.magenta_interview.scoring import (
+    feature_hashes,
+    score_incrementally,
+)
+from code_location_interview.resources.duckdb_path import DuckDBPathResource
+from dagster import build_asset_context
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+partition_key = "2024-07-01"
+
+
+def _expected(features: pd.DataFrame, model) -> pd.DataFrame:
+    # scoring all features in one call, as the asset did before batching
+    indexed = features.set_index("rating_account_id")
+    return pd.DataFrame(
+        {
+            "rating_account_id": indexed.index,
+            "churn_risk": model.predict_proba(indexed)[:, 1],
+        }
+    )
+
+
+def _prediction_store(tmp_path) -> DuckDBPathResource:
+    return DuckDBPathResource(file_path=str(tmp_path / "prediction_store.duckdb"))
+
+
+@pytest.mark.parametrize(
+    "executor, engine",
+    [("thread", "sklearn"), ("thread", "compiled"), ("process", "compiled")],
+)
+def test_batched_predictions_match_a_single_predict_call(
+    training_result, registered_model, executor, engine, tmp_path
+):
+    features_df, model = training_result
+    config = PredictionsConfig(
+        batch_size=700, num_workers=3, executor=executor, engine=engine
+    )
+    classifier = registered_model.load().steps[-1][1]
+    booster_config = classifier.get_booster().save_config()
+
+    result = predictions(
+        build_asset_context(partition_key=partition_key),
+        config,
+        features_df,
+        registered_model,
+        _prediction_store(tmp_path),
+    )
+
+    assert result["run_dt"].nunique() == 1
+    pd.testing.assert_frame_equal(
+        result.drop(columns=["feature_hash", "run_dt"]), _expected(features_df, model)
+    )
+    # the thread cap of the workers is not left on the model shared by the process
+    assert registered_model.load().steps[-1][1] is classifier
+    assert classifier.n_jobs is None
+    assert classifier.get_booster().save_config() == booster_config
+
+
+def test_streamed_predictions_match_a_single_predict_call(
+    training_result, registered_model, tmp_path
+):
+    features_df, model = training_result
+    config = PredictionsConfig(
+        batch_size=700, num_workers=2, streaming=True, output_dir=str(tmp_path)
+    )
+
+    result = predictions(
+        build_asset_context(partition_key=partition_key),
+        config,
+        features_df,
+        registered_model,
+        _prediction_store(tmp_path),
+    )
+
+    assert isinstance(result, ParquetDataset)
+    assert result.num_rows == len(features_df)
+    pd.testing.assert_frame_equal(
+        result.to_pandas().drop(columns=["feature_hash", "run_dt"]), _expected(features_df, model)
+    )
+
+
+def test_prediction_history_stores_every_run(training_result, registered_model, tmp_path):
+    features_df, _ = training_result
+    prediction_store = _prediction_store(tmp_path)
+
+    scored = predictions(
+        build_asset_context(partition_key=partition_key),
+        PredictionsConfig(),
+        features_df,
+        registered_model,
+        prediction_store,
+    )
+    # two runs of prediction_history on the same predictions are stored as two runs,
+    # each under the run_dt of its own run
+    for _ in range(2):
+        prediction_history(
+            build_asset_context(partition_key=partition_key),
+            PredictionHistoryConfig(max_uncompacted_runs=2),
+            prediction_store,
+            scored,
+            registered_model,
+        )
+
+    store = PredictionStore(prediction_store.file_path)
+    runs = store.runs()
+    assert runs["num_rows"].tolist() == [len(features_df)] * 2
+    assert runs["run_dt"].is_unique and not runs["run_dt"].isin(scored["run_dt"]).any()
+    assert (runs["model_id"] == registered_model.model_id).all()
+    # the second run compacted the store
+    assert runs["compacted"].all()
+    latest = store.latest()
+    pd.testing.assert_frame_equal(
+        latest[["rating_account_id", "churn_risk"]],
+        scored[["rating_account_id", "churn_risk"]].sort_values("rating_account_id", ignore_index=True),
+        check_dtype=False,
+    )
+
+
+def test_incremental_predictions_match_a_full_rescore(training_result, registered_model, tmp_path):
+    features_df, model = training_result
+    prediction_store = _prediction_store(tmp_path)
+    store = PredictionStore(prediction_store.file_path)
+    full_config = PredictionsConfig(batch_size=700)
+    store.append(
+        predictions(build_asset_context(partition_key=partition_key), full_config, features_df, registered_model, prediction_store),
+        model_id=registered_model.model_id,
+    )
+
+    # a weekly refresh: an account left, nine changed and a new one joined
+    refreshed = features_df.iloc[1:].assign(age=lambda df: df["age"].where(df.index >= 10, df["age"] + 1))
+    new_account = refreshed.iloc[[0]].assign(rating_account_id=features_df["rating_account_id"].max() + 1)
+    refreshed = pd.concat([refreshed, new_account], ignore_index=True)
+
+    incremental = predictions(
+        build_asset_context(partition_key=partition_key),
+        PredictionsConfig(batch_size=700, incremental=True),
+        refreshed,
+        registered_model,
+        prediction_store,
+    )
+    full = predictions(build_asset_context(partition_key=partition_key), full_config, refreshed, registered_model, prediction_store)
+    pd.testing.assert_frame_equal(incremental.drop(columns="run_dt"), full.drop(columns="run_dt"))
+
+    hashes = feature_hashes(model, refreshed)
+    previous = store.latest_feature_hashes()
+    batches, num_scored = score_incrementally(model, registered_model.model_id, refreshed, hashes, previous, batch_size=4)
+    assert num_scored == 9 + 1
+    # rescored and carried forward rows are merged batch by batch, in input order
+    batches = list(batches)
+    assert {len(batch) for batch in batches[:-1]} == {4}
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), full[["rating_account_id", "churn_risk"]])
+    # scores of another model are never carried forward
+    _, num_scored = score_incrementally(model, "another-model", refreshed, hashes, previous)
+    assert num_scored == len(refreshed)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from code_location_interview.assets.magenta_interview.prediction_store import (
+    PredictionStore,
+)
+from shared_library.orchestration.parquet_dataset import write_parquet_dataset
+
+
+def _run(run_dt: str, rating_account_ids, churn_risk) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "rating_account_id": np.asarray(rating_account_ids, dtype="int32"),
+            "churn_risk": np.asarray(churn_risk, dtype="float32"),
+            "run_dt": pd.Timestamp(run_dt),
+        }
+    )
+
+
+def test_prediction_store_keeps_the_history_of_every_account(tmp_path):
+    store = PredictionStore(str(tmp_path / "prediction_store.duckdb"))
+    store.append(_run("2024-07-01 02:00", [3, 1, 2], [0.25, 0.5, 0.75]), model_id="a")
+    # runs streamed to a Parquet dataset are appended without loading them
+    dataset = write_parquet_dataset(str(tmp_path / "run"), iter([_run("2024-07-08 02:00", [1, 2], [0.75, 0.5])]))
+    assert store.append(dataset, model_id="b") == 2
+
+    history = store.history([1, 3])
+    assert history["rating_account_id"].tolist() == [1, 1, 3]
+    assert history["churn_risk"].tolist() == [0.5, 0.75, 0.25]
+    assert history["model_id"].tolist() == ["a", "b", "a"]
+    assert pd.isna(history["churn_risk_change"][0]) and history["churn_risk_change"][1] == 0.25
+    # the change of the first score since is relative to the score before
+    assert store.history([1], since="2024-07-08")["churn_risk_change"].tolist() == [0.25]
+
+    latest = store.latest()
+    assert latest["rating_account_id"].tolist() == [1, 2, 3]
+    assert latest["churn_risk"].tolist() == [0.75, 0.5, 0.25]
+    assert latest["model_id"].tolist() == ["b", "b", "a"]
+    # lookups in a with block share one connection
+    with store:
+        assert store.latest([2])["run_dt"].tolist() == [pd.Timestamp("2024-07-08 02:00")]
+        assert store.latest([4]).empty
+
+
+def test_appending_a_run_again_replaces_it(tmp_path):
+    store = PredictionStore(str(tmp_path / "prediction_store.duckdb"))
+    store.append(_run("2024-07-01", [1, 2], [0.5, 0.5]))
+    store.append(_run("2024-07-08", [1, 2], [0.25, 0.25]))
+    # a rerun of the second run without account 2
+    store.append(_run("2024-07-08", [1], [0.125]))
+
+    assert store.runs()["num_rows"].tolist() == [2, 1]
+    assert store.latest()["churn_risk"].tolist() == [0.125, 0.5]
+    assert len(store.history([1, 2])) == 3
+
+
+def test_compaction_keeps_every_score(tmp_path):
+    store = PredictionStore(str(tmp_path / "prediction_store.duckdb"))
+    rng = np.random.default_rng(0)
+    for week in range(4):
+        store.append(_run(f"2024-07-{1 + 7 * week:02d}", rng.permutation(1000), rng.random(1000)))
+    before = store.history(range(0, 1000, 7))
+
+    assert store.needs_compaction(max_uncompacted_runs=4)
+    store.compact()
+
+    assert not store.needs_compaction(max_uncompacted_runs=1)
+    pd.testing.assert_frame_equal(store.history(range(0, 1000, 7)), before)
+    assert len(store.latest()) == 1000
@@ -0,0 +1,90 @@
+import pstats
+import tracemalloc
+
+import pandas as pd
+import polars as pl
+from dagster import AssetOut, Output, asset, materialize, multi_asset
+from shared_library.orchestration.profiling import AssetProfiler, profiled, size_of
+
+
+def test_size_of_frames_and_partitions():
+    frame = pd.DataFrame({"n": range(10)}, dtype="int64")
+
+    assert size_of(frame) == (10, frame.memory_usage(index=True).sum())
+    assert size_of(pl.DataFrame({"n": range(10)})) == (10, 80)
+    # the partitions of a partitioned input are summed
+    assert size_of({"2024-01-01": frame, "2024-02-01": frame})[0] == 20
+    assert size_of(Output(frame)) == size_of(frame)
+    assert size_of({"learning_rate": 0.1}) is None
+
+
+def test_profiled_assets_report_their_resource_usage(tmp_path):
+    profiler = AssetProfiler(path=str(tmp_path))
+
+    @asset
+    @profiled(lambda: profiler)
+    def numbers() -> pd.DataFrame:
+        return pd.DataFrame({"n": range(1000)})
+
+    @multi_asset(outs={"evens": AssetOut(), "odds": AssetOut()})
+    @profiled(lambda: profiler)
+    def split(numbers: pd.DataFrame):
+        return numbers[numbers["n"] % 2 == 0], numbers[numbers["n"] % 2 == 1].head(10)
+
+    result = materialize([numbers, split], tags={"asset_profiler": "cprofile"})
+
+    assert result.success
+    metadata = {
+        materialization.asset_key.path[-1]: materialization.metadata
+        for node in ("numbers", "split")
+        for materialization in result.asset_materializations_for_node(node)
+    }
+    assert metadata["numbers"]["output_rows"].value == 1000
+    assert metadata["numbers"]["input_rows"].value == 0
+    assert [metadata[name]["output_rows"].value for name in ("evens", "odds")] == [500, 10]
+    assert metadata["evens"]["input_rows"].value == metadata["odds"]["input_rows"].value == 1000
+    assert metadata["evens"]["inputs"].value == {
+        "numbers": {"rows": 1000, "bytes": metadata["numbers"]["output_bytes"].value}
+    }
+    for name in ("numbers", "evens"):
+        assert metadata[name]["wall_seconds"].value > 0
+        assert metadata[name]["cpu_seconds"].value >= 0
+        assert metadata[name]["peak_rss_bytes"].value > 0
+    # the run asked for a profile of every step
+    profile = metadata["evens"]["profile"].value
+    assert profile == str(tmp_path.joinpath(result.run_id, "split.prof"))
+    assert pstats.Stats(profile).total_calls > 0
+
+
+def test_profiled_assets_trace_allocations_on_request(tmp_path):
+    @asset
+    @profiled(lambda: AssetProfiler(path=str(tmp_path), trace_allocations=True))
+    def numbers() -> pd.DataFrame:
+        return pd.DataFrame({"n": range(100_000)})
+
+    result = materialize([numbers])
+
+    metadata = result.asset_materializations_for_node("numbers")[0].metadata
+    assert metadata["peak_traced_bytes"].value > 0
+    # without a profiler no profile is written
+    assert "profile" not in metadata
+    assert not any(tmp_path.iterdir())
+    # called outside of a run, the asset function is called as is
+    assert len(numbers()) == 100_000
+
+
+def test_profiled_assets_leave_tracing_they_did_not_start_running(tmp_path):
+    @asset
+    @profiled(lambda: AssetProfiler(path=str(tmp_path), trace_allocations=True))
+    def numbers() -> pd.DataFrame:
+        return pd.DataFrame({"n": range(1000)})
+
+    tracemalloc.start()
+    try:
+        result = materialize([numbers])
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    # the allocations of the asset can't be told apart from the ones of the caller
+    assert "peak_traced_bytes" not in result.asset_materializations_for_node("numbers")[0].metadata
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+from code_location_interview.serving.service import ScoringService
+
+
+def _records(features: pd.DataFrame) -> list[dict]:
+    # JSON clients send null for missing values
+    records = features.astype(object).where(features.notna(), None).to_dict("records")
+    return json.loads(json.dumps(records, default=lambda value: value.item()))
+
+
+async def _call(service: ScoringService, method: str, path: str, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await service({"type": "http", "method": method, "path": path}, receive, send)
+    return messages[0]["status"], json.loads(messages[1]["body"])
+
+
+def _expected(features: pd.DataFrame, model) -> np.ndarray:
+    return model.predict_proba(features.set_index("rating_account_id"))[:, 1]
+
+
+def test_concurrent_requests_are_micro_batched(training_result):
+    features_df, model = training_result
+    features_df = features_df.head(300)
+    service = ScoringService(model, max_batch_size=64, max_wait_ms=20)
+
+    async def score_concurrently():
+        responses = await asyncio.gather(
+            *[_call(service, "POST", "/score", record) for record in _records(features_df)]
+        )
+        return responses, await _call(service, "GET", "/metrics")
+
+    responses, (_, metrics) = asyncio.run(score_concurrently())
+
+    assert {status for status, _ in responses} == {200}
+    scores = pd.DataFrame([score for _, score in responses])
+    np.testing.assert_array_equal(
+        scores["rating_account_id"], features_df["rating_account_id"]
+    )
+    np.testing.assert_array_equal(scores["churn_risk"], _expected(features_df, model))
+    assert metrics["count"] == 300
+    assert metrics["p50_ms"] <= metrics["p99_ms"]
+    assert 1 < metrics["mean_batch_size"] <= 64
+
+
+def test_bulk_payloads_and_errors(training_result):
+    features_df, model = training_result
+    features_df = features_df.tail(50)
+    service = ScoringService(model)
+
+    async def requests():
+        return (
+            await _call(service, "POST", "/score", _records(features_df)),
+            await _call(service, "POST", "/score", []),
+            await _call(service, "POST", "/score", {"age": "old"}),
+            await _call(service, "GET", "/unknown"),
+        )
+
+    bulk, empty, invalid, unknown = asyncio.run(requests())
+
+    assert bulk[0] == 200
+    np.testing.assert_array_equal(
+        [score["churn_risk"] for score in bulk[1]], _expected(features_df, model)
+    )
+    assert empty[0] == invalid[0] == 400
+    assert unknown[0] == 404
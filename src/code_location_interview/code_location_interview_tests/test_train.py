@@ -0,0 +1,93 @@
+import pandas as pd
+import xgboost as xgb
+from code_location_interview.assets.magenta_interview.hyperparameter_search import (
+    successive_halving,
+)
+from code_location_interview.assets.magenta_interview.out_of_core import (
+    ParquetBatchIter,
+)
+from code_location_interview.assets.magenta_interview.train import (
+    HyperparameterSearchConfig,
+    TrainedModelConfig,
+    TrainingDataConfig,
+    df_input,
+    split_train_test,
+    trained_model,
+    tuned_hyperparameters,
+)
+from dagster import build_asset_context
+from shared_library.orchestration.parquet_dataset import ParquetDataset
+
+
+def test_successive_halving_continues_the_best_candidates():
+    candidates = [{"max_depth": depth} for depth in range(1, 10)]
+    evaluations = []
+
+    def evaluate(batch):
+        evaluations.append(batch)
+        # deeper is better, more rounds are better
+        return [
+            {"auc": params["max_depth"] / 10 + num_rounds / 1000, "n_estimators": num_rounds}
+            for params, num_rounds in batch
+        ]
+
+    best, history = successive_halving(
+        evaluate, candidates, min_rounds=10, max_rounds=1000, halving_factor=3
+    )
+
+    assert [len(batch) for batch in evaluations] == [9, 3, 1]
+    assert [num_rounds for _, num_rounds in evaluations[-1]] == [90]
+    assert best == {"max_depth": 9, "n_estimators": 90}
+    assert len(history) == 13
+
+
+def test_tuned_hyperparameters_are_used_for_training(training_data):
+    _, train_data, test_data = training_data
+    config = HyperparameterSearchConfig(
+        num_candidates=4, min_rounds=5, max_rounds=20, halving_factor=2, num_workers=2
+    )
+    context = build_asset_context()
+
+    best = tuned_hyperparameters(context, config, train_data.copy())
+
+    assert 1 <= best["n_estimators"] <= 20
+    result = trained_model(TrainedModelConfig(), train_data.copy(), test_data.copy(), best)
+    assert result.value.pipeline.named_steps["classifier"].n_estimators == best["n_estimators"]
+    assert 0.5 < result.metadata["metrics"].value["roc_auc_score"] <= 1.0
+
+
+def test_out_of_core_training(training_data, tmp_path):
+    features_df, train_data, test_data = training_data
+    label_df = pd.concat([train_data, test_data])[["rating_account_id", "has_churned"]]
+    config = TrainingDataConfig(mode="out_of_core", output_dir=str(tmp_path))
+
+    dataset = df_input(build_asset_context(), config, features_df, label_df)
+    ooc_train, ooc_test = split_train_test(dataset)
+
+    assert isinstance(ooc_train, ParquetDataset)
+    train_ids = set(ooc_train.to_pandas(["rating_account_id"])["rating_account_id"])
+    test_ids = set(ooc_test.to_pandas(["rating_account_id"])["rating_account_id"])
+    assert not train_ids & test_ids
+    assert train_ids | test_ids == set(label_df["rating_account_id"])
+    assert ooc_train.num_rows + ooc_test.num_rows == len(label_df)
+    assert 0.15 < ooc_test.num_rows / len(label_df) < 0.25
+    # the split only depends on the account, not on the run
+    again = df_input(build_asset_context(), config, features_df, label_df)
+    _, again_test = split_train_test(again)
+    assert set(again_test.to_pandas(["rating_account_id"])["rating_account_id"]) == test_ids
+
+    # chunks smaller than the data to go through several DataIter batches
+    result = trained_model(TrainedModelConfig(batch_size=1000), ooc_train, ooc_test, {"n_estimators": 20})
+    assert 0.5 < result.value.metrics["roc_auc_score"] <= 1.0
+    model = result.value.pipeline
+    assert model.named_steps["classifier"].n_estimators == 20
+    churn_risk = model.predict_proba(features_df.set_index("rating_account_id"))[:, 1]
+    assert ((churn_risk >= 0) & (churn_risk <= 1)).all()
+
+    # the train split goes to XGBoost as cache pages on disk, not as one in-memory matrix
+    cache_dir = tmp_path / "xgboost-cache"
+    cache_dir.mkdir()
+    batches = ParquetBatchIter(ooc_train, model.named_steps["preprocessing"], 1000, cache_prefix=str(cache_dir / "train"))
+    dtrain = xgb.DMatrix(batches)
+    assert dtrain.num_row() == ooc_train.num_rows
+    assert any(path.name.endswith(".page") for path in cache_dir.iterdir())
@@ -1,8 +1,30 @@
 import json
 import os
-from typing import Any, Mapping, Optional, Tuple
+import queue
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from dagster import AssetKey, MetadataValue, OpExecutionContext, Output
+from dagster import (
+    AssetKey,
+    AssetObservation,
+    Config,
+    MetadataValue,
+    OpExecutionContext,
+    Output,
+    TimeWindow,
+)
 from dagster_dbt import (
     DagsterDbtTranslator,
     DagsterDbtTranslatorSettings,
@@ -14,8 +36,31 @@ from dagster_dbt import (
 # all based on https://github.com/dagster-io/hooli-data-eng-pipelines/blob/master/hooli_data_eng/assets/dbt_assets.py
 
 
+# dbt resource types the translator indexes up front, other nodes (i.e. tests) are
+# indexed when they are first looked up
+indexed_resource_types = {"model", "seed", "snapshot", "source"}
+
+
+class IndexedDbtNode(NamedTuple):
+    """What the translator derives from one dbt node, computed once per node."""
+
+    dbt_resource_props: Mapping[str, Any]
+    asset_key: AssetKey
+    group_name: Optional[str]
+    metadata: Mapping[str, Any]
+
+
 def build_DbtTranslator(warehouse_name: str, dbt_target_schema: str):  # noqa: C901
     class AsciiDbtTranslator(DagsterDbtTranslator):
+        """Translator with one precomputed unique_id -> IndexedDbtNode index per manifest.
+
+        dagster-dbt asks for the asset key of a node many times, i.e. once per
+        downstream node while building the asset specs and again for every event
+        of a run. Every answer is looked up in the index instead of being derived
+        from the nested node props again. A node of another manifest with the same
+        unique_id (i.e. of another target) replaces the index entry.
+        """
+
         _partitioning_default_column_name = None
         _partitioning_overrides: Mapping[str, str] = {}
 
@@ -24,14 +69,52 @@ def build_DbtTranslator(warehouse_name: str, dbt_target_schema: str):  # noqa: C
             settings: Optional[DagsterDbtTranslatorSettings] = None,
             partitioning_default_column_name: str = "day_dt",
             partitioning_overrides: Mapping[str, str] = {},
+            manifest: Optional[Mapping[str, Any]] = None,
         ):
             super().__init__(settings=settings)
             self._partitioning_default_column_name = partitioning_default_column_name
             self._partitioning_overrides = partitioning_overrides
+            self._node_index: dict[str, IndexedDbtNode] = {}
+            if manifest is not None:
+                self.index_manifest(manifest)
+
+        def index_manifest(self, manifest: Mapping[str, Any]) -> None:
+            """Precomputes asset key, group and metadata of the asset nodes of the manifest."""
+            for dbt_resource_props in (*manifest["nodes"].values(), *manifest["sources"].values()):
+                if dbt_resource_props["resource_type"] in indexed_resource_types:
+                    self._index(dbt_resource_props)
+
+        def _index(self, dbt_resource_props: Mapping[str, Any]) -> IndexedDbtNode:
+            node = IndexedDbtNode(
+                dbt_resource_props=dbt_resource_props,
+                asset_key=self._derive_asset_key(dbt_resource_props),
+                group_name=self._derive_group_name(dbt_resource_props),
+                metadata=self._derive_metadata(dbt_resource_props),
+            )
+            self._node_index[dbt_resource_props["unique_id"]] = node
+            return node
+
+        def _lookup(self, dbt_resource_props: Mapping[str, Any]) -> IndexedDbtNode:
+            node = self._node_index.get(dbt_resource_props["unique_id"])
+            # the props are the node dicts of the manifest, identity tells the manifests apart
+            if node is None or node.dbt_resource_props is not dbt_resource_props:
+                node = self._index(dbt_resource_props)
+            return node
+
+        def get_asset_key(self, dbt_resource_props: Mapping[str, Any]) -> AssetKey:  # type: ignore
+            return self._lookup(dbt_resource_props).asset_key
+
+        def get_group_name(self, dbt_resource_props: Mapping[str, Any]):
+            return self._lookup(dbt_resource_props).group_name
+
+        def get_metadata(
+            self, dbt_resource_props: Mapping[str, Any]
+        ) -> Mapping[str, Any]:
+            return self._lookup(dbt_resource_props).metadata
 
         # for details see:
         # https://github.com/dagster-io/hooli-data-eng-pipelines/blob/master/hooli_data_eng/assets/dbt_assets.py
-        def get_asset_key(self, dbt_resource_props: Mapping[str, Any]) -> AssetKey:  # type: ignore
+        def _derive_asset_key(self, dbt_resource_props: Mapping[str, Any]) -> AssetKey:
             # take key from meta if provided otherwise build unique id
             if (
                 dbt_resource_props.get("meta", {})
@@ -48,7 +131,7 @@ def build_DbtTranslator(warehouse_name: str, dbt_target_schema: str):  # noqa: C
                     [dbt_resource_props["database"], dbt_resource_props["schema"]]
                 )
 
-        def get_group_name(self, dbt_resource_props: Mapping[str, Any]):
+        def _derive_group_name(self, dbt_resource_props: Mapping[str, Any]):
             "form DBT folders as asset groups. Potentially rethink in the future"
             group_name = super().get_group_name(dbt_resource_props)
             if group_name is None:
@@ -62,16 +145,16 @@ def build_DbtTranslator(warehouse_name: str, dbt_target_schema: str):  # noqa: C
             else:
                 return group_name
 
-        def get_metadata(
+        def _derive_metadata(
             self, dbt_resource_props: Mapping[str, Any]
         ) -> Mapping[str, Any]:
-            metadata = {"partition_expr": self._partitioning_default_column_name}
-
             # for any deviating partitoining name a) either load the translator with different settings
-            #  or b) modify it to accept an dictionary of overrides
-            for k, v in self._partitioning_overrides.items():
-                if dbt_resource_props["name"] == k:
-                    metadata = {"partition_expr": v}
+            #  or b) pass it in the dictionary of overrides
+            metadata = {
+                "partition_expr": self._partitioning_overrides.get(
+                    dbt_resource_props["name"], self._partitioning_default_column_name
+                )
+            }
 
             default_metadata = default_metadata_from_dbt_resource_props(
                 dbt_resource_props
@@ -82,104 +165,543 @@ def build_DbtTranslator(warehouse_name: str, dbt_target_schema: str):  # noqa: C
     return AsciiDbtTranslator
 
 
-def generate_additional_metadata_for_output(
-    output: Output,
-    manifest: dict,
-    results_by_asset_key: dict,
-    dbt_resource_props_by_asset_key: dict,
-    dagster_dbt_translator: DagsterDbtTranslator,
-) -> Mapping[str, Any]:
+def _output_unique_id(output: Output) -> str:
     # Get the unique id of the dbt node from the output
     value = output.metadata["unique_id"].value
     if not isinstance(value, str):
         raise TypeError(
             f"Expected unique_id to be a str, got {type(value)} instead. unique_id: {value}"
         )
-    dbt_unique_id: str = value
+    return value
+
+
+def generate_additional_metadata_for_output(node: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Metadata known from the manifest, attached to the output before it is yielded."""
+    meta_owner: Optional[str] = (node.get("meta") or {}).get("owner")
+    return {"owner": meta_owner} if meta_owner else {}
 
-    # Get the asset key from the unique id
-    asset_key = dagster_dbt_translator.get_asset_key(manifest["nodes"][dbt_unique_id])
 
-    # Retrieve the results using the asset key, and get the rows_affected.
-    result = results_by_asset_key[asset_key]
-    rows_affected: Optional[int] = result["adapter_response"].get("rows_affected")
+def generate_run_results_metadata(
+    result: Mapping[str, Any], executed_node: Optional[Mapping[str, Any]]
+) -> Mapping[str, Any]:
+    """Metadata only known once dbt wrote run_results.json and the executed manifest."""
+    rows_affected: Optional[int] = result.get("adapter_response", {}).get("rows_affected")
     rows_affected_metadata = {"rows_affected": rows_affected} if rows_affected else {}
 
-    # Retrieve the dbt resource props using the asset key, and get the compiled code and owner.
-    node = dbt_resource_props_by_asset_key[asset_key]
-    compiled_sql: Optional[str] = node.get("compiled_code")
+    compiled_sql: Optional[str] = (executed_node or {}).get("compiled_code")
     compiled_sql_metadata = (
         {"compiled_sql": MetadataValue.md(compiled_sql)} if compiled_sql else {}
     )
 
-    meta_owner: Optional[str] = node.get("meta").get("owner")
-    meta_owner_metadata = {"owner": meta_owner} if meta_owner else {}
-
-    return {
-        **rows_affected_metadata,
-        **compiled_sql_metadata,
-        **meta_owner_metadata,
-    }
+    return {**rows_affected_metadata, **compiled_sql_metadata}
 
 
 def prepare_dbt_files(
-    dbt_cli_task: DbtCliInvocation, dagster_dbt_translator: DagsterDbtTranslator
-) -> Tuple[dict, dict]:
+    dbt_cli_task: DbtCliInvocation,
+) -> Tuple[dict[str, dict], dict[str, dict]]:
+    """run_results by unique_id and the nodes of the executed manifest, read once after the run."""
     run_results = dbt_cli_task.get_artifact("run_results.json")
     executed_manifest = dbt_cli_task.get_artifact("manifest.json")
 
-    results_by_asset_key = {
-        dagster_dbt_translator.get_asset_key(
-            executed_manifest["nodes"][result["unique_id"]]
-        ): result
-        for result in run_results["results"]
-    }
-    dbt_resource_props_by_asset_key = {
-        dagster_dbt_translator.get_asset_key(node): node
-        for node in executed_manifest["nodes"].values()
-    }
+    results_by_unique_id = {result["unique_id"]: result for result in run_results["results"]}
+    return results_by_unique_id, executed_manifest["nodes"]
 
-    return results_by_asset_key, dbt_resource_props_by_asset_key
 
+def generate_run_results_observations(
+    dbt_cli_task: DbtCliInvocation, asset_keys_by_unique_id: Mapping[str, AssetKey]
+) -> Iterator[AssetObservation]:
+    """One follow-up metadata event per materialized asset, enriched from run_results.json."""
+    if not asset_keys_by_unique_id:
+        return
+    results_by_unique_id, executed_nodes = prepare_dbt_files(dbt_cli_task)
+    for unique_id, asset_key in asset_keys_by_unique_id.items():
+        result = results_by_unique_id.get(unique_id)
+        if result is None:
+            continue
+        metadata = generate_run_results_metadata(result, executed_nodes.get(unique_id))
+        if metadata:
+            yield AssetObservation(asset_key=asset_key, metadata=metadata)
 
-def process_dbt_assets(
+
+class DbtBuildConfig(Config):
+    # only build the nodes that changed since the last successful build of all assets
+    # of the definition, and their downstream nodes (dbt's state:modified+). Unchanged
+    # parents are deferred to that build, the first run without a state builds all.
+    # Unpartitioned definitions only: the state is kept per definition, a partition
+    # built with it would hide the change from the partitions that were not
+    only_modified: bool = False
+    # partitions per dbt invocation of a partition range run, 0 builds the whole range
+    # in one invocation
+    partitions_per_invocation: int = 1
+    # dbt invocations of a partition range run at once. dbt-duckdb holds the write lock
+    # of the database file for a whole invocation, raise it for targets with concurrent
+    # writers. Models tagged stateful_scd2 (and their children) always run one at a time
+    max_parallel_invocations: int = 1
+
+
+# dbt resource types that are built into relations, sources are only read
+built_resource_types = {"model", "seed", "snapshot"}
+
+# dbt tag of models that build on their own previous partition, i.e. SCD2 histories.
+# They run one partition chunk after the other, like the runs with this tag in
+# dagster_docker.yaml
+serial_dbt_tag = "stateful_scd2"
+
+
+def dbt_state_dir(context: OpExecutionContext, dbt2: DbtCliResource) -> Optional[Path]:
+    """Where the manifest of the last successful build of all assets of the definition is kept.
+
+    One directory per definition below the state_path of the dbt resource, the
+    definitions select different nodes and are built independently of each other.
+    """
+    if dbt2.state_path is None:
+        return None
+    return Path(dbt2.state_path, context.op.name)
+
+
+def selected_dbt_unique_ids(
     context: OpExecutionContext,
-    dbt2: DbtCliResource,
-    dagster_dbt_translator2: DagsterDbtTranslator,
-    dbt_mode: str = "build",  # choose run or build
-):
-    if context.has_partition_key:
-        # map partition key range to dbt vars
-        (
-            first_partition,
-            last_partition,
-        ) = context.asset_partitions_time_window_for_output(
-            list(context.selected_output_names)[0]
+    manifest: Mapping[str, Any],
+    dagster_dbt_translator: DagsterDbtTranslator,
+) -> list[str]:
+    """unique_ids of the dbt nodes of the selected assets of the run."""
+    selected_asset_keys = context.selected_asset_keys
+    return [
+        unique_id
+        for unique_id, dbt_resource_props in manifest["nodes"].items()
+        if dbt_resource_props["resource_type"] in built_resource_types
+        and dagster_dbt_translator.get_asset_key(dbt_resource_props) in selected_asset_keys
+    ]
+
+
+def dbt_selection_args(
+    manifest: Mapping[str, Any],
+    unique_ids: Iterable[str],
+    state_selector: Optional[str] = None,
+    exclude: Optional[str] = None,
+) -> list[str]:
+    """dbt selection args of exactly the given nodes.
+
+    Every node is selected by its fqn. With a state_selector each fqn is intersected
+    with it, i.e. `state:modified+,fqn:...`, so only the nodes that match the state
+    are built. Tests follow their models through dbt's indirect selection, exclude
+    (the exclude of the definition) keeps its tests out.
+    """
+    selectors = ["fqn:" + ".".join(manifest["nodes"][unique_id]["fqn"]) for unique_id in unique_ids]
+    if state_selector is not None:
+        selectors = [f"{state_selector},{selector}" for selector in selectors]
+
+    selection_args = ["--select", " ".join(selectors)]
+    if exclude:
+        selection_args += ["--exclude", exclude]
+    return selection_args
+
+
+def dbt_selection_for_context(
+    context: OpExecutionContext,
+    manifest: Mapping[str, Any],
+    dagster_dbt_translator: DagsterDbtTranslator,
+    state_selector: Optional[str] = None,
+    exclude: Optional[str] = None,
+) -> list[str]:
+    """dbt selection args of exactly the selected assets of the run."""
+    return dbt_selection_args(
+        manifest,
+        selected_dbt_unique_ids(context, manifest, dagster_dbt_translator),
+        state_selector=state_selector,
+        exclude=exclude,
+    )
+
+
+def serial_dbt_unique_ids(manifest: Mapping[str, Any], unique_ids: Iterable[str]) -> set[str]:
+    """The given nodes tagged serial_dbt_tag and the given nodes downstream of them."""
+    unique_ids = set(unique_ids)
+    pending = [
+        unique_id
+        for unique_id in unique_ids
+        if serial_dbt_tag in manifest["nodes"][unique_id].get("tags", [])
+    ]
+    downstream: set[str] = set()
+    while pending:
+        unique_id = pending.pop()
+        if unique_id not in downstream:
+            downstream.add(unique_id)
+            pending.extend(manifest["child_map"].get(unique_id, []))
+    return downstream & unique_ids
+
+
+def partition_chunks(
+    context: OpExecutionContext, partitions_per_invocation: int
+) -> list[TimeWindow]:
+    """The partition range of the run in time windows of partitions_per_invocation partitions."""
+    partitions_def = context.assets_def.partitions_def
+    partition_keys = partitions_def.get_partition_keys_in_range(context.partition_key_range)
+    chunk_size = partitions_per_invocation if partitions_per_invocation > 0 else len(partition_keys)
+    return [
+        TimeWindow(
+            partitions_def.time_window_for_partition_key(chunk[0]).start,
+            partitions_def.time_window_for_partition_key(chunk[-1]).end,
+        )
+        for chunk in (
+            partition_keys[i : i + chunk_size] for i in range(0, len(partition_keys), chunk_size)
         )
-        # This assumes a single backfill is possible
-        # in case of dependent operations i.e. SCD2 you must disable the single run option
-        dbt_vars = {"min_date": str(first_partition), "max_date": str(last_partition)}
-        dbt_args = [dbt_mode, "--vars", json.dumps(dbt_vars)]
+    ]
+
+
+def partition_vars_args(time_window: TimeWindow) -> list[str]:
+    # map partition key range to dbt vars
+    dbt_vars = {"min_date": str(time_window.start), "max_date": str(time_window.end)}
+    return ["--vars", json.dumps(dbt_vars)]
+
+
+def persist_dbt_state(dbt_cli_task: DbtCliInvocation, state_dir: Path) -> None:
+    """Keeps the manifest of the invocation as the state of the next state:modified run."""
+    state_dir.mkdir(parents=True, exist_ok=True)
+    # written next to the state and renamed, a failing copy never leaves half a manifest
+    tmp_path = state_dir.joinpath("manifest.json.tmp")
+    tmp_path.write_bytes(dbt_cli_task.target_path.joinpath("manifest.json").read_bytes())
+    os.replace(tmp_path, state_dir.joinpath("manifest.json"))
+
+
+def _add_manifest_metadata(
+    context: OpExecutionContext, dbt_cli_task: DbtCliInvocation, output: Output
+) -> str:
+    """Attaches the metadata known from the manifest to the output, returns its unique_id."""
+    # the manifest the invocation was started with is already parsed, outputs are
+    # mapped to asset keys through the op's outputs instead of the translator
+    unique_id = _output_unique_id(output)
+    context.add_output_metadata(
+        metadata=generate_additional_metadata_for_output(dbt_cli_task.manifest["nodes"][unique_id]),
+        output_name=output.output_name,
+    )
+    return unique_id
+
+
+def _dbt_events(context: OpExecutionContext, dbt_cli_task: DbtCliInvocation) -> Iterator[Any]:
+    """The Dagster events of an invocation started without the context, as DbtCliInvocation.stream.
+
+    dagster-dbt appends the selection of the run to the args of an invocation that
+    gets the context, and dbt takes the union of repeated --select args. Invocations
+    with a selection of their own are started without it, their events are
+    converted with the context here.
+    """
+    for dbt_event in dbt_cli_task.stream_raw_events():
+        yield from dbt_event.to_default_asset_events(
+            manifest=dbt_cli_task.manifest,
+            dagster_dbt_translator=dbt_cli_task.dagster_dbt_translator,
+            context=context,
+            target_path=dbt_cli_task.target_path,
+        )
+
+
+def _run_dbt_invocation(
+    context: OpExecutionContext,
+    start_invocation: Callable[[], DbtCliInvocation],
+    events: "queue.Queue[Tuple[Optional[DbtCliInvocation], Any]]",
+) -> None:
+    """Puts the events of the invocation on events, followed by (None, None) once it ended."""
+    try:
+        dbt_cli_task = start_invocation()
+        for dagster_event in _dbt_events(context, dbt_cli_task):
+            events.put((dbt_cli_task, dagster_event))
+    finally:
+        events.put((None, None))
+
+
+def _stream_dbt_invocations(
+    context: OpExecutionContext,
+    start_invocations: Sequence[Callable[[], DbtCliInvocation]],
+    max_parallel_invocations: int,
+) -> Iterator[Tuple[DbtCliInvocation, Any]]:
+    """Runs the invocations on at most max_parallel_invocations threads, in the given order.
+
+    The events of all invocations are yielded in the op's thread as they arrive, each
+    with the invocation it came from.
+    """
+    events: "queue.Queue[Tuple[Optional[DbtCliInvocation], Any]]" = queue.Queue()
+    with ThreadPoolExecutor(max_workers=max_parallel_invocations) as pool:
+        futures = [
+            pool.submit(_run_dbt_invocation, context, start_invocation, events)
+            for start_invocation in start_invocations
+        ]
+        for _ in futures:
+            while (event := events.get())[0] is not None:
+                yield event
+        for future in futures:
+            # raises the exception of a failed thread
+            future.result()
+
+
+class _PartitionChunkBuild:
+    """The dbt invocations of a partition range run, see _process_partition_chunks."""
+
+    def __init__(
+        self,
+        context: OpExecutionContext,
+        dbt2: DbtCliResource,
+        manifest: Mapping[str, Any],
+        dagster_dbt_translator: DagsterDbtTranslator,
+        exclude: Optional[str],
+    ):
+        self.context = context
+        self.dbt2 = dbt2
+        self.manifest = manifest
+        self.dagster_dbt_translator = dagster_dbt_translator
+        self.exclude = exclude
+        # in the order they were started
+        self.dbt_cli_tasks: list[DbtCliInvocation] = []
+        # unique_id -> asset key of the outputs, by id of the invocation (invocations
+        # are not hashable), and the chunks that built every unique_id so far
+        self._materialized_asset_keys: dict[int, dict[str, AssetKey]] = {}
+        self._built_chunks: Counter = Counter()
+
+    def invocation(self, name: str, args: list[str]) -> Callable[[], DbtCliInvocation]:
+        """Starts the invocation when called, with its own target path."""
+
+        def start_invocation() -> DbtCliInvocation:
+            dbt_cli_task = self.dbt2.cli(
+                args,
+                manifest=self.manifest,
+                dagster_dbt_translator=self.dagster_dbt_translator,
+                raise_on_error=False,
+                target_path=Path("target", f"{self.context.op.name}-{self.context.run_id[:7]}-{name}"),
+            )
+            self.dbt_cli_tasks.append(dbt_cli_task)
+            return dbt_cli_task
+
+        return start_invocation
+
+    def chunk_invocations(
+        self, phase: str, mode_args: list[str], unique_ids: Sequence[str], chunks: Sequence[TimeWindow]
+    ) -> list[Callable[[], DbtCliInvocation]]:
+        """One invocation of the given nodes per chunk."""
+        if not unique_ids:
+            return []
+        selection_args = dbt_selection_args(self.manifest, unique_ids, exclude=self.exclude)
+        return [
+            self.invocation(
+                f"{phase}-{chunk.start:%Y%m%d}",
+                [*mode_args, *partition_vars_args(chunk), *selection_args],
+            )
+            for chunk in chunks
+        ]
+
+    def phases(
+        self, dbt_mode: str, chunks: Sequence[TimeWindow], max_parallel_invocations: int
+    ) -> list[Tuple[list[Callable[[], DbtCliInvocation]], int]]:
+        """The invocations of every phase, in order, with the number of them run at once."""
+        unique_ids = selected_dbt_unique_ids(self.context, self.manifest, self.dagster_dbt_translator)
+        serial_unique_ids = serial_dbt_unique_ids(self.manifest, unique_ids)
+        parallel_unique_ids = [unique_id for unique_id in unique_ids if unique_id not in serial_unique_ids]
+        if dbt_mode != "build":
+            return [
+                (self.chunk_invocations("parallel", [dbt_mode], parallel_unique_ids, chunks), max_parallel_invocations),
+                (self.chunk_invocations("serial", [dbt_mode], sorted(serial_unique_ids), chunks), 1),
+            ]
+        # tests check whole tables, they run once after the chunks
+        mode_args = [dbt_mode, "--exclude-resource-type", "test"]
+        test_args = ["test", *dbt_selection_args(self.manifest, unique_ids, exclude=self.exclude)]
+        return [
+            (self.chunk_invocations("parallel", mode_args, parallel_unique_ids, chunks), max_parallel_invocations),
+            (self.chunk_invocations("serial", mode_args, sorted(serial_unique_ids), chunks), 1),
+            ([self.invocation("test", test_args)], 1),
+        ]
+
+    def _built_by_all_chunks(self, dbt_cli_task: DbtCliInvocation, output: Output, num_chunks: int) -> bool:
+        unique_id = _add_manifest_metadata(self.context, dbt_cli_task, output)
+        self._materialized_asset_keys.setdefault(id(dbt_cli_task), {})[unique_id] = (
+            self.context.asset_key_for_output(output.output_name)
+        )
+        self._built_chunks[unique_id] += 1
+        return self._built_chunks[unique_id] >= num_chunks
+
+    def stream(
+        self, phases: Sequence[Tuple[list[Callable[[], DbtCliInvocation]], int]], num_chunks: int
+    ) -> Iterator[Any]:
+        """The events of the phases, an output once all chunks built it, then the observations."""
+        for start_invocations, max_workers in phases:
+            for dbt_cli_task, dagster_event in _stream_dbt_invocations(self.context, start_invocations, max_workers):
+                # an output can only be yielded once per run
+                if not isinstance(dagster_event, Output) or self._built_by_all_chunks(
+                    dbt_cli_task, dagster_event, num_chunks
+                ):
+                    yield dagster_event
+
+        for dbt_cli_task in self.dbt_cli_tasks:
+            yield from generate_run_results_observations(
+                dbt_cli_task, self._materialized_asset_keys.get(id(dbt_cli_task), {})
+            )
+
+
+def _process_partition_chunks(
+    context: OpExecutionContext,
+    dbt2: DbtCliResource,
+    manifest: Mapping[str, Any],
+    dagster_dbt_translator: DagsterDbtTranslator,
+    dbt_mode: str,
+    chunks: Sequence[TimeWindow],
+    max_parallel_invocations: int,
+    exclude: Optional[str],
+) -> Iterator[Any]:
+    """Builds the selected assets with one dbt invocation per chunk of the partition range.
+
+    The chunks run in parallel, the models tagged serial_dbt_tag and their children run
+    afterwards, one chunk after the other. Every invocation writes to its own target
+    path. An asset's output is yielded once all chunks built it, a chunk that failed
+    leaves the asset unmaterialized. Tests check whole tables, in build mode they run
+    once after the chunks. Returns the invocations.
+    """
+    build = _PartitionChunkBuild(context, dbt2, manifest, dagster_dbt_translator, exclude)
+    yield from build.stream(build.phases(dbt_mode, chunks, max_parallel_invocations), len(chunks))
+    return build.dbt_cli_tasks
+
+
+def _start_dbt_invocation(
+    context: OpExecutionContext,
+    dbt2: DbtCliResource,
+    dbt_args: list[str],
+    manifest: Optional[Mapping[str, Any]],
+    dagster_dbt_translator: DagsterDbtTranslator,
+    state_args: Sequence[str],
+    exclude: Optional[str],
+) -> Tuple[DbtCliInvocation, Iterator[Any]]:
+    """One dbt invocation of the selected assets of the run, and its Dagster events."""
+    if not state_args:
+        # a subset of the assets is mapped to a --select of exactly those by dagster-dbt
         dbt_cli_task = dbt2.cli(dbt_args, context=context, raise_on_error=False)
-    else:
-        dbt_cli_task = dbt2.cli([dbt_mode], context=context, raise_on_error=False)
+        return dbt_cli_task, dbt_cli_task.stream()
+
+    # the intersection of the selection with the state is selected here
+    manifest = _required_manifest(manifest)
+    selection_args = dbt_selection_for_context(
+        context, manifest, dagster_dbt_translator, state_selector="state:modified+", exclude=exclude
+    )
+    dbt_cli_task = dbt2.cli(
+        [*dbt_args, *selection_args, *state_args],
+        manifest=manifest,
+        dagster_dbt_translator=dagster_dbt_translator,
+        raise_on_error=False,
+    )
+    return dbt_cli_task, _dbt_events(context, dbt_cli_task)
 
-    dbt_events = list(dbt_cli_task.stream())
 
-    results_by_asset_key, dbt_resource_props_by_asset_key = prepare_dbt_files(
-        dbt_cli_task, dagster_dbt_translator2
+def _process_single_invocation(
+    context: OpExecutionContext,
+    dbt2: DbtCliResource,
+    dbt_args: list[str],
+    manifest: Optional[Mapping[str, Any]],
+    dagster_dbt_translator: DagsterDbtTranslator,
+    state_args: Sequence[str],
+    exclude: Optional[str],
+) -> Iterator[Any]:
+    """Builds the selected assets with one dbt invocation. Returns the invocations."""
+    dbt_cli_task, dagster_events = _start_dbt_invocation(
+        context, dbt2, dbt_args, manifest, dagster_dbt_translator, state_args, exclude
     )
-    for dagster_event in dbt_events:
+    materialized_asset_keys: dict[str, AssetKey] = {}
+    for dagster_event in dagster_events:
         if isinstance(dagster_event, Output):
-            metadata = generate_additional_metadata_for_output(
-                output=dagster_event,
-                manifest=dbt_cli_task.get_artifact("manifest.json"),
-                results_by_asset_key=results_by_asset_key,
-                dbt_resource_props_by_asset_key=dbt_resource_props_by_asset_key,
-                dagster_dbt_translator=dagster_dbt_translator2,
-            )
-            context.add_output_metadata(
-                metadata=metadata,
-                output_name=dagster_event.output_name,
+            unique_id = _add_manifest_metadata(context, dbt_cli_task, dagster_event)
+            materialized_asset_keys[unique_id] = context.asset_key_for_output(
+                dagster_event.output_name
             )
         yield dagster_event
+
+    yield from generate_run_results_observations(dbt_cli_task, materialized_asset_keys)
+    return [dbt_cli_task]
+
+
+def _dbt_state_args(
+    context: OpExecutionContext, state_dir: Optional[Path], only_modified: bool
+) -> list[str]:
+    """dbt args of a state:modified+ build against the state in state_dir, if there is one."""
+    if not only_modified:
+        return []
+    if state_dir is None or not state_dir.joinpath("manifest.json").exists():
+        context.log.info(f"No dbt state in {state_dir}, building all selected assets.")
+        return []
+    return ["--state", os.fspath(state_dir), "--defer"]
+
+
+def _required_manifest(manifest: Optional[Mapping[str, Any]]) -> Mapping[str, Any]:
+    if manifest is None:
+        raise ValueError(
+            "Selecting the nodes of a state or partition chunk run needs the manifest of the dbt_assets definition"
+        )
+    return manifest
+
+
+def _leaves_dbt_state(context: OpExecutionContext) -> bool:
+    """Whether the run leaves every relation of the definition at the state of its manifest."""
+    # only a build of all assets does, subsets keep the previous state (the assets_def
+    # of the context is already subsetted to the selected assets). State is kept for
+    # unpartitioned definitions only, see DbtBuildConfig.only_modified
+    return context.assets_def.partitions_def is None and context.selected_asset_keys == set(
+        context.assets_def.node_keys_by_output_name.values()
+    )
+
+
+def process_dbt_assets(
+    context: OpExecutionContext,
+    dbt2: DbtCliResource,
+    dagster_dbt_translator2: DagsterDbtTranslator,
+    dbt_mode: str = "build",  # choose run or build
+    only_modified: bool = False,
+    partitions_per_invocation: int = 0,
+    max_parallel_invocations: int = 1,
+    manifest: Optional[Mapping[str, Any]] = None,
+    exclude: Optional[str] = None,
+):
+    """Runs dbt and yields its events as they arrive.
+
+    Outputs carry the metadata known from the manifest. Once dbt finished, the
+    rows affected and compiled SQL of every materialized asset follow as an
+    AssetObservation, from the run_results.json and manifest.json it wrote.
+
+    With only_modified, the selected assets are intersected with state:modified+
+    against the manifest of the last successful build of all assets of the
+    definition (see DbtBuildConfig), unchanged parents are deferred to it. It is
+    rejected for partitioned definitions.
+
+    A partition range is built in chunks of partitions_per_invocation partitions,
+    max_parallel_invocations at once (see _process_partition_chunks).
+
+    manifest and exclude are those of the dbt_assets definition. The state and the
+    partition chunk runs select their nodes themselves and need the manifest.
+    """
+    if only_modified and context.assets_def.partitions_def is not None:
+        raise ValueError(
+            f"only_modified can't build the partitions of {context.op.name}: the dbt state is "
+            "kept per definition, partitions built with it would hide changes from the others"
+        )
+    state_dir = dbt_state_dir(context, dbt2)
+    state_args = _dbt_state_args(context, state_dir, only_modified)
+
+    chunks = (
+        partition_chunks(context, partitions_per_invocation)
+        if context.has_partition_key or context.has_partition_key_range
+        else []
+    )
+    if len(chunks) > 1:
+        dbt_cli_tasks = yield from _process_partition_chunks(
+            context,
+            dbt2,
+            _required_manifest(manifest),
+            dagster_dbt_translator2,
+            dbt_mode,
+            chunks,
+            max_parallel_invocations,
+            exclude,
+        )
+    else:
+        dbt_args = [dbt_mode, *(partition_vars_args(chunks[0]) if chunks else [])]
+        dbt_cli_tasks = yield from _process_single_invocation(
+            context, dbt2, dbt_args, manifest, dagster_dbt_translator2, state_args, exclude
+        )
+
+    if (
+        state_dir is not None
+        and _leaves_dbt_state(context)
+        and all(dbt_cli_task.is_successful() for dbt_cli_task in dbt_cli_tasks)
+    ):
+        persist_dbt_state(dbt_cli_tasks[-1], state_dir)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+# duckdb is imported on use, so stores built on it can be imported while a code
+# location loads its definitions
+if TYPE_CHECKING:
+    import duckdb
+
+# seconds to wait for a writer of another process to release the database file
+lock_timeout = 60.0
+
+
+def connect(path: str, timeout: float = lock_timeout) -> duckdb.DuckDBPyConnection:
+    """Opens the DuckDB file at path, waiting while another process holds its write lock.
+
+    A DuckDB file is opened by one writing process at a time, i.e. by one run of a
+    backfill while its other runs wait here instead of failing.
+    """
+    import duckdb
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return duckdb.connect(path)
+        except duckdb.IOException as error:
+            if "lock" not in str(error).lower() or time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
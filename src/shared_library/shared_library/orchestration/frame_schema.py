@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Mapping, Sequence, Union
+
+# pandas and numpy are imported on use, so the schemas can be declared (and this module
+# imported) while a code location loads its definitions
+if TYPE_CHECKING:
+    import pandas as pd
+
+# a pandas dtype name, or the categories of a categorical column in their order
+ColumnType = Union[str, Sequence[str]]
+
+
+def pandas_dtype(column_type: ColumnType) -> Any:
+    import pandas as pd
+
+    if isinstance(column_type, str):
+        return pd.api.types.pandas_dtype(column_type)
+    return pd.CategoricalDtype(list(column_type))
+
+
+def _has_dtype(values: Any, dtype: Any) -> bool:
+    import pandas as pd
+
+    if isinstance(dtype, pd.CategoricalDtype) and dtype.categories is not None:
+        # unordered categoricals compare equal in any order, the declared order counts
+        return isinstance(values.dtype, pd.CategoricalDtype) and list(values.dtype.categories) == list(dtype.categories)
+    return values.dtype == dtype
+
+
+def _cast(values: Any, dtype: Any) -> Any:
+    import pandas as pd
+
+    if isinstance(values.dtype, pd.CategoricalDtype) and isinstance(dtype, pd.CategoricalDtype):
+        # astype to categories in another order is a no-op
+        return values.cat.set_categories(dtype.categories) if dtype.categories is not None else values
+    return values.astype(dtype)
+
+
+def _check_fits(name: str, column: pd.Series, dtype: Any) -> None:
+    """Raises instead of letting astype wrap integers or drop unknown categories."""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(dtype, pd.CategoricalDtype) and dtype.categories is not None:
+        unknown = column.notna() & ~column.isin(dtype.categories)
+        if unknown.any():
+            raise ValueError(f"{name} has values outside of {list(dtype.categories)}: {column[unknown].unique()[:5]}")
+    elif pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_bool_dtype(column.dtype) and len(column):
+        bounds = np.iinfo(dtype.numpy_dtype if hasattr(dtype, "numpy_dtype") else dtype)
+        if column.min() < bounds.min or column.max() > bounds.max:
+            raise ValueError(f"{name} has values outside of the range of {dtype}: {column.min()}..{column.max()}")
+
+
+def memory_bytes(frame: pd.DataFrame) -> int:
+    """Memory of the frame including the strings of object columns."""
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class MemoryReduction:
+    """Memory of frames before and after enforce_schema, summed over the chunks of an asset."""
+
+    def __init__(self):
+        self.before_bytes = 0
+        self.after_bytes = 0
+
+    def add(self, before: pd.DataFrame, after: pd.DataFrame) -> None:
+        self.before_bytes += memory_bytes(before)
+        self.after_bytes += memory_bytes(after)
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "memory_bytes": self.after_bytes,
+            "memory_bytes_before_schema": self.before_bytes,
+            "memory_reduction": 1 - self.after_bytes / self.before_bytes if self.before_bytes else 0.0,
+        }
+
+
+def enforce_schema(
+    frame: pd.DataFrame,
+    schema: Mapping[str, ColumnType],
+    reduction: MemoryReduction | None = None,
+) -> pd.DataFrame:
+    """The frame with its columns (and named index) cast to the dtypes of the schema.
+
+    Columns the schema does not declare are kept as they are, declared columns the
+    frame does not have are ignored. Values a dtype can't hold raise a ValueError
+    instead of being wrapped or lost. With a reduction, the memory of the frame
+    before and after is added to it.
+    """
+    dtypes = {name: pandas_dtype(column_type) for name, column_type in schema.items()}
+    changed = {
+        name: dtype
+        for name, dtype in dtypes.items()
+        if name in frame.columns and not _has_dtype(frame[name], dtype)
+    }
+    for name, dtype in changed.items():
+        _check_fits(name, frame[name], dtype)
+    compact = frame.assign(**{name: _cast(frame[name], dtype) for name, dtype in changed.items()}) if changed else frame
+
+    if compact.index.name in dtypes and not _has_dtype(compact.index, dtypes[compact.index.name]):
+        _check_fits(compact.index.name, compact.index.to_series(), dtypes[compact.index.name])
+        compact = compact.set_axis(_cast(compact.index, dtypes[compact.index.name]), axis=0)
+
+    if reduction is not None:
+        reduction.add(frame, compact)
+    return compact
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+from typing import TYPE_CHECKING, Any, Callable
+
+from dagster import (
+    AssetExecutionContext,
+    DataVersion,
+    OpExecutionContext,
+    Output,
+    get_dagster_logger,
+)
+from pydantic import BaseModel
+
+from .parquet_dataset import ParquetDataset
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import polars as pl
+
+logger = get_dagster_logger(__name__)
+
+_entry_extension = ".pickle"
+
+
+class AssetCache:
+    """Outputs of memoized assets on local disk, keyed by the hash of their inputs.
+
+    Every entry is one pickle file ``<path>/<key>.pickle``. Reading an entry marks
+    it as recently used, writing one evicts the least recently used entries until
+    the cache fits into ``max_bytes`` again. A ``max_bytes`` of 0 disables it.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key + _entry_extension)
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Returns (True, value) for a cached key, else (False, None)."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False, None
+        # the modification time orders the entries for eviction
+        os.utime(path)
+        return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        # written next to the entry and renamed, readers never see a partial file
+        fd, staging = tempfile.mkstemp(dir=self.path, prefix=".staging-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if os.path.getsize(staging) > self.max_bytes:
+                logger.info(f"Not caching {key}, it is larger than the cache")
+                return
+            os.replace(staging, self._entry_path(key))
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits into max_bytes."""
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(_entry_extension):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
+
+
+def _update_with_files(content_hash: "hashlib._Hash", path: str) -> None:
+    paths = [path] if os.path.isfile(path) else sorted(
+        os.path.join(directory, file_name)
+        for directory, _, file_names in os.walk(path)
+        for file_name in file_names
+    )
+    for file_path in paths:
+        content_hash.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                content_hash.update(block)
+
+
+def _update_with_frame(content_hash: "hashlib._Hash", value: pd.DataFrame) -> None:
+    import pandas as pd
+
+    content_hash.update(repr(list(value.dtypes.items())).encode())
+    content_hash.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+
+
+def _update_with_polars(content_hash: "hashlib._Hash", value: pl.DataFrame) -> None:
+    content_hash.update(repr(value.schema).encode())
+    content_hash.update(value.hash_rows(seed=0).to_numpy().tobytes())
+
+
+def _update_with_items(content_hash: "hashlib._Hash", value: dict) -> None:
+    for key in sorted(value, key=repr):
+        _update(content_hash, key)
+        _update(content_hash, value[key])
+
+
+def _update_with_sequence(content_hash: "hashlib._Hash", value: list | tuple) -> None:
+    for item in value:
+        _update(content_hash, item)
+
+
+@functools.cache
+def _hashers() -> list[tuple[type | tuple[type, ...], Callable[["hashlib._Hash", Any], None]]]:
+    """How values of a type are hashed, everything else is pickled."""
+    # imported on the first fingerprint, not when the assets are defined
+    import pandas as pd
+    import polars as pl
+    import pyarrow as pa
+
+    return [
+        (pd.DataFrame, _update_with_frame),
+        (pl.DataFrame, _update_with_polars),
+        (pa.Table, lambda content_hash, value: _update_with_frame(content_hash, value.to_pandas())),
+        # the files, not the handle, i.e. a rewritten dataset at the same path differs
+        (ParquetDataset, lambda content_hash, value: _update_with_files(content_hash, value.path)),
+        (BaseModel, lambda content_hash, value: content_hash.update(value.model_dump_json().encode())),
+        (dict, _update_with_items),
+        ((list, tuple), _update_with_sequence),
+    ]
+
+
+def _update(content_hash: "hashlib._Hash", value: Any) -> None:
+    # the type is part of the hash, so i.e. a list and a tuple of the same items differ
+    content_hash.update(type(value).__qualname__.encode())
+    hasher = next((hasher for types, hasher in _hashers() if isinstance(value, types)), None)
+    if hasher is None:
+        content_hash.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    else:
+        hasher(content_hash, value)
+
+
+def fingerprint(*values: Any) -> str:
+    """Content hash of asset inputs, equal values hash equal across processes."""
+    content_hash = hashlib.sha256()
+    for value in values:
+        _update(content_hash, value)
+    return content_hash.hexdigest()[:32]
+
+
+def _is_cacheable(value: Any) -> bool:
+    # a handle only points to files which the next run may overwrite
+    return not isinstance(value.value if isinstance(value, Output) else value, ParquetDataset)
+
+
+def _call(cache: AssetCache, key: str, fn: Callable, args: tuple, kwargs: dict) -> tuple[bool, Any]:
+    is_memoized, output = cache.get(key)
+    if is_memoized:
+        logger.info(f"Inputs of {fn.__qualname__} are unchanged, reusing its output {key}")
+        return True, output
+
+    output = fn(*args, **kwargs)
+    if _is_cacheable(output):
+        cache.put(key, output)
+    return False, output
+
+
+def _with_data_version(output: Any, key: str, is_memoized: bool) -> Any:
+    if not isinstance(output, Output):
+        return output
+    return Output(
+        value=output.value,
+        metadata={**output.metadata, "memoized": is_memoized, "cache_key": key},
+        data_version=DataVersion(key),
+    )
+
+
+def memoized(get_cache: Callable[[], AssetCache], version: str):
+    """Reuses the stored output of an asset function if its inputs did not change.
+
+    The cache key is the fingerprint of every argument except the context, of
+    ``version`` and of the function source. Outputs are returned as the function
+    returned them. If that is an ``Output``, its data version is set to the cache
+    key, so Dagster sees an unchanged data version for unchanged inputs, and the
+    metadata tells whether it was memoized.
+
+    Only edits of the function itself change the key, not edits of the code it
+    calls (helper modules, schemas, ...). Bump ``version`` with every change of
+    that code which changes the output, or clear the cache (the ASSET_CACHE_DIR of
+    the deployment), else the outputs of the old code are served until they are
+    evicted. Outputs which must differ per run (i.e. carry a run timestamp) can't be
+    memoized at all.
+
+    Apply it below ``@asset``::
+
+        @asset
+        @memoized(get_asset_cache, version="1")
+        def features(config, raw_features): ...
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        source_hash = hashlib.sha256(inspect.getsource(fn).encode()).hexdigest()[:16]
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if not cache.enabled:
+                return fn(*args, **kwargs)
+
+            arguments = signature.bind(*args, **kwargs).arguments
+            inputs = {
+                name: value
+                for name, value in arguments.items()
+                if not isinstance(value, (AssetExecutionContext, OpExecutionContext))
+            }
+            key = fingerprint(fn.__module__, fn.__qualname__, version, source_hash, inputs)
+            is_memoized, output = _call(cache, key, fn, args, kwargs)
+            return _with_data_version(output, key, is_memoized)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import itertools
+import os
+import shutil
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Sequence, Union
+
+from dagster import AssetExecutionContext
+
+# pandas and pyarrow are imported on use, so importing the handle (i.e. while a code
+# location loads its definitions) stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+
+@dataclass(frozen=True)
+class ParquetDataset:
+    """Lazy handle to a (hive partitioned) Parquet dataset on disk.
+
+    The handle itself only holds the location, so it is cheap to pass between
+    assets. Consumers decide which columns and rows they actually load.
+    """
+
+    path: str
+    partition_cols: tuple[str, ...] = ()
+    num_rows: int = 0
+
+    def dataset(self) -> ds.Dataset:
+        import pyarrow.dataset as ds
+
+        return ds.dataset(
+            self.path,
+            format="parquet",
+            partitioning="hive" if self.partition_cols else None,
+        )
+
+    def iter_batches(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        batch_size: int = 1_000_000,
+    ) -> Iterator[pa.RecordBatch]:
+        yield from self.dataset().to_batches(
+            columns=list(columns) if columns is not None else None,
+            batch_size=batch_size,
+        )
+
+    def to_pandas(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        table = self.dataset().to_table(
+            columns=list(columns) if columns is not None else None
+        )
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def dataset_path(
+    context: AssetExecutionContext, name: str, output_dir: Optional[str] = None
+) -> str:
+    """Location of a streamed dataset, below the instance storage unless configured."""
+    output_dir = output_dir or os.path.join(
+        context.instance.storage_directory(), "datasets"
+    )
+    return os.path.join(output_dir, name)
+
+
+def write_parquet_dataset(
+    path: str,
+    frames: Iterable[pd.DataFrame],
+    partition_cols: Sequence[str] = (),
+    max_rows_per_file: int = 1_000_000,
+) -> ParquetDataset:
+    """Streams DataFrame chunks into a Parquet dataset, replacing any previous content.
+
+    Only one chunk is held in memory at a time, each chunk is converted to an Arrow
+    record batch and handed to the dataset writer.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    batches = (
+        pa.RecordBatch.from_pandas(frame, preserve_index=False) for frame in frames
+    )
+    first = next(batches, None)
+    if first is None:
+        raise ValueError(f"No data to write to {path}")
+
+    num_rows = 0
+
+    def counted(batches: Iterable[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        nonlocal num_rows
+        for batch in batches:
+            num_rows += batch.num_rows
+            yield batch
+
+    shutil.rmtree(path, ignore_errors=True)
+    ds.write_dataset(
+        counted(itertools.chain([first], batches)),
+        path,
+        schema=first.schema,
+        format="parquet",
+        partitioning=list(partition_cols) if partition_cols else None,
+        partitioning_flavor="hive" if partition_cols else None,
+        basename_template="part-{i}.parquet",
+        max_rows_per_file=max_rows_per_file,
+        max_rows_per_group=min(max_rows_per_file, 1 << 20),
+    )
+    return ParquetDataset(
+        path=path, partition_cols=tuple(partition_cols), num_rows=num_rows
+    )
+
+
+def as_pandas(
+    value: Union[pd.DataFrame, ParquetDataset],
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """Materializes an asset value that is either a DataFrame or a ParquetDataset."""
+    if isinstance(value, ParquetDataset):
+        return value.to_pandas(columns)
+    return value if columns is None else value[list(columns)]
+
+
+def scannable(value: Union[pd.DataFrame, ParquetDataset]) -> Union[pd.DataFrame, ds.Dataset]:
+    """An asset value DuckDB can register, the Arrow dataset of a ParquetDataset."""
+    # DuckDB scans Arrow datasets batch by batch
+    return value.dataset() if isinstance(value, ParquetDataset) else value
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import inspect
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator, Optional
+
+from dagster import (
+    AssetExecutionContext,
+    Config,
+    DagsterInvariantViolationError,
+    MetadataValue,
+    OpExecutionContext,
+    Output,
+)
+
+from .parquet_dataset import ParquetDataset
+
+# run tags to switch profiling on for a single run, i.e. when launching it in the UI
+profiler_tag = "asset_profiler"
+trace_allocations_tag = "asset_trace_allocations"
+profilers = ("cprofile", "pyinstrument")
+# seconds between two RSS samples
+rss_sample_interval = 0.01
+# held while checking whether tracemalloc traces and starting it, so one call starts it
+_tracing_lock = threading.Lock()
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # no procfs (i.e. macOS), the high-water mark of the process in bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class RssSampler:
+    """Samples the RSS of the process on a background thread while it is entered."""
+
+    def __init__(self, interval: float = rss_sample_interval):
+        self.interval = interval
+        self.samples: list[tuple[float, int]] = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while True:
+            self.samples.append((time.time(), current_rss()))
+            if self._stopped.wait(self.interval):
+                return
+
+    def __enter__(self) -> RssSampler:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+        # the end of a call shorter than the interval
+        self.samples.append((time.time(), current_rss()))
+
+    def peak(self, start: float = 0.0, end: float = float("inf")) -> int:
+        """Peak RSS between start and end, the next sample for windows shorter than the interval."""
+        in_window = [rss for timestamp, rss in self.samples if start <= timestamp <= end]
+        if in_window:
+            return max(in_window)
+        return next((rss for timestamp, rss in self.samples if timestamp >= end), self.samples[-1][1])
+
+
+class AssetProfiler:
+    """What @profiled measures besides time, RSS and sizes, and where profiles are written.
+
+    ``profiler`` ("cprofile" or "pyinstrument") writes a profile of every call to
+    ``<path>/<run_id>/<op>.prof`` (``.html`` for pyinstrument). ``trace_allocations``
+    adds the peak of the memory traced by tracemalloc, which slows down allocation
+    heavy Python code. The run tags ``asset_profiler`` and ``asset_trace_allocations``
+    override both for a single run.
+    """
+
+    def __init__(self, path: str, profiler: Optional[str] = None, trace_allocations: bool = False):
+        self.path = path
+        self.profiler = profiler
+        self.trace_allocations = trace_allocations
+
+
+def _frame_libraries() -> tuple[Any, Any, Any]:
+    # values can only be frames of libraries that are already imported
+    return sys.modules.get("pandas"), sys.modules.get("polars"), sys.modules.get("pyarrow")
+
+
+def _file_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, file_name))
+        for directory, _, file_names in os.walk(path)
+        for file_name in file_names
+    )
+
+
+def _frame_size(value: Any) -> Optional[tuple[int, int]]:
+    pd, pl, pa = _frame_libraries()
+    if pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value), int(value.memory_usage(index=True, deep=False).sum())
+    if pl is not None and isinstance(value, pl.DataFrame):
+        return value.height, int(value.estimated_size())
+    if pa is not None and isinstance(value, pa.Table):
+        return value.num_rows, value.nbytes
+    return None
+
+
+def _summed_size(items: list) -> Optional[tuple[int, int]]:
+    sizes = [size_of(item) for item in items]
+    if not sizes or any(size is None for size in sizes):
+        return None
+    return sum(rows for rows, _ in sizes), sum(nbytes for _, nbytes in sizes)
+
+
+def size_of(value: Any) -> Optional[tuple[int, int]]:
+    """(rows, bytes) of a frame, table or dataset, summed over dicts and lists of them.
+
+    In-memory sizes are shallow, object columns count their pointers: the deep size
+    costs a pass over every string. Datasets count their bytes on disk.
+    """
+    if isinstance(value, Output):
+        return size_of(value.value)
+    if isinstance(value, ParquetDataset):
+        return value.num_rows, _file_bytes(value.path)
+    # i.e. the partitions of a partitioned input
+    if isinstance(value, dict):
+        return _summed_size(list(value.values()))
+    if isinstance(value, (list, tuple)):
+        return _summed_size(list(value))
+    return _frame_size(value)
+
+
+def _current_context() -> Optional[OpExecutionContext]:
+    try:
+        return OpExecutionContext.get()
+    except DagsterInvariantViolationError:
+        # i.e. the asset function is called directly
+        return None
+
+
+@contextlib.contextmanager
+def _tracing_allocations(enabled: bool) -> Iterator[Callable[[], Optional[int]]]:
+    """Traces the allocations of the block if enabled, yields a getter of their peak in bytes.
+
+    Tracing is global to the process. A call that finds it started already (by its
+    caller, a nested profiled call or another thread) leaves it running and gets no
+    peak, as it can't tell its own allocations apart.
+    """
+    with _tracing_lock:
+        started = enabled and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+    try:
+        yield lambda: tracemalloc.get_traced_memory()[1] if started else None
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def _profiling(profiler: Optional[str], path: str) -> Iterator[Optional[str]]:
+    """Profiles the block with the given profiler, yields the path of the profile."""
+    if profiler is None:
+        yield None
+        return
+    if profiler not in profilers:
+        raise ValueError(f"Unknown profiler {profiler}, use one of {profilers}")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if profiler == "cprofile":
+        import cProfile
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield path + ".prof"
+        finally:
+            profile.disable()
+            profile.dump_stats(path + ".prof")
+    else:
+        try:
+            from pyinstrument import Profiler
+        except ImportError as error:
+            raise ImportError("The pyinstrument profiler requires `pip install pyinstrument`") from error
+
+        profile = Profiler()
+        profile.start()
+        try:
+            yield path + ".html"
+        finally:
+            profile.stop()
+            with open(path + ".html", "w") as f:
+                f.write(profile.output_html())
+
+
+def _output_values(context: OpExecutionContext, output: Any) -> dict[str, Any]:
+    """The returned value of every output, a multi asset returns them as a tuple."""
+    output_names = [
+        output_def.name
+        for output_def in context.op_def.output_defs
+        if output_def.name in context.selected_output_names
+    ]
+    if len(output_names) == 1:
+        return {output_names[0]: output}
+    if isinstance(output, tuple) and len(output) == len(output_names):
+        return dict(zip(output_names, output, strict=True))
+    return dict.fromkeys(output_names)
+
+
+def _profile_settings(context: OpExecutionContext, asset_profiler: AssetProfiler) -> tuple[Optional[str], bool]:
+    """The profiler and whether to trace allocations, the run tags override the resource."""
+    profiler = context.run.tags.get(profiler_tag, asset_profiler.profiler)
+    trace_allocations = context.run.tags.get(trace_allocations_tag, str(asset_profiler.trace_allocations))
+    return profiler, trace_allocations.lower() in ("1", "true")
+
+
+def _input_sizes(signature: inspect.Signature, args: tuple, kwargs: dict) -> dict[str, tuple[int, int]]:
+    return {
+        name: size
+        for name, value in signature.bind(*args, **kwargs).arguments.items()
+        if not isinstance(value, (AssetExecutionContext, OpExecutionContext, Config))
+        and (size := size_of(value)) is not None
+    }
+
+
+def _measured_call(
+    fn: Callable, args: tuple, kwargs: dict, profiler: Optional[str], profile_path: str, trace_allocations: bool
+) -> tuple[Any, dict[str, Any]]:
+    """The output of fn and the time, memory and profile of the call as metadata."""
+    with _tracing_allocations(trace_allocations) as peak_traced_bytes:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        with RssSampler() as rss, _profiling(profiler, profile_path) as profile:
+            output = fn(*args, **kwargs)
+        metadata: dict[str, Any] = {
+            "wall_seconds": time.perf_counter() - wall_start,
+            "cpu_seconds": time.process_time() - cpu_start,
+            "peak_rss_bytes": rss.peak(),
+        }
+        traced_bytes = peak_traced_bytes()
+    if traced_bytes is not None:
+        metadata["peak_traced_bytes"] = traced_bytes
+    if profile is not None:
+        metadata["profile"] = MetadataValue.path(profile)
+    return output, metadata
+
+
+def _add_output_metadata(context: OpExecutionContext, output: Any, metadata: dict[str, Any]) -> None:
+    for output_name, value in _output_values(context, output).items():
+        output_size = size_of(value)
+        output_metadata = (
+            {"output_rows": output_size[0], "output_bytes": output_size[1]}
+            if output_size is not None
+            else {}
+        )
+        context.add_output_metadata({**metadata, **output_metadata}, output_name=output_name)
+
+
+def profiled(get_profiler: Callable[[], AssetProfiler]):
+    """Attaches the resource usage of every call of an asset function as output metadata.
+
+    Every output gets the wall and CPU time of the call (CPU time of all threads of
+    this process, not of worker processes), the peak RSS while it ran, the rows and
+    bytes of the inputs and its own rows and bytes (see size_of). Numeric metadata
+    shows up as plots over time in the UI. Outside of a run the function is called
+    as is.
+
+    Apply it below ``@asset`` and above ``@memoized``, so memoized calls are measured
+    as well::
+
+        @asset
+        @profiled(get_asset_profiler)
+        @memoized(get_asset_cache, version="1")
+        def features(config, raw_features): ...
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            context = _current_context()
+            if context is None:
+                return fn(*args, **kwargs)
+
+            asset_profiler = get_profiler()
+            profiler, trace_allocations = _profile_settings(context, asset_profiler)
+            input_sizes = _input_sizes(signature, args, kwargs)
+            profile_path = os.path.join(asset_profiler.path, context.run_id, context.op.name)
+            output, metadata = _measured_call(fn, args, kwargs, profiler, profile_path, trace_allocations)
+
+            metadata["input_rows"] = sum(rows for rows, _ in input_sizes.values())
+            metadata["input_bytes"] = sum(nbytes for _, nbytes in input_sizes.values())
+            metadata["inputs"] = MetadataValue.json(
+                {name: {"rows": rows, "bytes": nbytes} for name, (rows, nbytes) in input_sizes.items()}
+            )
+            _add_output_metadata(context, output, metadata)
+            return output
+
+        return wrapper
+
+    return decorator
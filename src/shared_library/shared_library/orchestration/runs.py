@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from dagster import AssetExecutionContext
+
+
+def run_started_at(context: AssetExecutionContext) -> datetime:
+    """Start time of the run, or of the run it re-executes.
+
+    The same for every asset and step retry of a run and for its re-executions, so
+    what an asset stamps with it (i.e. a snapshot or a predictions run) is replaced
+    by a retry instead of added to.
+    """
+    record = context.instance.get_run_record_by_id(context.run_id)
+    if record is not None and record.dagster_run.root_run_id is not None:
+        record = context.instance.get_run_record_by_id(record.dagster_run.root_run_id)
+    if record is None or record.start_time is None:
+        # i.e. the asset function is called directly
+        return datetime.now()
+    return datetime.fromtimestamp(record.start_time)